@@ -0,0 +1,73 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.api_benchmark import ApiBenchmark, compare_reports
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Times requests to the API routes and writes a JSON report "
+            "(timings, numbers of queries, SQL time) for every route.")
+
+    def handle(self, *args, **options):
+        user = self._get_user(options)
+        api_benchmark = ApiBenchmark(user,
+                                     repetitions=options["repetitions"],
+                                     warmup=options["warmup"])
+        report = api_benchmark.run()
+        with open(options["output"], "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+        for name, result in report["results"].items():
+            self.stdout.write(f"{name:<50} {result['status_code']} "
+                              f"{result['time_ms']['median']:>10.2f} ms "
+                              f"{result['queries']:>5} queries")
+        if report["not_benchmarked"]:
+            self.stdout.write(self.style.WARNING(
+                "Not benchmarked: " + ", ".join(report["not_benchmarked"])))
+        if options["compare"]:
+            self._print_comparison(options["compare"], report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Report written to {options['output']}."))
+
+    @staticmethod
+    def _get_user(options):
+        if options["username"]:
+            user = User.objects.filter(username=options["username"]).first()
+        else:
+            user = ApiBenchmark.get_default_user()
+        if not user:
+            raise CommandError("No user to run the benchmark for.")
+        return user
+
+    def _print_comparison(self, baseline_path, report):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(f"Compared with {baseline_path} (median time, "
+                          "queries):")
+        for (name, baseline_time, time, baseline_queries,
+             queries) in compare_reports(baseline, report):
+            change = (time - baseline_time) / baseline_time * 100 \
+                if baseline_time else 0
+            self.stdout.write(f"{name:<50} {baseline_time:>10.2f} -> "
+                              f"{time:>10.2f} ms ({change:+.1f}%) "
+                              f"{baseline_queries:>5} -> {queries:<5}")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", type=str,
+                            help="Run requests on behalf of this user "
+                                 "(default: user with the most memorized "
+                                 "cards).")
+        parser.add_argument("--repetitions", type=int, default=10,
+                            help="Number of timed requests for each route.")
+        parser.add_argument("--warmup", type=int, default=1,
+                            help="Number of untimed requests for each route.")
+        parser.add_argument("--output", type=str,
+                            default="benchmark_report.json",
+                            help="Path to the JSON report.")
+        parser.add_argument("--compare", type=str,
+                            help="Path to a previous report to compare "
+                                 "results with.")
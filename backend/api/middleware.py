@@ -0,0 +1,22 @@
+from django.conf import settings
+from .utils.query_budget import QueryRecorder
+
+
+class QueryCountMiddleware:
+    """In debug mode, reports database usage of each request in
+    the response headers: number of queries, number of duplicate queries
+    and total SQL execution time (in milliseconds).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DEBUG:
+            return self.get_response(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        response["X-DB-Query-Count"] = recorder.count
+        response["X-DB-Duplicate-Queries"] = recorder.duplicate_count
+        response["X-DB-Query-Time-Ms"] = f"{recorder.total_time * 1000:.2f}"
+        return response
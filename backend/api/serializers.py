@@ -1,8 +1,13 @@
 from django.urls import reverse
 from rest_framework.serializers import CharField, ModelSerializer, \
-    SerializerMethodField, DateTimeField
-from rest_framework_recursive.fields import RecursiveField
+    SerializerMethodField, DateTimeField, Serializer, ChoiceField, \
+    DictField, BooleanField, FileField, ValidationError
+from card_types.card_managers import type_managers
+from card_types.models import CardNote
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    duplicate_policies
 from cards.models import Card, Image, CardUserData, Category
+from jobs.models import Job
 
 class ImageSerializer(ModelSerializer):
     class Meta:
@@ -20,7 +25,20 @@ class CategoryForCardSerializer(ModelSerializer):
 
 
 class CategorySerializer(CategoryForCardSerializer):
-    children = RecursiveField(many=True, source="sub_categories")
+    children = SerializerMethodField()
+
+    def get_children(self, category):
+        """Sub-categories are taken from the "sub_categories" mapping
+        (see Category.get_sub_categories()) passed in the context, if
+        available - otherwise they are queried for each category.
+        """
+        sub_categories = self.context.get("sub_categories")
+        if sub_categories is None:
+            children = category.sub_categories.all()
+        else:
+            children = sub_categories.get(category.id, [])
+        return CategorySerializer(children, many=True,
+                                  context=self.context).data
 
     class Meta:
         model = Category
@@ -70,8 +88,8 @@ class CrammedCardReviewDataSerializer(ModelSerializer):
         cram-queued and which in turn may be used for removing card from cram.
         """
         return reverse("cram_single_card",
-                       kwargs={"card_pk": obj.card.id,
-                               "user_id": obj.user.id})
+                       kwargs={"card_pk": obj.card_id,
+                               "user_id": obj.user_id})
 
     class Meta:
         model = CardUserData
@@ -90,7 +108,7 @@ class CardReviewDataSerializer(CrammedCardReviewDataSerializer):
         """Returns reviews simulation for currently scheduled cards only.
         """
         if obj.current_real_interval > 0:
-            return obj.card.simulate_reviews(user=obj.user)
+            return obj.card.simulate_reviews(user=obj.user, review_data=obj)
 
     def get_cram_link(self, obj):
         if not obj.crammed:
@@ -145,7 +163,7 @@ class AllCardsSerializer(CardUserNoReviewDataSerializer):
             return None
         return reverse("cram_single_card",
                        kwargs={"card_pk": card.id,
-                               "user_id": card_user_data.user.id})
+                               "user_id": card_user_data.user_id})
 
     def get_easiness_factor(self, card: Card):
         return self.get_card_field(card, "easiness_factor")
@@ -181,9 +199,13 @@ class AllCardsSerializer(CardUserNoReviewDataSerializer):
         return self.get_card_field(card, "computed_interval")
 
     def get_card_user_data(self, card):
-        user = self.get_user()
-        self.card_user_data = CardUserData.objects.filter(
-            card=card, user=user).first()
+        if hasattr(card, "user_review_data"):
+            # prefetched by the view (list of at most one element)
+            self.card_user_data = next(iter(card.user_review_data), None)
+        else:
+            user = self.get_user()
+            self.card_user_data = CardUserData.objects.filter(
+                card=card, user=user).first()
         return self.card_user_data
 
     def get_user(self):
@@ -210,3 +232,49 @@ class AllCardsSerializer(CardUserNoReviewDataSerializer):
                             "total_reviews", "last_reviewed", "introduced_on",
                             "review_date", "grade", "reviews",
                             "easiness_factor", "cram_link",)
+
+
+class NoteDataSerializer(Serializer):
+    """Validates a description of a note created from a batch.
+    """
+    card_type = ChoiceField(choices=list(type_managers))
+    card_description = DictField()
+
+
+class CardNoteSerializer(ModelSerializer):
+    class Meta:
+        model = CardNote
+        fields = ("id", "card_type", "metadata",)
+        read_only_fields = ("id", "card_type", "metadata",)
+
+
+class JobSerializer(ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ("id", "kind", "arguments", "status", "created_on",
+                  "started_on", "finished_on", "heartbeat", "progress",
+                  "total", "attempts", "cancel_requested", "result",)
+        read_only_fields = ("id", "status", "created_on", "started_on",
+                            "finished_on", "heartbeat", "progress", "total",
+                            "attempts", "cancel_requested", "result",)
+
+
+class FullRecallUploadSerializer(Serializer):
+    """Validates an upload of a FullRecall archive (a zip of elements.xml
+    and media files).
+
+    Cards are shared by all users, so only staff may have existing cards
+    merged with or updated from imported items.
+    """
+    archive = FileField()
+    memorized = BooleanField(default=False)
+    duplicate_policy = ChoiceField(choices=duplicate_policies,
+                                   default="skip")
+
+    def validate_duplicate_policy(self, duplicate_policy):
+        request = self.context.get("request")
+        if duplicate_policy != "skip" \
+                and not (request and request.user.is_staff):
+            raise ValidationError(
+                "Only staff can merge or update existing cards.")
+        return duplicate_policy
@@ -1,16 +1,34 @@
 import json
+import os
+import tempfile
 import uuid
+import zipfile
+from io import BytesIO
 from math import ceil
+from unittest.mock import patch
 import time_machine
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.test import TestCase, override_settings
 from datetime import date, timedelta
 from datetime import datetime
 from random import choice, shuffle, randint
-from cards.models import Card, CardImage, CardTemplate, Category, CardUserData
+from django.core.cache import cache
+from django.utils import timezone
+from cards.models import Card, CardImage, CardTemplate, Category, \
+    CardUserData, ReviewLog, Sound
+from cards.management.fr_importer.items_importer.tests.test_fr_archive \
+    import fdb_path, make_archive
+from jobs.models import Job
+from jobs.runner import run_job
 from rest_framework import status
+from .utils.api_benchmark import ApiBenchmark, compare_reports
 from .utils.helpers import add_url_params
+from .utils.identity_map import ReviewDataMap
+from .utils.query_budget import QueryBudgetMixin, QueryRecorder
+from .utils.uploads import LimitedUploadHandler, UploadRateThrottle
 
 if __name__ == "__main__" and __package__ is None:
     # overcoming sibling module imports problem
@@ -194,6 +212,90 @@ class TestBackendCards(ApiTestHelpers):
                             categories_from_response[1]["title"])
 
 
+class CreatingNotesBatch(ApiTestHelpers):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.category = fake_data_objects.make_fake_category()
+        self.notes = [{"card_type": "front-back-back-front",
+                       "card_description": {
+                           "_front": {"text": f"front {number}"},
+                           "_back": {"text": f"back {number}"},
+                           "categories": [str(self.category.id)]}}
+                      for number in range(3)]
+
+    def post_notes(self, notes):
+        return self.client.post(reverse("notes_batch"), data=notes,
+                                format="json")
+
+    def test_creating_notes(self):
+        response = self.post_notes(self.notes)
+        note_ids = {note["id"] for note in response.json()}
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(note_ids), 3)
+        self.assertEqual(Card.objects.filter(
+            note_id__in=note_ids, categories=self.category).count(), 6)
+
+    def test_unauthenticated(self):
+        response = APIClient().post(reverse("notes_batch"),
+                                    data=self.notes, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_not_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.post_notes(self.notes)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Card.objects.exists())
+
+    def test_invalid_card_type(self):
+        self.notes[1]["card_type"] = "invalid-type"
+        response = self.post_notes(self.notes)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Card.objects.exists())
+
+    def test_missing_category(self):
+        self.notes[2]["card_description"]["categories"] = [
+            str(uuid.uuid4())]
+        response = self.post_notes(self.notes)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["index"], 2)
+        self.assertFalse(Card.objects.exists())
+
+    def test_side_not_dict(self):
+        self.notes[1]["card_description"]["_front"] = "x"
+        response = self.post_notes(self.notes)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["index"], 1)
+        self.assertFalse(Card.objects.exists())
+
+    def test_images_not_list(self):
+        self.notes[2]["card_description"]["_front"]["images"] = 5
+        response = self.post_notes(self.notes)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["index"], 2)
+        self.assertFalse(Card.objects.exists())
+
+    def test_duplicate_cards(self):
+        response = self.post_notes([self.notes[0], self.notes[0]])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Card.objects.exists())
+
+    def test_not_a_list(self):
+        response = self.post_notes(self.notes[0])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class UserCardsTests(ApiTestHelpers):
     """Tests for cards with user data and rendered content.
     """
@@ -2584,4 +2686,672 @@ class GeneralStatistics(ApiTestHelpers, TestCase):
         self.response = self.client.get(url)
         received_retention_score = self.response.json()["retention_score"]
         expected_retention_score = None
-        self.assertEqual(received_retention_score, expected_retention_score)
\ No newline at end of file
+        self.assertEqual(received_retention_score, expected_retention_score)
+
+
+class ReviewStatistics(ApiTestHelpers):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse("review_statistics",
+                           kwargs={"user_id": self.user.id})
+        self.first_card, self.second_card = \
+            fake_data_objects.make_fake_cards(2)
+        with time_machine.travel(date(2023, 3, 1)):
+            for card in (self.first_card, self.second_card):
+                card.memorize(self.user)
+        # Wednesday
+        self.today = timezone.make_aware(datetime(2023, 3, 15, 12))
+        for card, reviewed_on, grade in (
+                (self.first_card, datetime(2023, 3, 10, 12), 4),
+                (self.first_card, datetime(2023, 3, 14, 12), 1),
+                (self.second_card, datetime(2023, 3, 14, 12), 2),
+                (self.first_card, datetime(2023, 3, 15, 10), 5)):
+            self.log_review(card, timezone.make_aware(reviewed_on), grade)
+
+    def log_review(self, card, reviewed_on, grade):
+        ReviewLog(card=card, user=self.user, reviewed_on=reviewed_on,
+                  grade=grade, interval_before=1, interval_after=1,
+                  easiness_before=2.5, easiness_after=2.5).save()
+
+    def get_statistics(self, **params):
+        with time_machine.travel(self.today, tick=False):
+            return self.client.get(add_url_params(self.url, params))
+
+    def test_daily_buckets(self):
+        response = self.get_statistics(**{"days-range": 7})
+        statistics = response.json()["statistics"]
+        buckets = {bucket["date"]: bucket for bucket in statistics}
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([bucket["date"] for bucket in statistics],
+                         [str(date(2023, 3, day)) for day in range(9, 16)])
+        self.assertDictEqual(buckets["2023-03-10"], {
+            "date": "2023-03-10", "reviews": 1, "lapses": 0,
+            "retention": 100, "time_to_lapse": None})
+        self.assertDictEqual(buckets["2023-03-14"], {
+            "date": "2023-03-14", "reviews": 2, "lapses": 2,
+            "retention": 0, "time_to_lapse": 8.75})
+        self.assertDictEqual(buckets["2023-03-11"], {
+            "date": "2023-03-11", "reviews": 0, "lapses": 0,
+            "retention": None, "time_to_lapse": None})
+
+    def test_summary(self):
+        summary = self.get_statistics(**{"days-range": 7}).json()["summary"]
+
+        self.assertDictEqual(summary, {"reviews": 4, "lapses": 2,
+                                       "retention": 50,
+                                       "time_to_lapse": 8.75})
+
+    def test_time_to_lapse(self):
+        """Time-to-lapse counts from the previous review or, for the
+        first review, from the card's memorization.
+        """
+        self.log_review(self.first_card,
+                        timezone.make_aware(datetime(2023, 3, 15, 11)), 0)
+        statistics = self.get_statistics(**{"days-range": 1}).json()
+
+        self.assertEqual(statistics["statistics"][0]["time_to_lapse"],
+                         round(1 / 24, 2))
+        self.assertEqual(statistics["summary"]["retention"], 50)
+
+    def test_weekly_buckets(self):
+        response = self.get_statistics(period="weekly",
+                                       **{"days-range": 14})
+        statistics = response.json()["statistics"]
+
+        self.assertEqual(response.json()["period"], "weekly")
+        self.assertEqual([bucket["date"] for bucket in statistics],
+                         ["2023-02-27", "2023-03-06", "2023-03-13"])
+        self.assertEqual([bucket["reviews"] for bucket in statistics],
+                         [0, 1, 3])
+        self.assertEqual(statistics[2]["retention"], 33.33)
+
+    def test_other_users_reviews(self):
+        other_user = fake_data_objects.make_fake_user()
+        ReviewLog(card=self.first_card, user=other_user,
+                  reviewed_on=self.today, grade=0, interval_before=1,
+                  interval_after=1, easiness_before=2.5,
+                  easiness_after=2.5).save()
+        summary = self.get_statistics().json()["summary"]
+
+        self.assertEqual(summary["reviews"], 4)
+
+    def test_invalid_parameters(self):
+        for params in ({"period": "monthly"}, {"days-range": "abc"},
+                       {"days-range": -1}, {"days-range": 1000}):
+            response = self.get_statistics(**params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST, params)
+
+    def test_cached(self):
+        """Repeated request doesn't query the review history.
+        """
+        first_response = self.get_statistics()
+        with QueryRecorder() as recorder:
+            second_response = self.get_statistics()
+
+        self.assertEqual(first_response.json(), second_response.json())
+        self.assertFalse([query for query in recorder.queries
+                          if "cards_reviewlog" in query["sql"]])
+
+    def test_cache_invalidated_by_review(self):
+        self.get_statistics()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log_review(self.second_card, self.today, 5)
+        summary = self.get_statistics().json()["summary"]
+
+        self.assertEqual(summary["reviews"], 5)
+
+    def test_other_user_forbidden(self):
+        other_user = fake_data_objects.make_fake_user()
+        url = reverse("review_statistics", kwargs={"user_id": other_user.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReviewDataQueryCount(ApiTestHelpers):
+    """Number of queries issued by endpoints operating on a single
+    user's review data (CardUserData) row.
+    """
+    def setUp(self):
+        super().setUp()
+        self.card = fake_data_objects.make_fake_card()
+        self.review_data = self.card.memorize(self.user)
+
+    def memorized_card_url(self):
+        return reverse("memorized_card", kwargs={"pk": self.card.id,
+                                                 "user_id": self.user.id})
+
+    def cram_single_card_url(self):
+        return reverse("cram_single_card",
+                       kwargs={"card_pk": self.card.id,
+                               "user_id": self.user.id})
+
+    def test_memorized_card_get(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(self.memorized_card_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_memorized_card_get_not_found(self):
+        url = reverse("memorized_card", kwargs={"pk": uuid.uuid4(),
+                                                "user_id": self.user.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_memorized_card_patch(self):
+        # includes the review log insert and a savepoint around it
+        with time_machine.travel(self.review_data.review_date):
+            with self.assertNumQueries(10):
+                response = self.client.patch(
+                    self.memorized_card_url(),
+                    json.dumps({"grade": 3}),
+                    content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_memorized_card_delete(self):
+        with self.assertNumQueries(2):
+            response = self.client.delete(self.memorized_card_url())
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_memorized_card_delete_not_memorized(self):
+        self.review_data.delete()
+        with self.assertNumQueries(2):
+            response = self.client.delete(self.memorized_card_url())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_queued_card_patch(self):
+        card = fake_data_objects.make_fake_card()
+        url = reverse("queued_card", kwargs={"pk": card.id,
+                                             "user_id": self.user.id})
+        with self.assertNumQueries(6):
+            response = self.client.patch(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cram_queue_put(self):
+        url = reverse("cram_queue", kwargs={"user_id": self.user.id})
+        with self.assertNumQueries(5):
+            response = self.client.put(url, data={"card_pk": self.card.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cram_queue_put_not_memorized(self):
+        card = fake_data_objects.make_fake_card()
+        url = reverse("cram_queue", kwargs={"user_id": self.user.id})
+        with self.assertNumQueries(2):
+            response = self.client.put(url, data={"card_pk": card.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cram_single_card_delete(self):
+        self.review_data.add_to_cram()
+        with self.assertNumQueries(2):
+            response = self.client.delete(self.cram_single_card_url())
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_identity_map(self):
+        """Repeated lookups within a request return the same instances
+        without hitting the database again.
+        """
+        review_data_map = ReviewDataMap(self.user)
+        with self.assertNumQueries(1):
+            review_data = review_data_map.get_review_data(self.card.id)
+            same_review_data = review_data_map.get_review_data(
+                str(self.card.id))
+            card = review_data_map.get_card_or_404(self.card.id)
+
+        self.assertIs(review_data, same_review_data)
+        self.assertIs(review_data.card, card)
+        self.assertIs(review_data.user, self.user)
+
+
+class QueryBudgets(QueryBudgetMixin, ApiTestHelpers):
+    """Upper limits for the number of queries issued by list and statistics
+    endpoints. Apart from rendering card bodies (looking up "fallback.html"
+    and "_base.html" through the CardTemplateLoader for each card), budgets
+    do not depend on the number of cards, categories or review data rows.
+    Images of the cards listed are prefetched (with one query).
+    """
+    number_of_cards = 8
+    queries_per_rendered_card = 2
+
+    def setUp(self):
+        super().setUp()
+        root_category = Category.objects.create(name="root")
+        categories = [root_category]
+        for name in ("first", "second", "third"):
+            category = Category.objects.create(name=name,
+                                               parent=root_category)
+            categories.extend([category, *(
+                Category.objects.create(name=f"{name} {number}",
+                                        parent=category)
+                for number in range(2))])
+        self.user.selected_categories.set([root_category])
+        self.cards = fake_data_objects.make_fake_cards(self.number_of_cards)
+        for number, card in enumerate(self.cards):
+            card.categories.set(categories[number::self.number_of_cards])
+        self.memorized_cards = self.cards[::2]
+        for grade, card in enumerate(self.memorized_cards, 2):
+            review_data = card.memorize(self.user, grade=grade)
+            review_data.review_date = date.today()
+            review_data.save()
+        self.memorized_cards[0].review(self.user, grade=1)
+
+    def get_within_budget(self, url, max_queries, max_duplicates=0):
+        with self.assertQueryBudget(max_queries, max_duplicates):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def rendering_budget(self, number_of_cards):
+        """Returns number of queries (and duplicates) spent on rendering
+        bodies of the given number of cards.
+        """
+        queries = number_of_cards * self.queries_per_rendered_card
+        duplicates = queries - self.queries_per_rendered_card
+        return queries, duplicates
+
+    def distribution_url(self, dynamic_part, days_range=None):
+        url = reverse("distribution_dynamic_part",
+                      kwargs={"user_id": self.user.id,
+                              "dynamic_part": dynamic_part})
+        if days_range is not None:
+            url = add_url_params(url, {"days-range": days_range})
+        return url
+
+    def test_all_cards(self):
+        rendering, duplicates = self.rendering_budget(len(self.cards))
+        response = self.get_within_budget(reverse_all_cards(self.user.id),
+                                          7 + rendering, duplicates)
+        self.assertEqual(response.json()["count"], self.number_of_cards)
+
+    def test_memorized_cards(self):
+        rendering, duplicates = self.rendering_budget(
+            len(self.memorized_cards))
+        self.get_within_budget(reverse_memorized_cards(self.user.id),
+                               6 + rendering, duplicates)
+
+    def test_queued_cards(self):
+        rendering, duplicates = self.rendering_budget(
+            self.number_of_cards - len(self.memorized_cards))
+        self.get_within_budget(reverse_queued_cards(self.user.id),
+                               6 + rendering, duplicates)
+
+    def test_outstanding_cards(self):
+        rendering, duplicates = self.rendering_budget(
+            len(self.memorized_cards) - 1)
+        response = self.get_within_budget(
+            reverse_outstanding_cards(self.user.id),
+            6 + rendering, duplicates)
+        self.assertEqual(response.json()["count"],
+                         len(self.memorized_cards) - 1)
+
+    def test_cram_queue(self):
+        crammed_cards = CardUserData.objects.filter(
+            user=self.user, crammed=True).count()
+        rendering, duplicates = self.rendering_budget(crammed_cards)
+        self.get_within_budget(reverse_cram(self.user.id),
+                               4 + rendering, duplicates)
+
+    def test_user_categories(self):
+        self.get_within_budget(
+            reverse("user_categories", kwargs={"user_id": self.user.id}), 2)
+
+    def test_cards_distribution(self):
+        self.get_within_budget(self.distribution_url(
+            "daily-cards", CardUserData.MAX_DISTRIBUTION_RANGE), 3)
+
+    def test_memorization_distribution(self):
+        self.get_within_budget(self.distribution_url(
+            "memorized", CardUserData.MAX_DISTRIBUTION_RANGE), 3)
+
+    def test_grades_distribution(self):
+        self.get_within_budget(self.distribution_url("grades"), 1)
+
+    def test_efactor_distribution(self):
+        self.get_within_budget(self.distribution_url("e-factor"), 1)
+
+    def test_general_statistics(self):
+        self.get_within_budget(
+            reverse("general_statistics", kwargs={"user_id": self.user.id}),
+            4)
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                list(Card.objects.all())
+                list(Category.objects.all())
+
+    def test_duplicates_budget_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(2, max_duplicates=0):
+                list(Card.objects.all())
+                list(Card.objects.all())
+
+    def test_query_recorder(self):
+        with QueryRecorder() as recorder:
+            list(Card.objects.all())
+            list(Card.objects.all())
+            list(Category.objects.all())
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicate_count, 1)
+        self.assertGreater(recorder.total_time, 0)
+
+    @override_settings(DEBUG=True)
+    def test_query_headers_in_debug_mode(self):
+        response = self.client.get(
+            reverse("user_categories", kwargs={"user_id": self.user.id}))
+
+        self.assertEqual(response["X-DB-Query-Count"], "2")
+        self.assertEqual(response["X-DB-Duplicate-Queries"], "0")
+        self.assertGreater(float(response["X-DB-Query-Time-Ms"]), 0)
+
+    def test_no_query_headers(self):
+        response = self.client.get(
+            reverse("user_categories", kwargs={"user_id": self.user.id}))
+
+        self.assertFalse(response.has_header("X-DB-Query-Count"))
+
+
+class UserJobsApi(ApiTestHelpers):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("user_jobs", kwargs={"user_id": self.user.id})
+
+    def test_list(self):
+        job = Job.enqueue("make_image_derivatives", user=self.user)
+        Job.enqueue("make_image_derivatives",
+                    user=fake_data_objects.make_fake_user())
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([job_data["id"] for job_data
+                              in response.json()["results"]], [str(job.id)])
+
+    def test_starting_job(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(
+            self.url, data={"kind": "make_image_derivatives"},
+            format="json")
+
+        self.assertEqual(response.status_code, 201)
+        job = Job.objects.get(user=self.user)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(response["Location"], reverse(
+            "user_job", kwargs={"user_id": self.user.id, "pk": job.id}))
+
+    def test_staff_only_job(self):
+        response = self.client.post(
+            self.url, data={"kind": "make_image_derivatives"},
+            format="json")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Job.objects.exists())
+
+    def test_invalid_job(self):
+        self.user.is_staff = True
+        self.user.save()
+        unknown_kind = self.client.post(self.url, data={"kind": "unknown"},
+                                        format="json")
+        invalid_arguments = self.client.post(
+            self.url, data={"kind": "import_fr_cards",
+                            "arguments": {"elements_path": "none.xml"}},
+            format="json")
+
+        self.assertEqual(unknown_kind.status_code, 400)
+        self.assertEqual(invalid_arguments.status_code, 400)
+        self.assertIn("elements_path", invalid_arguments.json()["detail"])
+
+    def test_status(self):
+        job = Job.enqueue("make_image_derivatives", user=self.user)
+        other_job = Job.enqueue("make_image_derivatives",
+                                user=fake_data_objects.make_fake_user())
+
+        response = self.client.get(reverse(
+            "user_job", kwargs={"user_id": self.user.id, "pk": job.id}))
+        self.assertEqual(response.json()["status"], Job.QUEUED)
+        response = self.client.get(reverse(
+            "user_job", kwargs={"user_id": self.user.id,
+                                "pk": other_job.id}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cancelling(self):
+        job = Job.enqueue("make_image_derivatives", user=self.user)
+        url = reverse("user_job",
+                      kwargs={"user_id": self.user.id, "pk": job.id})
+
+        response = self.client.delete(url)
+        self.assertEqual(response.json()["status"], Job.CANCELLED)
+        self.assertEqual(self.client.delete(url).status_code, 409)
+
+
+class UserImportsApi(ApiTestHelpers):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            FULLRECALL_UPLOADS_ROOT=os.path.join(self.directory.name,
+                                                 "uploads"),
+            MEDIA_ROOT=os.path.join(self.directory.name, "media"))
+        self.settings_override.enable()
+        self.url = reverse("user_imports", kwargs={"user_id": self.user.id})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def upload(self, contents: bytes, **data):
+        archive = SimpleUploadedFile("fdb.zip", contents,
+                                     content_type="application/zip")
+        return self.client.post(self.url, data={"archive": archive, **data},
+                                format="multipart")
+
+    def test_importing(self):
+        response = self.upload(make_archive(), memorized=True)
+
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(user=self.user)
+        archive_path = job.arguments["archive_path"]
+        self.assertTrue(os.path.isfile(archive_path))
+        self.assertEqual(response["Location"], reverse(
+            "user_job", kwargs={"user_id": self.user.id, "pk": job.id}))
+
+        Job.claim()
+        self.assertEqual(run_job(job.id), Job.SUCCEEDED)
+        self.assertEqual(Card.objects.filter(
+            reviewing_users=self.user).count(), 3)
+        self.assertFalse(os.listdir(os.path.dirname(archive_path)))
+        self.assertEqual(len(self.client.get(self.url).json()["results"]),
+                         1)
+
+    def test_media_outside_archive(self):
+        """
+        Items referring to files outside the extracted archive (by
+        absolute or relative paths) aren't imported.
+        """
+        secret_path = os.path.join(self.directory.name, "secret.txt")
+        with open(secret_path, "w") as secret_file:
+            secret_file.write("secret")
+        items = "".join(
+            f'<item id="{number}" tmtrpt="6411" stmtrpt="6411" livl="268" '
+            f'rllivl="271" ivl="33" rp="12" gr="1"><q>question {number}</q>'
+            f'<a><![CDATA[answer<snd>{sound_path}</snd>]]></a></item>'
+            for number, sound_path in enumerate(
+                [secret_path, "../../secret.txt",
+                 "snds/english_examples_0609.mp3"]))
+        elements = ('<fullrecall time_of_start="1186655166">'
+                    f'<category name="category">{items}</category>'
+                    '</fullrecall>')
+        archive_file = BytesIO()
+        with zipfile.ZipFile(archive_file, "w") as archive:
+            archive.writestr("fdb/elements.xml", elements)
+            archive.write(os.path.join(
+                fdb_path, "snds", "english_examples_0609.mp3"),
+                "fdb/snds/english_examples_0609.mp3")
+        response = self.upload(archive_file.getvalue())
+        job = Job.objects.get(pk=response.json()["id"])
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.SUCCEEDED, job.result)
+        self.assertIn("Not imported (2)", job.result)
+        self.assertEqual(Card.objects.count(), 1)
+        self.assertEqual(Sound.objects.count(), 1)
+
+    def test_external_entity(self):
+        """
+        Entities in an uploaded elements.xml don't pull contents of
+        server files into cards.
+        """
+        secret_path = os.path.join(self.directory.name, "secret.txt")
+        with open(secret_path, "w") as secret_file:
+            secret_file.write("SECRET-CONTENT")
+        elements = (f'<!DOCTYPE fullrecall [<!ENTITY e SYSTEM '
+                    f'"file://{secret_path}">]>'
+                    '<fullrecall time_of_start="1186655166">'
+                    '<category name="category"><item id="1" tmtrpt="6411" '
+                    'stmtrpt="6411" livl="268" rllivl="271" ivl="33" '
+                    'rp="12" gr="1"><q>hello &e;</q><a>answer</a></item>'
+                    '</category></fullrecall>')
+        archive_file = BytesIO()
+        with zipfile.ZipFile(archive_file, "w") as archive:
+            archive.writestr("elements.xml", elements)
+        response = self.upload(archive_file.getvalue())
+        job = Job.objects.get(pk=response.json()["id"])
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.SUCCEEDED, job.result)
+        card = Card.objects.get()
+        self.assertIn("hello", card.front)
+        self.assertNotIn("SECRET-CONTENT", card.front)
+
+    def test_duplicate_policy_staff_only(self):
+        for duplicate_policy in ("update", "merge"):
+            response = self.upload(make_archive(),
+                                   duplicate_policy=duplicate_policy)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("duplicate_policy", response.json())
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(
+            self.directory.name, "uploads")))
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.upload(make_archive(), duplicate_policy="update")
+        self.assertEqual(response.status_code, 202)
+
+    def test_archive_job_arguments(self):
+        """
+        Archive imports started through the jobs API are limited to
+        uploaded archives (which are removed afterwards).
+        """
+        self.user.is_staff = True
+        self.user.save()
+        archive_path = os.path.join(self.directory.name, "archive.zip")
+        with open(archive_path, "wb") as archive_file:
+            archive_file.write(make_archive())
+        response = self.client.post(
+            reverse("user_jobs", kwargs={"user_id": self.user.id}),
+            data={"kind": "import_fr_archive",
+                  "arguments": {"archive_path": archive_path}},
+            format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(os.path.isfile(archive_path))
+
+    def test_invalid_archive(self):
+        response = self.upload(b"not a zip")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.directory.name,
+                                                 "uploads")))
+
+    def test_no_archive(self):
+        response = self.client.post(self.url, data={"memorized": True},
+                                    format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_large(self):
+        with override_settings(FULLRECALL_UPLOAD_MAX_SIZE=1000):
+            response = self.upload(make_archive())
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Job.objects.exists())
+
+    def test_upload_handler_limit(self):
+        """
+        Uploads without (or with a false) Content-Length are stopped once
+        they exceed the limit.
+        """
+        handler = LimitedUploadHandler(max_size=10)
+        handler.new_file("archive", "fdb.zip", "application/zip", None)
+        handler.receive_data_chunk(b"x" * 10, 0)
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(b"x", 10)
+        handler.file.close()
+
+        self.assertTrue(handler.size_exceeded)
+
+    def test_rate_limit(self):
+        with patch.object(UploadRateThrottle, "THROTTLE_RATES",
+                          {"uploads": "1/hour"}):
+            self.assertEqual(self.upload(make_archive()).status_code, 202)
+            self.assertEqual(self.upload(make_archive()).status_code, 429)
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class ApiBenchmarkRun(ApiTestHelpers):
+    def setUp(self):
+        super().setUp()
+        # staff routes are benchmarked too
+        self.user.is_staff = True
+        self.user.save()
+        cards = fake_data_objects.make_fake_cards(4)
+        cards[0].memorize(self.user, grade=2)
+        review_data = cards[1].memorize(self.user)
+        review_data.review_date = date.today()
+        review_data.save()
+        Job.enqueue("make_image_derivatives", user=self.user)
+        self.api_benchmark = ApiBenchmark(self.user, repetitions=2,
+                                          warmup=0)
+
+    def test_all_routes_benchmarked(self):
+        report = self.api_benchmark.run()
+
+        self.assertFalse(report["not_benchmarked"])
+        for name, result in report["results"].items():
+            self.assertLess(result["status_code"], 300, name)
+            if not name.endswith("(cached)"):
+                self.assertGreater(result["queries"], 0, name)
+            self.assertLessEqual(result["time_ms"]["min"],
+                                 result["time_ms"]["max"])
+
+    def test_requests_rolled_back(self):
+        self.api_benchmark.run()
+
+        self.assertEqual(CardUserData.objects.filter(user=self.user).count(),
+                         2)
+
+    def test_default_user(self):
+        fake_data_objects.make_fake_user()
+
+        self.assertEqual(ApiBenchmark.get_default_user(), self.user)
+
+    def test_compare_reports(self):
+        report = {"results": {"GET all_cards": {
+            "time_ms": {"median": 20}, "queries": 10}}}
+        baseline = {"results": {"GET all_cards": {
+            "time_ms": {"median": 40}, "queries": 30}}}
+
+        self.assertEqual(list(compare_reports(baseline, report)),
+                         [("GET all_cards", 40, 20, 30, 10)])
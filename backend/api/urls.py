@@ -3,13 +3,16 @@ from .views import (SingleCardForBackendView, ListCardsForBackendView,
                     MemorizedCards, QueuedCards, CramQueue,
                     OutstandingCards, CramSingleCard, QueuedCard,
                     MemorizedCard, UserCategories, SelectedCategories,
-                    AllCards, Distribution, GeneralStatistics)
+                    AllCards, Distribution, GeneralStatistics,
+                    ReviewStatistics, NotesBatch, UserJobs, UserJob,
+                    UserImports)
 
 urlpatterns = [
     path("staff/cards/", ListCardsForBackendView.as_view(),
          name="list_cards"),
     path("staff/cards/<uuid:pk>", SingleCardForBackendView.as_view(),
          name="single_card"),
+    path("staff/notes/", NotesBatch.as_view(), name="notes_batch"),
     path("users/<uuid:user_id>/cards/", AllCards.as_view(),
          name="all_cards"),
     path("users/<uuid:user_id>/cards/memorized/", MemorizedCards.as_view(),
@@ -42,5 +45,14 @@ urlpatterns = [
          name="distribution_dynamic_part"),
     path("users/<uuid:user_id>/cards/general-statistics/",
          GeneralStatistics.as_view(),
-         name="general_statistics")
+         name="general_statistics"),
+    path("users/<uuid:user_id>/cards/review-statistics/",
+         ReviewStatistics.as_view(),
+         name="review_statistics"),
+    path("users/<uuid:user_id>/jobs/", UserJobs.as_view(),
+         name="user_jobs"),
+    path("users/<uuid:user_id>/jobs/<uuid:pk>", UserJob.as_view(),
+         name="user_job"),
+    path("users/<uuid:user_id>/imports/", UserImports.as_view(),
+         name="user_imports")
 ]
@@ -0,0 +1,239 @@
+import datetime
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cards.models import Card, CardUserData, Category
+from cards.utils.statistics_cache import invalidate_review_statistics
+from jobs.models import Job
+from .query_budget import QueryRecorder
+from ..urls import urlpatterns
+
+User = get_user_model()
+
+
+@dataclass
+class BenchmarkCase:
+    route: str
+    method: str = "get"
+    kwargs: Dict = field(default_factory=dict)
+    data: Optional[Dict | list] = None
+    # distinguishes cases of the same route and method
+    variant: str = ""
+    # drop the user's cached statistics before every request
+    uncached: bool = False
+
+    @property
+    def name(self):
+        name = f"{self.method.upper()} {self.route}"
+        return f"{name} ({self.variant})" if self.variant else name
+
+
+class ApiBenchmark:
+    """Times requests to routes defined in api/urls.py on behalf of a user
+    and collects the numbers of queries they issue.
+
+    Every request is executed in a transaction which is rolled back
+    afterwards, so that requests modifying data (reviewing, memorizing,
+    cramming cards etc.) can be repeated with comparable results.
+    Staff-only routes are timed (rather than just refused) for staff
+    users only.
+    """
+
+    def __init__(self, user, repetitions=5, warmup=1):
+        self.user = user
+        self.repetitions = repetitions
+        self.warmup = warmup
+        self.client = APIClient(SERVER_NAME="localhost")
+        self.client.force_authenticate(user=user)
+
+    @staticmethod
+    def get_default_user():
+        """Returns the user with the largest number of memorized cards.
+        """
+        return User.objects.annotate(
+            memorized=Count("memorized_cards")).order_by("-memorized").first()
+
+    def get_cases(self):
+        user_id = self.user.id
+        review_data = CardUserData.objects.filter(user=self.user)
+        memorized = review_data.first()
+        outstanding = review_data.filter(
+            review_date__lte=datetime.date.today()).first()
+        crammed = review_data.filter(crammed=True).first()
+        queued = Card.objects.exclude(reviewing_users=self.user).first()
+        any_card = memorized and memorized.card or queued
+        job = Job.objects.filter(user=self.user).order_by(
+            "-created_on").first()
+        selected_categories = [str(category.id) for category in
+                               Category.objects.filter(parent=None)]
+
+        notes = [{"card_type": "front-back-back-front",
+                  "card_description": {
+                      "_front": {"text": f"benchmark front {number}"},
+                      "_back": {"text": f"benchmark back {number}"},
+                      "categories": selected_categories[:1]}}
+                 for number in range(50)]
+
+        cases = [BenchmarkCase("list_cards"),
+                 BenchmarkCase("notes_batch", "post", data=notes),
+                 BenchmarkCase("user_categories", kwargs={"user_id": user_id}),
+                 BenchmarkCase("selected_categories",
+                               kwargs={"user_id": user_id}),
+                 BenchmarkCase("selected_categories", "put",
+                               kwargs={"user_id": user_id},
+                               data=selected_categories),
+                 BenchmarkCase("general_statistics",
+                               kwargs={"user_id": user_id}),
+                 BenchmarkCase("distribution", kwargs={"user_id": user_id}),
+                 BenchmarkCase("review_statistics",
+                               kwargs={"user_id": user_id},
+                               variant="cached"),
+                 BenchmarkCase("review_statistics",
+                               kwargs={"user_id": user_id},
+                               variant="uncached", uncached=True),
+                 BenchmarkCase("user_jobs", kwargs={"user_id": user_id}),
+                 BenchmarkCase("user_imports", kwargs={"user_id": user_id})]
+        cases.extend(BenchmarkCase("distribution_dynamic_part",
+                                   kwargs={"user_id": user_id,
+                                           "dynamic_part": dynamic_part},
+                                   variant=dynamic_part)
+                     for dynamic_part in ("daily-cards", "memorized",
+                                          "grades", "e-factor"))
+        cases.extend(BenchmarkCase(route, kwargs={"user_id": user_id})
+                     for route in ("all_cards", "memorized_cards",
+                                   "outstanding_cards", "queued_cards",
+                                   "cram_queue"))
+        if any_card:
+            cases.append(BenchmarkCase("single_card",
+                                       kwargs={"pk": any_card.id}))
+        if memorized:
+            memorized_card = {"user_id": user_id, "pk": memorized.card_id}
+            cases.extend([
+                BenchmarkCase("memorized_card", kwargs=memorized_card),
+                BenchmarkCase("memorized_card", "delete",
+                              kwargs=memorized_card),
+                BenchmarkCase("cram_queue", "put", kwargs={"user_id": user_id},
+                              data={"card_pk": str(memorized.card_id)})])
+        if outstanding:
+            cases.append(BenchmarkCase(
+                "memorized_card", "patch",
+                kwargs={"user_id": user_id, "pk": outstanding.card_id},
+                data={"grade": 4}))
+        if crammed:
+            cases.append(BenchmarkCase(
+                "cram_single_card", "delete",
+                kwargs={"user_id": user_id, "card_pk": crammed.card_id}))
+        if queued:
+            queued_card = {"user_id": user_id, "pk": queued.id}
+            cases.extend([
+                BenchmarkCase("queued_card", kwargs=queued_card),
+                BenchmarkCase("queued_card", "patch", kwargs=queued_card,
+                              data={"grade": 4})])
+        if job:
+            user_job = {"user_id": user_id, "pk": job.id}
+            cases.append(BenchmarkCase("user_job", kwargs=user_job))
+            if not job.is_finished:
+                cases.append(BenchmarkCase("user_job", "delete",
+                                           kwargs=user_job))
+        return cases
+
+    def run(self) -> dict:
+        cases = self.get_cases()
+        benchmarked_routes = {case.route for case in cases}
+        return {
+            "generated_on": datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "repetitions": self.repetitions,
+            "corpus": self.get_corpus_summary(),
+            "results": {case.name: self.run_case(case) for case in cases},
+            "not_benchmarked": sorted(
+                pattern.name for pattern in urlpatterns
+                if pattern.name not in benchmarked_routes)
+        }
+
+    def get_corpus_summary(self) -> dict:
+        return {
+            "cards": Card.objects.count(),
+            "categories": Category.objects.count(),
+            "review_data": CardUserData.objects.count(),
+            "user_review_data": CardUserData.objects.filter(
+                user=self.user).count()
+        }
+
+    def run_case(self, case: BenchmarkCase) -> dict:
+        url = reverse(case.route, kwargs=case.kwargs)
+        for _ in range(self.warmup):
+            self._request(case, url)
+        measurements = [self._request(case, url)
+                        for _ in range(self.repetitions)]
+        timings = [measurement["time"] * 1000
+                   for measurement in measurements]
+        last = measurements[-1]
+        return {
+            "url": url,
+            "status_code": last["status_code"],
+            "response_bytes": last["response_bytes"],
+            "queries": last["queries"],
+            "duplicate_queries": last["duplicate_queries"],
+            "sql_time_ms": round(statistics.median(
+                measurement["sql_time"] * 1000
+                for measurement in measurements), 3),
+            "time_ms": {
+                "min": round(min(timings), 3),
+                "median": round(statistics.median(timings), 3),
+                "mean": round(statistics.mean(timings), 3),
+                "p95": round(self._percentile(timings, 95), 3),
+                "max": round(max(timings), 3)
+            }
+        }
+
+    @staticmethod
+    def _percentile(values, percent):
+        values = sorted(values)
+        index = round((len(values) - 1) * percent / 100)
+        return values[index]
+
+    def _request(self, case: BenchmarkCase, url) -> dict:
+        send_request = getattr(self.client, case.method)
+        request_arguments = {} if case.method == "get" \
+            else {"data": case.data, "format": "json"}
+        if case.uncached:
+            invalidate_review_statistics(self.user.id)
+        with transaction.atomic():
+            with QueryRecorder() as recorder:
+                start = time.perf_counter()
+                response = send_request(url, **request_arguments)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return {
+            "time": elapsed,
+            "status_code": response.status_code,
+            "response_bytes": len(response.content),
+            "queries": recorder.count,
+            "duplicate_queries": recorder.duplicate_count,
+            "sql_time": recorder.total_time
+        }
+
+
+def compare_reports(baseline: dict, report: dict):
+    """Yields (case name, baseline median time, median time, baseline
+    number of queries, number of queries) for cases present in both reports.
+    """
+    for name, result in report["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if not baseline_result:
+            continue
+        yield (name,
+               baseline_result["time_ms"]["median"],
+               result["time_ms"]["median"],
+               baseline_result["queries"],
+               result["queries"])
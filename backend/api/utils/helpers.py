@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from urllib import parse
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
 User = get_user_model()
@@ -33,6 +34,22 @@ def extract_from_request_json(request, key, default=None):
     return data
 
 
+def extract_days_range(request, default_range):
+    """Extract days-range from the request's query parameters.
+    """
+    days_range_string = request.query_params.get("days-range", default_range)
+    days_range_wrong_type = "days-range must be a positive number"
+    try:
+        days_range = int(days_range_string)
+    except ValueError:
+        raise ParseError(detail=days_range_wrong_type,
+                         code=status.HTTP_400_BAD_REQUEST)
+    if days_range < 0:
+        raise ParseError(detail=days_range_wrong_type,
+                         code=status.HTTP_400_BAD_REQUEST)
+    return days_range
+
+
 def extract_grade(request):
     return extract_from_request_json(request, "grade", default=4)
 
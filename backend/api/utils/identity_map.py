@@ -0,0 +1,58 @@
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from cards.models import Card, CardUserData
+
+
+class ReviewDataMap:
+    """Request-scoped identity map for Card and CardUserData lookups.
+
+    A user's review row is resolved with a single select_related("card")
+    query keyed on (user_id, card_id); repeated accesses within the same
+    request are served from the map and always return the same instances.
+    """
+    request_attribute = "_review_data_map"
+
+    def __init__(self, user):
+        self._user = user
+        self._cards = {}
+        self._review_data = {}
+
+    @classmethod
+    def for_request(cls, request):
+        identity_map = getattr(request, cls.request_attribute, None)
+        if identity_map is None:
+            identity_map = cls(request.user)
+            setattr(request, cls.request_attribute, identity_map)
+        return identity_map
+
+    def _key(self, card_id):
+        return self._user.id, str(card_id)
+
+    def get_review_data(self, card_id) -> CardUserData | None:
+        key = self._key(card_id)
+        if key not in self._review_data:
+            review_data = CardUserData.objects.select_related("card").filter(
+                user=self._user, card_id=card_id).first()
+            if review_data is not None:
+                # the user is already known - no need to fetch it lazily
+                review_data.user = self._user
+                self._cards[key] = review_data.card
+            self._review_data[key] = review_data
+        return self._review_data[key]
+
+    def get_card_or_404(self, card_id) -> Card:
+        key = self._key(card_id)
+        if key not in self._cards:
+            self._cards[key] = get_object_or_404(Card, id=card_id)
+        return self._cards[key]
+
+    def get_review_data_or_404(self, card_id) -> CardUserData:
+        review_data = self.get_review_data(card_id)
+        if review_data is None:
+            raise Http404
+        return review_data
+
+    def discard(self, card_id):
+        """Drop the (no longer valid) review row from the map.
+        """
+        self._review_data.pop(self._key(card_id), None)
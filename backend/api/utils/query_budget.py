@@ -0,0 +1,80 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class QueryRecorder:
+    """Records SQL statements executed on a database connection together
+    with their parameters and execution time.
+
+    Usage:
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.duplicate_count, recorder.total_time
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({"sql": sql,
+                                 "params": params,
+                                 "time": time.perf_counter() - start})
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duplicate_count(self) -> int:
+        """Number of queries repeating an earlier statement with the same
+        parameters - a typical trace of an N+1 access pattern.
+        """
+        statements = Counter((query["sql"], repr(query["params"]))
+                             for query in self.queries)
+        return sum(number - 1 for number in statements.values())
+
+    @property
+    def total_time(self) -> float:
+        """Total time (in seconds) spent executing the recorded queries.
+        """
+        return sum(query["time"] for query in self.queries)
+
+    def report(self) -> str:
+        return "\n".join(f"{number}. {query['sql']}"
+                         for number, query in enumerate(self.queries, 1))
+
+
+class QueryBudgetMixin:
+    """TestCase mixin failing a test whenever a block of code exceeds
+    the declared number of (duplicate) database queries.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_duplicates=0,
+                          using=DEFAULT_DB_ALIAS):
+        with QueryRecorder(using=using) as recorder:
+            yield recorder
+        if recorder.count > max_queries:
+            self.fail(f"{recorder.count} queries executed, the budget is "
+                      f"{max_queries}:\n{recorder.report()}")
+        if recorder.duplicate_count > max_duplicates:
+            self.fail(f"{recorder.duplicate_count} duplicate queries "
+                      f"executed, the budget is {max_duplicates}:\n"
+                      f"{recorder.report()}")
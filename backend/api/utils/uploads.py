@@ -0,0 +1,32 @@
+from django.core.files.uploadhandler import StopUpload, \
+    TemporaryFileUploadHandler
+from rest_framework.throttling import UserRateThrottle
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploaded files into temporary files (never into memory),
+    chunk by chunk - stopping an upload of a file larger than max_size.
+    """
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.size_exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.max_size is not None \
+                and start + len(raw_data) > self.max_size:
+            self.size_exceeded = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+class UploadRateThrottle(UserRateThrottle):
+    """Limits the number of uploads (POST requests) per user - see
+    the "uploads" rate in DEFAULT_THROTTLE_RATES.
+    """
+    scope = "uploads"
+
+    def allow_request(self, request, view):
+        if request.method != "POST":
+            return True
+        return super().allow_request(request, view)
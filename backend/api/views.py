@@ -1,29 +1,47 @@
 import datetime
+import os
 import uuid
+from django.conf import settings
+from django.core.files.move import file_move_safe
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.db import IntegrityError
+from django.db.models import Q, Prefetch
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from rest_framework import status, filters, serializers
 from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.generics import RetrieveAPIView, ListAPIView, \
     RetrieveUpdateAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from cards.models import Card, CardUserData, Category
+from card_types.card_managers.exceptions import InvalidNoteDescription
+from card_types.models import CardNote
+from cards.management.fr_importer.fr_archive import FullRecallArchive, \
+    InvalidArchive
+from cards.models import Card, CardUserData, Category, ReviewLog
 from cards.utils.exceptions import CardReviewDataExists, \
     CardsDistributionRangeExceeded
+from jobs.models import Job
+from jobs.runner import job_kinds
 from .permissions import UserPermission
 from .serializers import (CardForEditingSerializer, CardReviewDataSerializer,
                           CardUserNoReviewDataSerializer, CategorySerializer,
-                          CrammedCardReviewDataSerializer, AllCardsSerializer)
+                          CrammedCardReviewDataSerializer, AllCardsSerializer,
+                          NoteDataSerializer, CardNoteSerializer,
+                          JobSerializer, FullRecallUploadSerializer)
 from cards.utils.exceptions import ReviewBeforeDue
-from .utils.helpers import extract_grade, no_review_data_response
+from .utils.helpers import extract_days_range, extract_grade, \
+    no_review_data_response
+from .utils.identity_map import ReviewDataMap
+from .utils.uploads import LimitedUploadHandler, UploadRateThrottle
 
 
 class ListAPIAbstractView(ListAPIView):
     query_ordering = None
+    # relations used by the serializer, fetched together with the list
+    related_fields = ()
+    prefetched_fields = ()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -40,9 +58,22 @@ class ListAPIAbstractView(ListAPIView):
         self._user_categories = user.get_user_categories_trees()
         query_set = self.get_base_queryset()
         user_query_set = self.query_set_filter(query_set)
+        if self.related_fields:
+            user_query_set = user_query_set.select_related(
+                *self.related_fields)
+        if self.prefetched_fields:
+            user_query_set = user_query_set.prefetch_related(
+                *self.prefetched_fields)
         return user_query_set.order_by(self.query_ordering)
 
 
+class CardReviewDataListMixin:
+    related_fields = ("card", "card__template", "card__front_audio",
+                      "card__back_audio", "user",)
+    prefetched_fields = ("card__categories",
+                         Card.prefetch_images("card__cardimage_set"),)
+
+
 class ListCardsForBackendView(ListAPIView):
     queryset = Card.objects.all().order_by("created_on")
     serializer_class = CardForEditingSerializer
@@ -53,6 +84,42 @@ class SingleCardForBackendView(RetrieveAPIView):
     serializer_class = CardForEditingSerializer
 
 
+class NotesBatch(APIView):
+    """Creates notes (and their cards) from a list of descriptions,
+    all or none of them.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    max_notes = 5000
+
+    def post(self, request, **kwargs):
+        if not isinstance(request.data, list):
+            raise ParseError(detail="Expected a list of notes.",
+                             code=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.max_notes:
+            raise ParseError(
+                detail=f"At most {self.max_notes} notes can be created "
+                       "at once.",
+                code=status.HTTP_400_BAD_REQUEST)
+        notes_data = NoteDataSerializer(data=request.data, many=True)
+        notes_data.is_valid(raise_exception=True)
+        try:
+            notes = CardNote.create_notes(notes_data.validated_data)
+        except InvalidNoteDescription as e:
+            return Response({
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": f"Invalid note description: {e}",
+                "index": e.index
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response({
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": "Cards created from notes duplicate existing "
+                          "ones (or each other)."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CardNoteSerializer(notes, many=True).data,
+                        status=status.HTTP_201_CREATED)
+
+
 class AllCards(ListAPIView):
     """Returns a single, ordered list of both types of cards:
     memorized and pending.
@@ -63,11 +130,19 @@ class AllCards(ListAPIView):
     serializer_class = AllCardsSerializer
 
     def get_queryset(self):
-        user_categories = self.request.user.get_user_categories_trees()
+        user = self.request.user
+        user_categories = user.get_user_categories_trees()
+        user_review_data = Prefetch(
+            "carduserdata_set",
+            queryset=CardUserData.objects.filter(user=user),
+            to_attr="user_review_data")
         return Card.objects.filter(
             Q(categories__in=user_categories) |
             Q(categories__isnull=True)
-        ).distinct().order_by("created_on")
+        ).distinct().order_by("created_on") \
+            .select_related("template", "front_audio", "back_audio") \
+            .prefetch_related("categories", user_review_data,
+                              Card.prefetch_images())
 
 
 class QueuedCards(ListAPIAbstractView):
@@ -78,6 +153,8 @@ class QueuedCards(ListAPIAbstractView):
     serializer_class = CardUserNoReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
     query_ordering = "created_on"
+    related_fields = ("template", "front_audio", "back_audio",)
+    prefetched_fields = ("categories", Card.prefetch_images(),)
 
     def get_base_queryset(self):
         return Card.objects.exclude(reviewing_users=self.request.user)
@@ -123,7 +200,7 @@ class QueuedCard(RetrieveUpdateAPIView):
         return response
 
 
-class MemorizedCards(ListAPIAbstractView):
+class MemorizedCards(CardReviewDataListMixin, ListAPIAbstractView):
     serializer_class = CardReviewDataSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["card__front", "card__back", "card__template__body"]
@@ -144,30 +221,29 @@ class MemorizedCard(RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, UserPermission]
 
     def get(self, request, **kwargs):
-        card = get_object_or_404(Card, id=kwargs["pk"])
-        card_user_data = get_object_or_404(CardUserData,
-                                           user=self.request.user,
-                                           card=card)
+        card_user_data = ReviewDataMap.for_request(request) \
+            .get_review_data_or_404(kwargs["pk"])
         data = self.serializer_class(card_user_data).data
         return Response(data)
 
     def delete(self, request, **kwargs):
-        card = get_object_or_404(Card, id=kwargs["pk"])
-        try:
-            card.forget(self.request.user)
-        except ObjectDoesNotExist:
+        review_data_map = ReviewDataMap.for_request(request)
+        card_user_data = review_data_map.get_review_data(kwargs["pk"])
+        if card_user_data is None:
+            card = review_data_map.get_card_or_404(kwargs["pk"])
             return Response({
                 "status_code": status.HTTP_404_NOT_FOUND,
                 "detail": f"card with id {card.id} is not memorized"
             }, status=status.HTTP_404_NOT_FOUND)
+        card_user_data.delete()
+        review_data_map.discard(kwargs["pk"])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def patch(self, request, **kwargs):
         """Patching grade on a memorized card means reviewing it.
         """
-        card = get_object_or_404(Card, id=self.kwargs["pk"])
-        card_review_data = get_object_or_404(
-            CardUserData, user=request.user, card=card)
+        card_review_data = ReviewDataMap.for_request(request) \
+            .get_review_data_or_404(self.kwargs["pk"])
         grade = extract_grade(request)
         try:
             card_review_data.review(grade)
@@ -183,7 +259,7 @@ class MemorizedCard(RetrieveUpdateAPIView):
         return response
 
 
-class OutstandingCards(ListAPIAbstractView):
+class OutstandingCards(CardReviewDataListMixin, ListAPIAbstractView):
     serializer_class = CardReviewDataSerializer
     permission_classes = [IsAuthenticated, UserPermission]
     query_ordering = "introduced_on"
@@ -206,16 +282,18 @@ class CramQueue(ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.crammed_cards
+        return user.crammed_cards \
+            .select_related(*CardReviewDataListMixin.related_fields) \
+            .prefetch_related(*CardReviewDataListMixin.prefetched_fields)
 
     def put(self, request, *args, **kwargs):
         """Adding card to the cram queue.
         """
         card_pk = request.data["card_pk"]
-        card = get_object_or_404(Card, id=card_pk)
-        card_review_data = CardUserData.objects.filter(
-            user=request.user, card=card).first()
+        review_data_map = ReviewDataMap.for_request(request)
+        card_review_data = review_data_map.get_review_data(card_pk)
         if not card_review_data:
+            card = review_data_map.get_card_or_404(card_pk)
             response = no_review_data_response(card)
         else:
             card_review_data.add_to_cram()
@@ -223,8 +301,8 @@ class CramQueue(ListAPIView):
             response = Response(serialized_data)
             response["Location"] = reverse(
                 "cram_single_card",
-                kwargs={"card_pk": card_review_data.card.id,
-                        "user_id": card_review_data.user.id})
+                kwargs={"card_pk": card_review_data.card_id,
+                        "user_id": card_review_data.user_id})
         return response
 
     def delete(self, request, **kwargs):
@@ -238,10 +316,11 @@ class CramSingleCard(APIView):
     permission_classes = [IsAuthenticated, UserPermission]
 
     def delete(self, request, **kwargs):
-        card = get_object_or_404(Card, id=kwargs.get("card_pk"))
-        card_review_data = CardUserData.objects.filter(
-            user=request.user, card=card).first()
+        review_data_map = ReviewDataMap.for_request(request)
+        card_review_data = review_data_map.get_review_data(
+            kwargs.get("card_pk"))
         if not card_review_data:
+            card = review_data_map.get_card_or_404(kwargs.get("card_pk"))
             response = no_review_data_response(card)
         else:
             card_review_data.remove_from_cram()
@@ -252,12 +331,14 @@ class CramSingleCard(APIView):
 
 class UserCategories(RetrieveAPIView):
     permission_classes = [IsAuthenticated, UserPermission]
-    queryset = Category.objects.filter(parent=None)
     serializer_class = CategorySerializer
 
     def get(self, request, **kwargs):
-        categories = self.serializer_class(self.queryset.all(),
-                                           many=True).data
+        sub_categories = Category.get_sub_categories()
+        root_categories = sub_categories[None]
+        categories = self.serializer_class(
+            root_categories, many=True,
+            context={"sub_categories": sub_categories}).data
         output = {
             "selected_categories": request.user.selected_categories_ids,
             "categories": categories
@@ -332,18 +413,7 @@ class Distribution(APIView):
             self.request.user, days_range)
 
     def get_distribution_response(self, distribution_fn, default_range=3):
-        days_range_string = self.request.query_params.get(
-            "days-range", default_range)
-        # use serializer for validation
-        days_range_wrong_type = "days-range must be a positive number"
-        try:
-            days_range = int(days_range_string)
-        except ValueError:
-            raise ParseError(detail=days_range_wrong_type,
-                             code=status.HTTP_400_BAD_REQUEST)
-        if days_range < 0:
-            raise ParseError(detail=days_range_wrong_type,
-                             code=status.HTTP_400_BAD_REQUEST)
+        days_range = extract_days_range(self.request, default_range)
         try:
             distribution = distribution_fn(days_range)
         except CardsDistributionRangeExceeded as e:
@@ -351,6 +421,27 @@ class Distribution(APIView):
         return Response(distribution)
 
 
+class ReviewStatistics(APIView):
+    """Reviews, lapses, retention and time-to-lapse per day or week,
+    computed from the user's review history.
+    """
+    permission_classes = [IsAuthenticated, UserPermission]
+
+    def get(self, request, **kwargs):
+        period = request.query_params.get("period", "daily")
+        if period not in ReviewLog.statistics_periods:
+            periods = ", ".join(ReviewLog.statistics_periods)
+            raise ParseError(detail=f"period must be one of: {periods}",
+                             code=status.HTTP_400_BAD_REQUEST)
+        days_range = extract_days_range(request, default_range=30)
+        try:
+            statistics = ReviewLog.get_review_statistics(
+                request.user, period, days_range)
+        except CardsDistributionRangeExceeded as e:
+            raise ParseError(detail=str(e), code=status.HTTP_400_BAD_REQUEST)
+        return Response(statistics)
+
+
 class GeneralStatistics(APIView):
     permission_classes = [IsAuthenticated, UserPermission]
 
@@ -380,7 +471,7 @@ class GeneralStatistics(APIView):
     def _get_furthest_scheduled_card(user):
         try:
             furthest_scheduled_card = CardUserData.objects.filter(
-                user=user).latest("review_date")
+                user=user).select_related("card").latest("review_date")
         except ObjectDoesNotExist:
             furthest_scheduled_card_data = None
         else:
@@ -391,3 +482,138 @@ class GeneralStatistics(APIView):
             }
         return furthest_scheduled_card_data
 
+
+class UserJobs(ListAPIView):
+    """Lists the user's background jobs (most recent first) and starts
+    new ones: {"kind": ..., "arguments": {...}}.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, UserPermission]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user) \
+            .order_by("-created_on")
+
+    def post(self, request, **kwargs):
+        job_data = JobSerializer(data=request.data)
+        job_data.is_valid(raise_exception=True)
+        kind = job_kinds.get(job_data.validated_data["kind"])
+        if kind is None:
+            return Response({
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": "Unknown kind of job."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if kind.staff_only and not request.user.is_staff:
+            return Response({
+                "status_code": status.HTTP_403_FORBIDDEN,
+                "detail": "Only staff can start jobs of this kind."
+            }, status=status.HTTP_403_FORBIDDEN)
+        try:
+            arguments = kind.validate(
+                job_data.validated_data.get("arguments", {}))
+        except ValueError as e:
+            return Response({
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": f"Invalid arguments: {e}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        job = Job.enqueue(kind.name, arguments, user=request.user)
+        response = Response(JobSerializer(job).data,
+                            status=status.HTTP_201_CREATED)
+        response["Location"] = reverse(
+            "user_job", kwargs={"user_id": request.user.id, "pk": job.id})
+        return response
+
+
+class UserJob(RetrieveAPIView):
+    """Status of a background job. Deleting a job cancels it - a running
+    job stops when it next reports progress.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, UserPermission]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def delete(self, request, **kwargs):
+        job = self.get_object()
+        if job.is_finished:
+            return Response({
+                "status_code": status.HTTP_409_CONFLICT,
+                "detail": f"The job has already {job.status}."
+            }, status=status.HTTP_409_CONFLICT)
+        job.cancel()
+        return Response(JobSerializer(job).data)
+
+
+class UserImports(ListAPIView):
+    """Lists the user's imports of FullRecall archives and uploads new
+    ones (multipart: archive, memorized, duplicate_policy).
+
+    An uploaded archive is streamed to disk, validated and imported by
+    a background job (see UserJob for its status).
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, UserPermission]
+    throttle_classes = [UploadRateThrottle]
+    job_kind = "import_fr_archive"
+
+    def initialize_request(self, request, *args, **kwargs):
+        # before the request body is read
+        self.upload_handler = LimitedUploadHandler(
+            request, max_size=settings.FULLRECALL_UPLOAD_MAX_SIZE)
+        request.upload_handlers = [self.upload_handler]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user,
+                                  kind=self.job_kind) \
+            .order_by("-created_on")
+
+    def post(self, request, **kwargs):
+        content_length = request.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) \
+                > settings.FULLRECALL_UPLOAD_MAX_SIZE:
+            return self._too_large_response()
+        upload_data = FullRecallUploadSerializer(
+            data=request.data, context={"request": request})
+        if self.upload_handler.size_exceeded:
+            return self._too_large_response()
+        upload_data.is_valid(raise_exception=True)
+        upload = upload_data.validated_data
+        archive_path = self._store_archive(upload["archive"])
+        try:
+            FullRecallArchive(archive_path).validate()
+        except InvalidArchive as e:
+            os.remove(archive_path)
+            return Response({
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        job = Job.enqueue(self.job_kind, {
+            "archive_path": archive_path,
+            "memorized": upload["memorized"],
+            "duplicate_policy": upload["duplicate_policy"]
+        }, user=request.user)
+        response = Response(JobSerializer(job).data,
+                            status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse(
+            "user_job", kwargs={"user_id": request.user.id, "pk": job.id})
+        return response
+
+    @staticmethod
+    def _store_archive(uploaded_file) -> str:
+        """Moves the uploaded (temporary) file into FULLRECALL_UPLOADS_ROOT
+        - without copying it, if both are on the same file system.
+        """
+        os.makedirs(settings.FULLRECALL_UPLOADS_ROOT, exist_ok=True)
+        archive_path = os.path.join(settings.FULLRECALL_UPLOADS_ROOT,
+                                    f"{uuid.uuid4()}.zip")
+        file_move_safe(uploaded_file.temporary_file_path(), archive_path)
+        return archive_path
+
+    @staticmethod
+    def _too_large_response():
+        return Response({
+            "status_code": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "detail": "The archive is too large."
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
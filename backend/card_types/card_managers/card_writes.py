@@ -0,0 +1,59 @@
+from django.apps import apps
+from django.utils import timezone
+
+from cards.models import Card, CardImage
+
+
+class CardWrites:
+    """
+    Database writes collected by card managers: new notes, their cards
+    (new and changed ones), cards' categories and images and notes'
+    formatting templates. Managers of notes saved together share an
+    instance, so that all the writes are done by flush() with a handful
+    of bulk statements.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        self._reset()
+
+    def _reset(self):
+        self.notes = []
+        self.note_templates = []
+        self.new_cards = []
+        self.changed_cards = []
+        self.changed_fields = set()
+        self.card_categories = []
+        self.outdated_card_categories = []
+        self.card_images = []
+        self.outdated_card_images = []
+
+    def flush(self):
+        CardNote = apps.get_model("card_types", "CardNote")
+        self._bulk_create(CardNote, self.notes)
+        self._bulk_create(CardNote.formatting_templates.through,
+                          self.note_templates)
+        self._bulk_create(Card, self.new_cards)
+        if self.changed_cards:
+            # bulk_update() doesn't set auto_now fields
+            last_modified = timezone.now()
+            for card in self.changed_cards:
+                card.last_modified = last_modified
+            Card.objects.bulk_update(
+                self.changed_cards,
+                [*sorted(self.changed_fields), "last_modified"],
+                batch_size=self.batch_size)
+        CardCategory = Card.categories.through
+        if self.outdated_card_categories:
+            CardCategory.objects.filter(
+                id__in=self.outdated_card_categories).delete()
+        self._bulk_create(CardCategory, self.card_categories)
+        if self.outdated_card_images:
+            CardImage.objects.filter(
+                id__in=self.outdated_card_images).delete()
+        self._bulk_create(CardImage, self.card_images)
+        self._reset()
+
+    def _bulk_create(self, model, objects):
+        if objects:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
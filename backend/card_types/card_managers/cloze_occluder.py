@@ -1,23 +1,48 @@
-from bs4 import BeautifulSoup
+from collections import Counter
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 
 
 class ClozeOccluder:
+    """Produces question (front) and answer (back) texts for every cloze
+    in the description text.
+
+    The description is parsed once - cards' texts are then assembled
+    from the plain text of the document and spans (offsets) of clozes'
+    texts within it, so that a note with many clozes doesn't require
+    re-parsing the document for each of them.
+
+    Texts match those of re-parsing the serialized document except for
+    a <!DOCTYPE> in the middle of the description: re-parsing turned
+    the newline the serializer puts after it into text, while here the
+    doctype adds nothing to the text.
+    """
     occluded_question = '[...]'
     occluded_gap = '{...}'
     answer_template = '[{}]'
+    # strings making up the text of a document (as in BeautifulSoup's
+    # get_text() - comments, scripts, styles etc. are left out)
+    text_string_types = (NavigableString, CData)
 
     def __init__(self, description_text):
         self.bs = BeautifulSoup(description_text, features="lxml")
         self.clozes = self.bs.findAll("cloze")
         self._check_for_id_collisions()
+        self._text_pieces = []
+        self._text_length = 0
+        # cloze id: (start, end) of the cloze text
+        self._cloze_spans = {}
+        # (cloze id, (start, end)) of clozes not nested in other clozes
+        self._outer_cloze_spans = []
+        self._index_document()
+        self.text = "".join(self._text_pieces)
 
     def _check_for_id_collisions(self):
         """
         Raises an exception if there are several cloze ids with the same value.
         """
-        cloze_ids = self._get_cloze_ids()
-        for cloze_id in cloze_ids:
-            cloze_id_count = cloze_ids.count(cloze_id)
+        cloze_ids = Counter(self._get_cloze_ids())
+        for cloze_id, cloze_id_count in cloze_ids.items():
             if cloze_id_count > 1:
                 exception_message = ('<cloze> id collision detected: '
                                      'the "{0}" count is "{1}"')
@@ -31,44 +56,75 @@ class ClozeOccluder:
             raise KeyError("One or more clozes has no id.")
         return clozes
 
+    def _index_document(self):
+        """Indexes the text of the document. The parser may leave some
+        stray text (e.g. an unmatched '<') in front of the <html>
+        element - it is a part of the text, unless it's whitespace.
+        Whitespace following an explicit </html> is a part of the text,
+        elements following it are not.
+        """
+        html_indexed = False
+        for child in self.bs.children:
+            if isinstance(child, Tag):
+                if not html_indexed:
+                    self._index_text(child)
+                    html_indexed = child.name == "html"
+            elif type(child) in self.text_string_types \
+                    and (html_indexed or not child.isspace()):
+                self._add_text(child)
+
+    def _add_text(self, string):
+        self._text_pieces.append(string)
+        self._text_length += len(string)
+
+    def _index_text(self, element, within_cloze=False):
+        """Collects strings of the element's descendants and records
+        spans of clozes' texts.
+        """
+        for child in element.children:
+            if isinstance(child, Tag):
+                start = self._text_length
+                is_cloze = child.name == "cloze"
+                self._index_text(child, within_cloze or is_cloze)
+                if is_cloze:
+                    span = (start, self._text_length)
+                    self._cloze_spans[child["id"]] = span
+                    if not within_cloze:
+                        self._outer_cloze_spans.append((child["id"], span))
+            elif type(child) in self.text_string_types:
+                self._add_text(child)
+
     def get_cards(self):
         return [self._get_card_details_for_cloze(cloze)
                 for cloze in self.clozes]
 
     def _get_card_details_for_cloze(self, cloze):
-        question = BeautifulSoup(str(self.bs), features="lxml")
-        answer = BeautifulSoup(str(self.bs), features="lxml")
-        self.unwrap_tags_in_items([answer, question])
-
-        question_cloze = question.find("cloze", {"id": cloze["id"]})
-        question_cloze.replace_with(self.occluded_question)
-        question_clozes = question.findAll("cloze")
-        self._occlude_clozes(question_clozes)
-
-        answer_clause = answer.find("cloze", {"id": cloze["id"]})
-        answer_clause.replace_with(
-            self.answer_template.format(answer_clause.text))
+        start, end = self._cloze_spans[cloze["id"]]
+        answer = self.answer_template.format(self.text[start:end])
 
         card_details = {
             "cloze-id": cloze["id"],
-            "front": question.text,
-            "back": answer.text
+            "front": self._get_question(cloze["id"]),
+            "back": self.text[:start] + answer + self.text[end:]
         }
 
         return card_details
 
-    def _occlude_clozes(self, clozes):
-        for cloze in clozes:
-            cloze.replace_with(self.occluded_gap)
-
-    def unwrap_tags_in_items(self, items, tags=("html", "body")):
-        for item in items:
-            self.unwrap_tags_in_item(item, tags)
-
-    @staticmethod
-    def unwrap_tags_in_item(item, tags=("html", "body")):
-        for tag in tags:
-            item.find(tag).unwrap()
+    def _get_question(self, cloze_id):
+        """Returns the text with the cloze occluded as the question and
+        other clozes occluded as gaps. A cloze nested in another one is
+        hidden within its (occluded) outer cloze.
+        """
+        question_pieces = []
+        position = 0
+        for outer_cloze_id, (start, end) in self._outer_cloze_spans:
+            question_pieces.append(self.text[position:start])
+            question_pieces.append(self.occluded_question
+                                   if outer_cloze_id == cloze_id
+                                   else self.occluded_gap)
+            position = end
+        question_pieces.append(self.text[position:])
+        return "".join(question_pieces)
 
 
 class FormattedClozeOccluder(ClozeOccluder):
@@ -1,5 +1,3 @@
-from django.template import Context, Template
-
 from card_types.card_managers import FrontBackBackFront
 
 
@@ -20,6 +18,10 @@ class DoubleSidedFormatted(FrontBackBackFront):
                            or self.default_template_string)
         return template_string
 
+    def get_formatting_template_titles(self) -> set:
+        title = self.card_note.card_description.get("formatting_template_db")
+        return {title} if title else set()
+
     def _render_side(self, side):
         context_data = {
             "side": side
@@ -29,6 +31,4 @@ class DoubleSidedFormatted(FrontBackBackFront):
 
     def _render_with_context(self, context_data):
         template_string = self._get_formatting_template_string()
-        context = Context(context_data)
-        template = Template(template_string=template_string)
-        return template.render(context)
+        return self._render_template(template_string, context_data)
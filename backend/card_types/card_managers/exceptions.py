@@ -1,2 +1,12 @@
 class InvalidCardType(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class InvalidNoteDescription(Exception):
+    """
+    A note from a batch couldn't be turned into cards.
+    """
+    def __init__(self, index, error):
+        self.index = index
+        self.error = error
+        super().__init__(f"Note {index}: {error!r}")
@@ -23,6 +23,7 @@ class FrontBackBackFront(CardManager):
         self.back_front_card = self._save_card(card=back_front_card,
                                                front=back,
                                                back=front)
+        self._apply_card_changes()
         self._save_metadata()
 
     def _save_metadata(self):
@@ -1,12 +1,37 @@
+import uuid
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from collections import defaultdict
+from typing import Dict, List, Optional
 
-from cards.models import CardTemplate, Sound, Card, CardImage, Image, Category
+from django.template import Context
+
+from cards.models import Card, CardImage
+from cards.utils.template_cache import compiled_templates
+from .card_writes import CardWrites
+from .note_relations import NoteRelations
 
 
 class CardManager(ABC):
-    def __init__(self, card_note):
+    # fields compared when deciding whether to update a card
+    card_fields = ["front", "back", "template_id", "note_id",
+                   "front_audio_id", "back_audio_id"]
+    _not_loaded = object()
+
+    def __init__(self, card_note, relations: Optional[NoteRelations] = None,
+                 card_writes: Optional[CardWrites] = None):
+        """
+        Managers of notes saved in a single bulk operation share
+        relations (objects referenced by descriptions) and card_writes
+        (written to the database by the caller).
+        """
         self.card_note = card_note
+        self.relations = relations or card_note.get_relations()
+        self._card_writes = card_writes
+        # (card, its fields before the update, image ids for sides)
+        self._saved_cards = []
+        self._note_cards = None
+        self._template = self._not_loaded
+        self._categories = None
 
     @abstractmethod
     def save_cards(self):
@@ -26,29 +51,53 @@ class CardManager(ABC):
             required_fields)
 
     def _get_card_by_id(self, card_id):
-        return self.card_note.cards.filter(id=card_id).first()
+        if not card_id:
+            return None
+        return self._get_note_cards().get(uuid.UUID(str(card_id)))
+
+    def _get_note_cards(self) -> Dict:
+        """Cards attached to the note (loaded with a single query).
+        """
+        if self._note_cards is None:
+            # a note that hasn't been saved has no cards yet
+            self._note_cards = {} if self.card_note._state.adding \
+                else {card.id: card for card in self.card_note.cards.all()}
+        return self._note_cards
 
     def get_template(self):
+        if self._template is not self._not_loaded:
+            return self._template
         template_id = self.card_note.card_description.get("template")
         template_title = self.card_note.card_description.get("template_title")
-        get_db_template = CardTemplate.objects.get
 
         if template_title:
-            return get_db_template(title__exact=template_title)
+            self._template = self.relations.get_template_by_title(
+                template_title)
         elif template_id:
-            return get_db_template(id__exact=template_id)
+            self._template = self.relations.get_template(template_id)
         else:
-            return None
+            self._template = None
+        return self._template
 
     def _save_card(self, card: Card, front: Dict, back: Dict):
-        # a card must be saved to be present in the database
-        # before using any foreign keys
-        for update in (self._update_text_fields,
-                       self._update_referencing_fields):
-            update(card, back, front)
-            card.save()
+        """
+        Sets the card's fields and relations from the note description.
+        Changes are written to the database with _apply_card_changes()
+        - in bulk and only where they differ from what's stored.
+        """
+        original_fields = None if card._state.adding \
+            else self._get_card_fields(card)
+        self._update_text_fields(card, back, front)
+        self._update_referencing_fields(card, back, front)
+        images = {"front": self.relations.get_image_ids(front.get("images")),
+                  "back": self.relations.get_image_ids(back.get("images"))}
+        self._saved_cards.append((card, original_fields, images))
         return card
 
+    @classmethod
+    def _get_card_fields(cls, card) -> Dict:
+        return {field: getattr(card, field) for field in cls.card_fields}
+
     @staticmethod
     def _update_text_fields(card, back, front):
         card.front = front.get("text")
@@ -56,53 +105,132 @@ class CardManager(ABC):
 
     def _update_referencing_fields(self, card, back, front):
         """
-        Saves foreign keys to the card.
+        Sets foreign keys of the card.
         """
         self._update_audio_fields(card, back, front)
         card.template = self.get_template()
         card.note = self.card_note
-        card_categories = self.get_categories()
-        card.categories.set(card_categories)
-        self._save_front_images(card, front)
-        self._save_back_images(card, back)
 
     def _update_audio_fields(self, card, back, front):
         card.front_audio = self.get_sound_from(front)
         card.back_audio = self.get_sound_from(back)
 
-    @staticmethod
-    def _save_images(card, card_side, side):
-        CardImage.objects.filter(card=card, side=side).delete()
-        image_ids = card_side.get("images")
-        if not image_ids:
-            return
-
-        for image_id in image_ids:
-            image = Image.objects.get(id__exact=image_id)
-            CardImage.objects.create(card=card, image=image, side=side)
+    def _apply_card_changes(self):
+        """
+        Writes cards passed to _save_card() to the database: creates new
+        cards, updates changed fields of existing ones and synchronizes
+        their categories and images (and the note's formatting templates).
+        With shared card_writes, writing is left to the caller.
+        """
+        card_writes = self._card_writes or CardWrites()
+        self._update_formatting_templates(card_writes)
+        saved_cards, self._saved_cards = self._saved_cards, []
+        for card, original_fields, _ in saved_cards:
+            if original_fields is None:
+                card_writes.new_cards.append(card)
+                continue
+            card_changes = {
+                field for field, value in self._get_card_fields(card).items()
+                if original_fields[field] != value}
+            if card_changes:
+                card_writes.changed_fields |= card_changes
+                card_writes.changed_cards.append(card)
+
+        existing_card_ids = [card.id for card, original_fields, _
+                             in saved_cards if original_fields is not None]
+        if saved_cards:
+            self._apply_categories([card.id for card, *_ in saved_cards],
+                                   existing_card_ids, card_writes)
+            self._apply_images({card.id: images
+                                for card, _, images in saved_cards},
+                               existing_card_ids, card_writes)
+        if card_writes is not self._card_writes:
+            card_writes.flush()
+
+    def _apply_categories(self, card_ids, existing_card_ids, card_writes):
+        CardCategory = Card.categories.through
+        category_ids = [category.id for category in self.get_categories()]
+        current = set()
+        if existing_card_ids:
+            for card_category_id, card_id, category_id in \
+                    CardCategory.objects.filter(
+                        card_id__in=existing_card_ids).values_list(
+                        "id", "card_id", "category_id"):
+                current.add((card_id, category_id))
+                if category_id not in category_ids:
+                    card_writes.outdated_card_categories.append(
+                        card_category_id)
+        card_writes.card_categories.extend(
+            CardCategory(card_id=card_id, category_id=category_id)
+            for card_id in card_ids for category_id in category_ids
+            if (card_id, category_id) not in current)
+
+    def _apply_images(self, cards_images, existing_card_ids, card_writes):
+        """
+        Replaces images of cards' sides whose (ordered) images changed.
+        """
+        current = defaultdict(list)
+        if existing_card_ids:
+            card_images = CardImage.objects.filter(
+                card_id__in=existing_card_ids).order_by("created", "id")
+            for card_image_id, card_id, image_id, side in \
+                    card_images.values_list("id", "card", "image", "side"):
+                current[card_id, side].append((card_image_id, image_id))
+
+        for card_id, images in cards_images.items():
+            for side, image_ids in images.items():
+                current_images = current[card_id, side]
+                if [image_id for _, image_id in current_images] == image_ids:
+                    continue
+                card_writes.outdated_card_images.extend(
+                    card_image_id for card_image_id, _ in current_images)
+                card_writes.card_images.extend(
+                    CardImage(card_id=card_id, image_id=image_id, side=side)
+                    for image_id in image_ids)
 
-    def _save_front_images(self, card, card_side):
-        self._save_images(card=card, card_side=card_side, side="front")
+    def get_categories(self) -> List:
+        if self._categories is None:
+            self._categories = self.relations.get_categories(
+                self.card_note.card_description.get("categories", []))
+        return self._categories
 
-    def _save_back_images(self, card, card_side):
-        self._save_images(card=card, card_side=card_side, side="back")
+    def get_formatting_template_titles(self) -> Optional[set]:
+        """
+        Titles of database templates used for rendering the note's cards
+        (None for card types which don't use formatting templates).
+        """
+        return None
 
-    def get_categories(self) -> List:
-        return [Category.objects.get(id__exact=category_id)
-                for category_id in
-                self.card_note.card_description.get("categories", [])]
+    def _update_formatting_templates(self, card_writes):
+        titles = self.get_formatting_template_titles()
+        if titles is None:
+            return
+        templates = self.relations.get_templates_by_titles(titles)
+        if not self.card_note._state.adding:
+            self.card_note.formatting_templates.set(templates)
+            return
+        NoteTemplate = self.card_note.formatting_templates.through
+        card_writes.note_templates.extend(
+            NoteTemplate(cardnote_id=self.card_note.id,
+                         cardtemplate_id=template.id)
+            for template in templates)
 
-    @staticmethod
-    def _get_formatting_template_string(part: dict):
+    def _get_formatting_template_string(self, part: dict):
         """
         Template string for formatting for rendering a card note into card(s).
         """
         db_template_title = part.get("formatting_template_db")
-        template_body = CardTemplate.objects.get(
-            title__exact=db_template_title).body if db_template_title else None
-        return template_body
+        if not db_template_title:
+            return None
+        return self.relations.get_template_by_title(db_template_title).body
 
     @staticmethod
-    def get_sound_from(description_fragment: Dict):
+    def _render_template(template_string, context_data) -> str:
+        template = compiled_templates.get(template_string)
+        return template.render(Context(context_data))
+
+    def get_sound_from(self, description_fragment: Dict):
         audio_id = description_fragment.get("audio", None)
-        return audio_id and Sound.objects.filter(id__exact=audio_id).first()
+        if not audio_id:
+            return audio_id
+        return self.relations.get_sound(audio_id)
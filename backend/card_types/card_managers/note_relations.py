@@ -0,0 +1,174 @@
+import uuid
+from typing import Dict, Iterable, List
+
+from django.db.models import Q
+
+from cards.models import CardTemplate, Sound, Image, Category
+
+
+class NoteRelations:
+    """
+    Objects referenced by note descriptions: categories, images, sounds
+    and (card and formatting) templates. Each object is fetched from
+    the database once and then shared by managers of all notes saved
+    together - prefetch() loads objects referenced by a batch of
+    descriptions with a single query per model.
+    """
+    # keys of description parts holding titles of templates
+    template_title_keys = ("formatting_template_db", "template_title")
+
+    def __init__(self):
+        self._categories = {}
+        self._image_ids = set()
+        self._sounds = {}
+        self._templates = {}
+        self._templates_by_title = {}
+
+    def prefetch(self, descriptions: Iterable[Dict]):
+        category_ids, image_ids, sound_ids = set(), set(), set()
+        template_ids, template_titles = set(), set()
+        for description in descriptions:
+            if not isinstance(description, dict):
+                continue
+            category_ids |= self._to_uuids(description.get("categories"))
+            template_ids |= self._to_uuids([description.get("template")])
+            for part in self._iter_parts(description):
+                image_ids |= self._to_uuids(part.get("images"))
+                sound_ids |= self._to_uuids([part.get("audio")])
+                template_titles.update(
+                    part[key] for key in self.template_title_keys
+                    if isinstance(part.get(key), str))
+
+        category_ids -= set(self._categories)
+        if category_ids:
+            self._categories.update(Category.objects.in_bulk(category_ids))
+        image_ids -= self._image_ids
+        if image_ids:
+            self._image_ids |= set(Image.objects.filter(
+                id__in=image_ids).values_list("id", flat=True))
+        sound_ids -= set(self._sounds)
+        if sound_ids:
+            sounds = Sound.objects.in_bulk(sound_ids)
+            self._sounds.update({sound_id: sounds.get(sound_id)
+                                 for sound_id in sound_ids})
+        template_ids -= set(self._templates)
+        template_titles -= set(self._templates_by_title)
+        if template_ids or template_titles:
+            for template in CardTemplate.objects.filter(
+                    Q(id__in=template_ids) | Q(title__in=template_titles)):
+                self._add_template(template)
+
+    @classmethod
+    def get_formatting_template_titles(cls, description) -> set:
+        """
+        Titles of formatting templates named anywhere in the description.
+        """
+        return {part["formatting_template_db"]
+                for part in cls._iter_parts(description)
+                if isinstance(part.get("formatting_template_db"), str)}
+
+    def get_templates_by_titles(self, titles) -> List[CardTemplate]:
+        """
+        Existing templates with given titles, fetched with a single query.
+        """
+        missing_titles = set(titles) - set(self._templates_by_title)
+        if missing_titles:
+            for template in CardTemplate.objects.filter(
+                    title__in=missing_titles):
+                self._add_template(template)
+        return [self._templates_by_title[title] for title in titles
+                if title in self._templates_by_title]
+
+    def get_template_bodies(self, titles) -> Dict:
+        """
+        Bodies of templates by their titles (None for missing templates).
+        """
+        bodies = dict.fromkeys(titles)
+        bodies.update((template.title, template.body) for template
+                      in self.get_templates_by_titles(titles))
+        return bodies
+
+    def get_categories(self, category_ids) -> List:
+        category_ids = {uuid.UUID(str(category_id))
+                        for category_id in category_ids or []}
+        missing_ids = category_ids - set(self._categories)
+        if missing_ids:
+            self._categories.update(Category.objects.in_bulk(missing_ids))
+            not_found = missing_ids - set(self._categories)
+            if not_found:
+                raise Category.DoesNotExist(
+                    f"Categories not found: {not_found}")
+        return [self._categories[category_id]
+                for category_id in category_ids]
+
+    def get_image_ids(self, image_ids) -> List:
+        """
+        Checks if images exist - returns their ids in the given order.
+        """
+        image_ids = [uuid.UUID(str(image_id))
+                     for image_id in image_ids or []]
+        unknown_ids = set(image_ids) - self._image_ids
+        if unknown_ids:
+            found_ids = set(Image.objects.filter(
+                id__in=unknown_ids).values_list("id", flat=True))
+            if found_ids != unknown_ids:
+                raise Image.DoesNotExist(
+                    f"Images not found: {unknown_ids - found_ids}")
+            self._image_ids |= found_ids
+        return image_ids
+
+    def get_sound(self, sound_id):
+        """
+        Sound with the given id (None if it doesn't exist).
+        """
+        sound_id = uuid.UUID(str(sound_id))
+        if sound_id not in self._sounds:
+            self._sounds[sound_id] = Sound.objects.filter(
+                id__exact=sound_id).first()
+        return self._sounds[sound_id]
+
+    def get_template(self, template_id) -> CardTemplate:
+        template_id = uuid.UUID(str(template_id))
+        if template_id not in self._templates:
+            self._add_template(CardTemplate.objects.get(id__exact=template_id))
+        return self._templates[template_id]
+
+    def get_template_by_title(self, title) -> CardTemplate:
+        if title not in self._templates_by_title:
+            self._add_template(CardTemplate.objects.get(title__exact=title))
+        return self._templates_by_title[title]
+
+    def _add_template(self, template):
+        self._templates[template.id] = template
+        self._templates_by_title[template.title] = template
+
+    @classmethod
+    def _iter_parts(cls, description_part):
+        """
+        Yields the description and all dictionaries nested in it.
+        """
+        if isinstance(description_part, dict):
+            yield description_part
+            children = description_part.values()
+        elif isinstance(description_part, list):
+            children = description_part
+        else:
+            return
+        for child in children:
+            yield from cls._iter_parts(child)
+
+    @staticmethod
+    def _to_uuids(values) -> set:
+        """
+        Ids which may be looked up - malformed ones (and ones not in
+        a list) are left for the lookup of a single note to report.
+        """
+        uuids = set()
+        if not isinstance(values, (list, tuple, set)):
+            return uuids
+        for value in values:
+            try:
+                uuids.add(uuid.UUID(str(value)))
+            except ValueError:
+                continue
+        return uuids
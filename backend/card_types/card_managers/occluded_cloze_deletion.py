@@ -11,6 +11,7 @@ class OccludedClozeDeletion(CardManager):
         cards_details = cloze_occluder.get_cards()
         managed_cards_mapping = [self._add_card(card_details)
                                  for card_details in cards_details]
+        self._apply_card_changes()
         card_note_metadata = {
             "managed-cards-mapping": managed_cards_mapping
         }
@@ -27,7 +28,7 @@ class OccludedClozeDeletion(CardManager):
         self._save_card(card, front, back)
 
         return {
-            "card-id": card["id"],
+            "card-id": card.id.hex,
             "cloze-id": card_details["cloze-id"]
         }
 
@@ -35,11 +36,12 @@ class OccludedClozeDeletion(CardManager):
         """
         Drops cards for which clozes had been removed.
         """
-        metadata_card_ids = [card_details["card-id"] for card_details
-                             in current_metadata["managed-cards-mapping"]]
-        for card in self.card_note.cards.all():
-            if card["id"] not in metadata_card_ids:
-                card.delete()
+        metadata_card_ids = {card_details["card-id"] for card_details
+                             in current_metadata["managed-cards-mapping"]}
+        dropped_card_ids = [card_id for card_id in self._get_note_cards()
+                            if card_id.hex not in metadata_card_ids]
+        if dropped_card_ids:
+            Card.objects.filter(id__in=dropped_card_ids).delete()
 
     def get_card_by_cloze_id(self, card_details):
         cloze_id = card_details["cloze-id"]
@@ -47,5 +49,4 @@ class OccludedClozeDeletion(CardManager):
             "managed-cards-mapping", [])
         card_id = next((card_detail["card-id"] for card_detail in cards_mapping
                         if card_detail["cloze-id"] == cloze_id), None)
-        return card_id and self.card_note.cards.filter(
-            id__exact=card_id).first()
+        return self._get_card_by_id(card_id)
@@ -1,5 +1,3 @@
-from django.template import Template, Context
-
 from card_types.card_managers.manager_abc import CardManager
 from cards.models import Card
 
@@ -8,21 +6,28 @@ class SingleSidedFormatted(CardManager):
     def save_cards(self):
         front = self.card_note.card_description.get("_front", {})
         back = self.card_note.card_description.get("_back", {})
-        card = self.card_note.cards.first() or Card()
+        card = min(self._get_note_cards().values(),
+                   key=lambda note_card: note_card.pk, default=None) \
+            or Card()
         self._save_card(card=card, front=front, back=back)
+        self._apply_card_changes()
 
     def _update_text_fields(self, card, back, front):
         card.front = self._render_side(front)
         card.back = self._render_side(back)
 
+    def get_formatting_template_titles(self) -> set:
+        sides = (self.card_note.card_description.get(side, {})
+                 for side in ("_front", "_back"))
+        return {side["formatting_template_db"] for side in sides
+                if side.get("formatting_template_db")}
+
     def _render_side(self, side):
         context_data = {
             "side": side
         }
         side_template_string = self._get_formatting_template_string(side)
-        context = Context(context_data)
-        template = Template(template_string=side_template_string)
-        return template.render(context)
+        return self._render_template(side_template_string, context_data)
 
     def _set_note_description(self, card):
         required_fields = ["_front", "_back", "template", "categories"]
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from card_types.models import NotesRerenderJob
+from card_types.utils.notes_rerender import NotesRerenderer
+from cards.models import CardTemplate
+
+
+class Command(BaseCommand):
+    help = ("Re-renders cards of notes using formatting templates which "
+            "have been changed. Interrupted jobs are resumed.")
+
+    def handle(self, *args, **options):
+        if options["template"]:
+            template = CardTemplate.objects.filter(
+                title=options["template"]).first()
+            if not template:
+                raise CommandError(
+                    f"No template titled '{options['template']}'.")
+            NotesRerenderJob.schedule(template)
+
+        notes_rerenderer = NotesRerenderer(chunk_size=options["chunk_size"],
+                                           workers=options["workers"],
+                                           progress=self._print_progress)
+        jobs_number = notes_rerenderer.run_unfinished()
+        self.stdout.write(self.style.SUCCESS(
+            f"Finished {jobs_number} re-rendering job(s)."))
+
+    def _print_progress(self, job):
+        self.stdout.write(f"{job.template.title}: {job.notes_rendered}/"
+                          f"{job.notes_total} notes")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template", type=str,
+                            help="Re-render all notes using the template "
+                                 "with this title.")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Number of notes rendered in a single "
+                                 "transaction.")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of worker processes.")
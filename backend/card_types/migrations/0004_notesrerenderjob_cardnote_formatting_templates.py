@@ -0,0 +1,58 @@
+# Generated by Django 4.1.5 on 2026-10-19 17:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_formatting_templates(apps, schema_editor):
+    """Links existing notes to formatting templates named in their
+    descriptions.
+    """
+    CardNote = apps.get_model("card_types", "CardNote")
+    CardTemplate = apps.get_model("cards", "CardTemplate")
+    NoteTemplate = CardNote.formatting_templates.through
+    template_ids = dict(CardTemplate.objects.values_list("title", "id"))
+    note_templates = []
+    for note_id, description in CardNote.objects.values_list(
+            "id", "card_description").iterator():
+        description = description or {}
+        parts = [description, description.get("_front") or {},
+                 description.get("_back") or {}]
+        titles = {part.get("formatting_template_db") for part in parts
+                  if isinstance(part, dict)}
+        note_templates.extend(
+            NoteTemplate(cardnote_id=note_id,
+                         cardtemplate_id=template_ids[title])
+            for title in titles if title in template_ids)
+    NoteTemplate.objects.bulk_create(note_templates, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0005_reviewlog'),
+        ('card_types', '0003_alter_cardnote_card_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardnote',
+            name='formatting_templates',
+            field=models.ManyToManyField(blank=True, related_name='formatted_notes', to='cards.cardtemplate'),
+        ),
+        migrations.CreateModel(
+            name='NotesRerenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('started_on', models.DateTimeField(blank=True, null=True)),
+                ('finished_on', models.DateTimeField(blank=True, null=True)),
+                ('last_note_id', models.UUIDField(blank=True, null=True)),
+                ('notes_total', models.IntegerField(default=0)),
+                ('notes_rendered', models.IntegerField(default=0)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rerender_jobs', to='cards.cardtemplate')),
+            ],
+        ),
+        migrations.RunPython(index_formatting_templates,
+                             migrations.RunPython.noop),
+    ]
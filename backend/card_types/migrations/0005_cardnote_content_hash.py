@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card_types', '0004_notesrerenderjob_cardnote_formatting_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardnote',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,7 +1,16 @@
+import copy
+import json
 import uuid
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models, transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+from cards.models import CardTemplate
+from cards.utils.helpers import hash_sha256
 from .card_managers import type_managers
-from .card_managers.exceptions import InvalidCardType
+from .card_managers.card_writes import CardWrites
+from .card_managers.exceptions import InvalidCardType, InvalidNoteDescription
+from .card_managers.note_relations import NoteRelations
 
 
 class CardNote(models.Model):
@@ -12,21 +21,82 @@ class CardNote(models.Model):
     card_description = models.JSONField(null=True, blank=True, default=dict)
     metadata = models.JSONField(null=True, blank=True, default=dict)
     card_type = models.CharField(max_length=100)
+    # templates baked into the cards' text - notes have to be re-rendered
+    # when any of them changes
+    formatting_templates = models.ManyToManyField(
+        CardTemplate, related_name="formatted_notes", blank=True)
+    # hash of everything the cards are generated from - see
+    # get_content_hash()
+    content_hash = models.CharField(max_length=64, blank=True, default="")
 
-    def save(self, *args, **kwargs):
-        with transaction.atomic():
-            super(CardNote, self).save(*args, **kwargs)
-            self.save_cards()
-            super(CardNote, self).save()
+    # fields the content hash (and so the cards) depends on
+    content_fields = ("card_type", "card_description")
+
+    def save(self, *args, update_cards=False, **kwargs):
+        """
+        Cards of a note whose content hash hasn't changed aren't
+        regenerated, unless update_cards is set - the note itself is
+        saved anyway. Saving only fields other than content_fields (with
+        update_fields) leaves the cards alone.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not update_cards \
+                and not set(update_fields) & set(self.content_fields):
+            return super(CardNote, self).save(*args, **kwargs)
+        try:
+            with transaction.atomic():
+                self._relations = None
+                content_hash = self.get_content_hash(self.get_relations())
+                content_changed = content_hash != self.content_hash \
+                    or self._state.adding
+                self.content_hash = content_hash
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields,
+                                               "content_hash"}
+                super(CardNote, self).save(*args, **kwargs)
+                if not (content_changed or update_cards):
+                    return
+                metadata = copy.deepcopy(self.metadata)
+                self.save_cards()
+                if self.metadata != metadata:
+                    super(CardNote, self).save(update_fields=["metadata"])
+        finally:
+            self._relations = None
+
+    def get_relations(self) -> NoteRelations:
+        """
+        Objects referenced by the description - shared by the content hash
+        and the card manager during a single save.
+        """
+        if getattr(self, "_relations", None) is None:
+            self._relations = NoteRelations()
+        return self._relations
+
+    def get_content_hash(self, relations: NoteRelations) -> str:
+        """
+        Canonical hash of the card type, the description and bodies of
+        formatting templates named in it.
+        """
+        titles = NoteRelations.get_formatting_template_titles(
+            self.card_description)
+        content = json.dumps(
+            {"card_type": self.card_type,
+             "card_description": self.card_description,
+             "formatting_templates": relations.get_template_bodies(titles)},
+            sort_keys=True, separators=(",", ":"), default=str)
+        return hash_sha256(content)
 
     @property
     def card_type_instance(self):
+        return self.get_card_type_instance()
+
+    def get_card_type_instance(self, *args, **kwargs):
         if not self.card_type:
             return None
         cls = type_managers.get(self.card_type)
         if not cls:
             raise InvalidCardType
-        return cls(self)
+        return cls(self, *args, **kwargs)
 
     def save_cards(self):
         """
@@ -37,6 +107,38 @@ class CardNote(models.Model):
         if card_type_instance:
             card_type_instance.save_cards()
 
+    @classmethod
+    def create_notes(cls, notes_data, batch_size=1000) -> list:
+        """
+        Creates notes from dicts with the card_type and card_description,
+        in a single transaction. Objects referenced by descriptions are
+        fetched with a single query per model, cards are rendered in
+        memory and everything is inserted with a few bulk statements.
+        """
+        notes = [cls(card_type=note_data.get("card_type"),
+                     card_description=note_data.get("card_description")
+                     or {})
+                 for note_data in notes_data]
+        relations = NoteRelations()
+        relations.prefetch(note.card_description for note in notes)
+        card_writes = CardWrites(batch_size)
+        for index, note in enumerate(notes):
+            try:
+                note.content_hash = note.get_content_hash(relations)
+                card_type_instance = note.get_card_type_instance(
+                    relations, card_writes)
+                if card_type_instance:
+                    card_type_instance.save_cards()
+            # wrongly shaped descriptions (i.e. a side which isn't a dict)
+            # end with a TypeError or an AttributeError
+            except (InvalidCardType, ObjectDoesNotExist, KeyError,
+                    ValueError, TypeError, AttributeError) as e:
+                raise InvalidNoteDescription(index, e) from e
+        card_writes.notes.extend(notes)
+        with transaction.atomic():
+            card_writes.flush()
+        return notes
+
     @classmethod
     def from_card(cls, card, card_type):
         card_note = cls(card_type=card_type)
@@ -60,4 +162,76 @@ class CardNote(models.Model):
             if not card.note.id == self.id:
                 raise ValueError
         except AttributeError:
-            raise ValueError
\ No newline at end of file
+            raise ValueError
+
+
+class NotesRerenderJob(models.Model):
+    """Re-rendering of notes using a formatting template, after the
+    template's body had been changed. Notes are processed in the order of
+    their ids - last_note_id allows for resuming an interrupted job.
+    """
+    template = models.ForeignKey(CardTemplate, on_delete=models.CASCADE,
+                                 related_name="rerender_jobs")
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+    last_note_id = models.UUIDField(null=True, blank=True)
+    notes_total = models.IntegerField(default=0)
+    notes_rendered = models.IntegerField(default=0)
+
+    @classmethod
+    def schedule(cls, template):
+        """Adds a job for the template, unless one is already waiting.
+        """
+        job, _ = cls.objects.get_or_create(template=template,
+                                           started_on__isnull=True)
+        return job
+
+    @classmethod
+    def get_unfinished(cls):
+        return cls.objects.filter(finished_on__isnull=True) \
+            .select_related("template").order_by("created_on")
+
+    def get_pending_note_ids(self) -> list:
+        notes = self.template.formatted_notes.order_by("id")
+        if self.last_note_id:
+            notes = notes.filter(id__gt=self.last_note_id)
+        return list(notes.values_list("id", flat=True))
+
+    def start(self):
+        if not self.started_on:
+            self.started_on = timezone.now()
+            self.notes_total = self.template.formatted_notes.count()
+            self.save(update_fields=["started_on", "notes_total"])
+
+    def record_progress(self, last_note_id, notes_rendered):
+        self.last_note_id = last_note_id
+        self.notes_rendered += notes_rendered
+        self.save(update_fields=["last_note_id", "notes_rendered"])
+
+    def finish(self):
+        self.finished_on = timezone.now()
+        self.save(update_fields=["finished_on"])
+
+    def __str__(self):
+        return (f"NotesRerenderJob(template: {self.template.title}, "
+                f"rendered: {self.notes_rendered}/{self.notes_total})")
+
+
+def check_template_body_change(sender, instance, **kwargs):
+    instance._body_changed = not instance._state.adding and \
+        sender.objects.filter(pk=instance.pk) \
+        .exclude(body=instance.body).exists()
+
+
+def schedule_notes_rerender(sender, instance, created, **kwargs):
+    """Schedules re-rendering of notes using the template whose body has
+    been changed (see the rerender_notes command).
+    """
+    if getattr(instance, "_body_changed", False) \
+            and instance.formatted_notes.exists():
+        NotesRerenderJob.schedule(instance)
+
+
+pre_save.connect(check_template_body_change, sender=CardTemplate)
+post_save.connect(schedule_notes_rerender, sender=CardTemplate)
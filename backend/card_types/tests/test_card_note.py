@@ -2,7 +2,7 @@ from unittest.mock import Mock, patch
 from django.test import TestCase
 
 from card_types.card_managers.exceptions import InvalidCardType
-from cards.models import  Card
+from cards.models import  Card, CardTemplate
 from card_types.models import CardNote
 from cards.tests.fake_data import fake_data_objects
 
@@ -187,4 +187,72 @@ class NoteFromCard(TestCase):
 
     def _note_from_with_invalid_card_type(self):
         invalid_card_type = "invalid-card-type"
-        CardNote.from_card(self.card, invalid_card_type)
\ No newline at end of file
+        CardNote.from_card(self.card, invalid_card_type)
+
+
+class SkippingUnchangedNotes(TestCase):
+    """
+    Cards are regenerated only if the content hash of a note changed.
+    """
+    def setUp(self):
+        self.template = CardTemplate.objects.create(
+            title="formatting template", body="<p>{{ side.text }}</p>")
+        self.note = CardNote.objects.create(
+            card_description={"_front": {"text": "front"},
+                              "_back": {"text": "back"},
+                              "formatting_template_db": self.template.title},
+            card_type="double-sided-formatted")
+        self.note.save_cards = Mock()
+
+    def test_unchanged_note(self):
+        self.note.save()
+
+        self.note.save_cards.assert_not_called()
+
+    def test_reloaded_note(self):
+        note = CardNote.objects.get(id=self.note.id)
+        note.save_cards = Mock()
+        note.save()
+
+        note.save_cards.assert_not_called()
+
+    def test_changed_description(self):
+        self.note.card_description["_front"]["text"] = "new front"
+        self.note.save()
+
+        self.note.save_cards.assert_called_once()
+
+    def test_changed_formatting_template(self):
+        self.template.body = "<h1>{{ side.text }}</h1>"
+        self.template.save()
+        self.note.save()
+
+        self.note.save_cards.assert_called_once()
+
+    def test_updating_cards(self):
+        self.note.save(update_cards=True)
+
+        self.note.save_cards.assert_called_once()
+
+    def test_canonical_hash(self):
+        """
+        The hash doesn't depend on the order of keys in the description.
+        """
+        description = self.note.card_description
+        self.note.card_description = dict(reversed(description.items()))
+        self.note.save()
+
+        self.note.save_cards.assert_not_called()
+
+    def test_changed_metadata(self):
+        """
+        A note is saved even if its cards aren't regenerated.
+        """
+        self.note.metadata = {"source": "first"}
+        self.note.save()
+        self.note.metadata = {"source": "second"}
+        self.note.save(update_fields=["metadata"])
+
+        self.note.save_cards.assert_not_called()
+        self.note.refresh_from_db()
+        self.assertDictEqual(self.note.metadata, {"source": "second"})
@@ -63,3 +63,87 @@ class FormattedClozeOccluding(UnitTestCase):
             }
         received_output = self.formatted_occluder.get_cards()[0]
         self.assertEqual(expected_output, received_output)
+
+
+class OccludingMarkup(UnitTestCase):
+    """Clozes within html markup, nested clozes etc.
+    """
+    def test_nested_clozes(self):
+        text = ('<p>Outer <cloze id="1">nested <b>cloze</b> '
+                '<cloze id="2">two</cloze></cloze> &amp; '
+                '<cloze id="3">three</cloze></p>')
+        expected_output = [
+            {
+                "cloze-id": "1",
+                "front": 'Outer [...] & {...}',
+                "back": 'Outer [nested cloze two] & three'
+            },
+            {
+                "cloze-id": "2",
+                "front": 'Outer {...} & {...}',
+                "back": 'Outer nested cloze [two] & three'
+            },
+            {
+                "cloze-id": "3",
+                "front": 'Outer {...} & [...]',
+                "back": 'Outer nested cloze two & [three]'
+            }
+        ]
+
+        self.assertListEqual(ClozeOccluder(text).get_cards(), expected_output)
+
+    def test_markup_entities_comments_scripts(self):
+        text = ('<b>bold</b> &lt;tag&gt; <!-- comment -->'
+                '<cloze id="a">x&nbsp;y</cloze><script>var a;</script>')
+        expected_output = [{
+            "cloze-id": "a",
+            "front": 'bold <tag> <span class="highlighted-text">[&hellip;]'
+                     '</span>',
+            "back": 'bold <tag> <span class="highlighted-text">[x\xa0y]'
+                    '</span>'
+        }]
+
+        self.assertListEqual(FormattedClozeOccluder(text).get_cards(),
+                             expected_output)
+
+    def test_stray_markup_characters(self):
+        text = '<é<cloze id="c1"><li>é</li></cloze>'
+        expected_output = [{"cloze-id": "c1", "front": '<é[...]',
+                            "back": '<é[é]'}]
+
+        self.assertListEqual(ClozeOccluder(text).get_cards(), expected_output)
+
+    def test_id_collision(self):
+        text = ('<cloze id="1">one</cloze><cloze id="2">two</cloze>'
+                '<cloze id="1">three</cloze>')
+
+        with self.assertRaisesRegex(ValueError, '"1" count is "2"'):
+            ClozeOccluder(text)
+
+    def test_missing_id(self):
+        with self.assertRaises(KeyError):
+            ClozeOccluder('<cloze id="1">one</cloze><cloze>two</cloze>')
+
+    def test_doctype_in_text(self):
+        """
+        A <!DOCTYPE> in the middle of the text adds nothing to it.
+        """
+        occluder = ClozeOccluder('a<!DOCTYPE html><cloze id="1">b</cloze>')
+
+        self.assertListEqual(occluder.get_cards(), [
+            {"cloze-id": "1", "front": "a[...]", "back": "a[b]"}])
+
+    def test_many_clozes(self):
+        number_of_clozes = 200
+        text = " ".join(f'<p>text {number} <cloze id="{number}">cloze '
+                        f'{number}</cloze></p>'
+                        for number in range(number_of_clozes))
+        cards = ClozeOccluder(text).get_cards()
+
+        self.assertEqual(len(cards), number_of_clozes)
+        for number, card in enumerate(cards):
+            self.assertEqual(card["front"].count("[...]"), 1)
+            self.assertEqual(card["front"].count("{...}"),
+                             number_of_clozes - 1)
+            self.assertIn(f"text {number} [...]", card["front"])
+            self.assertIn(f"text {number} [cloze {number}]", card["back"])
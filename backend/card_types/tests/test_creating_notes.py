@@ -0,0 +1,146 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from card_types.card_managers.exceptions import InvalidNoteDescription
+from card_types.models import CardNote
+from cards.models import Card, CardTemplate
+from cards.tests.fake_data import fake_data_objects
+
+
+class CreatingNotes(TestCase):
+    """
+    Creating notes (and their cards) in bulk.
+    """
+    def setUp(self):
+        self.categories = fake_data_objects.make_fake_categories(2)
+        self.images = [fake_data_objects.get_instance_from_image(
+            fake_data_objects.get_random_gif()) for _ in range(2)]
+        self.sound, _ = fake_data_objects.add_sound_entry_to_database(
+            fake_data_objects.placeholder_audio_files[0])
+        self.template = CardTemplate.objects.create(
+            title="formatting template", body="<p>{{ side.text|safe }}</p>")
+        self.single_sided_template = CardTemplate.objects.create(
+            title="single-sided template",
+            body="{{ side.card_question_definition }}{{ side.answer }}")
+
+    def get_notes_data(self, number, first_number=0):
+        category_ids = [str(category.id) for category in self.categories]
+        image_ids = [str(image.id) for image in reversed(self.images)]
+        notes_data = []
+        for note_number in range(first_number, first_number + number):
+            notes_data.extend([
+                {"card_type": "front-back-back-front",
+                 "card_description": {
+                     "_front": {"text": f"front {note_number}",
+                                "images": image_ids},
+                     "_back": {"text": f"back {note_number}",
+                               "audio": str(self.sound.id)},
+                     "categories": category_ids}},
+                {"card_type": "double-sided-formatted",
+                 "card_description": {
+                     "_front": {"text": f"formatted front {note_number}"},
+                     "_back": {"text": f"formatted back {note_number}"},
+                     "formatting_template_db": self.template.title}},
+                {"card_type": "single-sided-formatted",
+                 "card_description": {
+                     "_front": {"card_question_definition":
+                                f"question {note_number}",
+                                "formatting_template_db":
+                                    self.single_sided_template.title},
+                     "_back": {"answer": f"answer {note_number}",
+                               "formatting_template_db":
+                                   self.single_sided_template.title}}},
+                {"card_type": "occluded-cloze-deletion",
+                 "card_description": {
+                     "text": f'<cloze id="one">one {note_number}</cloze> '
+                             f'<cloze id="two">two {note_number}</cloze>',
+                     "categories": category_ids}}])
+        return notes_data
+
+    def test_creating_notes(self):
+        notes = CardNote.create_notes(self.get_notes_data(2))
+
+        self.assertEqual(CardNote.objects.count(), 8)
+        self.assertEqual(Card.objects.count(), 14)
+        self.assertListEqual(
+            sorted(note.id for note in notes),
+            sorted(CardNote.objects.values_list("id", flat=True)))
+
+    def test_metadata(self):
+        """
+        Notes are stored with metadata pointing to their cards.
+        """
+        CardNote.create_notes(self.get_notes_data(1))
+        note = CardNote.objects.get(card_type="front-back-back-front")
+
+        self.assertSetEqual(set(note.metadata.values()),
+                            {card.id.hex for card in note.cards.all()})
+
+    def test_relations(self):
+        CardNote.create_notes(self.get_notes_data(1))
+        note = CardNote.objects.get(card_type="front-back-back-front")
+        front_back_card = note.cards.get(
+            id=note.metadata["front-back-card-id"])
+
+        self.assertSetEqual(set(front_back_card.categories.all()),
+                            set(self.categories))
+        self.assertListEqual(front_back_card.front_images,
+                             list(reversed(self.images)))
+        self.assertEqual(front_back_card.back_audio, self.sound)
+
+    def test_formatting_templates(self):
+        CardNote.create_notes(self.get_notes_data(1))
+
+        self.assertEqual(self.template.formatted_notes.count(), 1)
+        self.assertEqual(
+            self.single_sided_template.formatted_notes.count(), 1)
+        self.assertTrue(all(
+            card.front.startswith("<p>") for card in Card.objects.filter(
+                note__card_type="double-sided-formatted")))
+
+    def test_same_as_saved_notes(self):
+        """
+        Saving created notes one by one leaves their cards unchanged.
+        """
+        CardNote.create_notes(self.get_notes_data(1))
+        cards_before = set(Card.objects.values_list(
+            "id", "front", "back", "last_modified"))
+        for note in CardNote.objects.all():
+            note.save()
+
+        self.assertSetEqual(
+            set(Card.objects.values_list("id", "front", "back",
+                                         "last_modified")),
+            cards_before)
+
+    def test_number_of_queries(self):
+        """
+        The number of queries doesn't depend on the number of notes.
+        """
+        with CaptureQueriesContext(connection) as few_notes:
+            CardNote.create_notes(self.get_notes_data(1))
+        with CaptureQueriesContext(connection) as many_notes:
+            CardNote.create_notes(self.get_notes_data(20, first_number=1))
+
+        self.assertEqual(len(few_notes), len(many_notes))
+
+    def test_missing_category(self):
+        notes_data = self.get_notes_data(2)
+        category = self.categories[0]
+        category.delete()
+
+        with self.assertRaises(InvalidNoteDescription) as context:
+            CardNote.create_notes(notes_data)
+        self.assertEqual(context.exception.index, 0)
+        self.assertFalse(CardNote.objects.exists())
+        self.assertFalse(Card.objects.exists())
+
+    def test_invalid_card_type(self):
+        notes_data = [*self.get_notes_data(1),
+                      {"card_type": "invalid-type", "card_description": {}}]
+
+        with self.assertRaises(InvalidNoteDescription) as context:
+            CardNote.create_notes(notes_data)
+        self.assertEqual(context.exception.index, 4)
+        self.assertFalse(CardNote.objects.exists())
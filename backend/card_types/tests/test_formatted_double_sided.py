@@ -2,7 +2,9 @@
 The description for text fields should contain unmarked text.
 The markup should be added in a separate template.
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from card_types.models import CardNote
 from cards.models import CardTemplate
@@ -101,6 +103,23 @@ class DatabaseTemplate(RenderingDoubleSided):
                     f"{self.card_description['_back']['text']}</p>")
         self.assertEqual(expected, self.front_back_card.back)
 
+    def test_fetching_template_once(self):
+        """
+        The formatting template is fetched once for both card sides.
+        """
+        with CaptureQueriesContext(connection) as context:
+            CardNote.objects.create(
+                card_description={**self.card_description,
+                                  "_front": {"text": "other front text"}},
+                card_type="double-sided-formatted")
+        template_queries = [
+            query for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and 'FROM "cards_cardtemplate"' in query["sql"]
+            and '"cards_cardtemplate"."title"' in query["sql"]]
+
+        self.assertEqual(len(template_queries), 1)
+
 
 class CardTemplateByName(RenderingDoubleSided):
     """
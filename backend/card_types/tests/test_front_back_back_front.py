@@ -1,9 +1,11 @@
 from unittest import skip
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from card_types.models import CardNote
-from cards.models import Card, CardTemplate, CardImage, Category
+from cards.models import Card, CardTemplate, CardImage, Category, Image
 from cards.tests.fake_data import fake_data_objects
 
 
@@ -456,6 +458,95 @@ class NoteWithImagesUpdate(TestCase, FieldsWithDescription):
         return self.count_images(card, "back")
 
 
+class ApplyingOnlyChanges(TestCase, FieldsWithDescription):
+    """
+    Updating a note writes only the changes to cards and their relations.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls._prepare_images()
+        cls._prepare_audio_entries()
+        cls.categories = [Category.objects.create(name=category_name)
+                          for category_name in ("category 1", "category 2")]
+        cls.add_note_description()
+        cls.card_description["_front"]["audio"] = cls.front_audio.id.hex
+        cls.card_description["categories"] = [
+            category.id.hex for category in cls.categories]
+
+    def setUp(self):
+        self.create_note()
+        self.card_image_ids = set(
+            CardImage.objects.values_list("id", flat=True))
+
+    def tearDown(self):
+        self.note.delete()
+
+    def save_note(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.note.save()
+        return [query["sql"] for query in queries.captured_queries]
+
+    @staticmethod
+    def get_writes(queries, table):
+        return [sql for sql in queries
+                if sql.startswith(("INSERT", "UPDATE", "DELETE"))
+                and f'"{table}"' in sql.split("WHERE")[0]]
+
+    def test_text_change(self):
+        self.note.card_description["_front"]["text"] = "corrected text"
+        queries = self.save_note()
+        self.load_cards()
+
+        self.assertEqual(self.front_back_card.front, "corrected text")
+        self.assertEqual(self.back_front_card.back, "corrected text")
+        self.assertEqual(len(self.get_writes(queries, "cards_card")), 1)
+        self.assertFalse(self.get_writes(queries, "cards_cardimage"))
+        self.assertFalse(self.get_writes(queries, "cards_card_categories"))
+        self.assertSetEqual(
+            set(CardImage.objects.values_list("id", flat=True)),
+            self.card_image_ids)
+
+    def test_no_changes(self):
+        queries = self.save_note()
+
+        self.assertFalse(self.get_writes(queries, "cards_card"))
+        # the content hash is unchanged - only the note itself is saved
+        self.assertEqual(
+            len(self.get_writes(queries, "card_types_cardnote")), 1)
+
+    def test_category_removed(self):
+        self.note.card_description["categories"] = [
+            self.categories[1].id.hex]
+        self.save_note()
+        self.load_cards()
+
+        for card in (self.front_back_card, self.back_front_card):
+            self.assertListEqual(list(card.categories.all()),
+                                 [self.categories[1]])
+
+    def test_images_reordered(self):
+        self.note.card_description["_front"]["images"] = [
+            self.back_image.id.hex, self.front_image.id.hex]
+        self.save_note()
+        self.load_cards()
+
+        self.assertListEqual(self.front_back_card.front_images,
+                             [self.back_image, self.front_image])
+        self.assertListEqual(self.back_front_card.back_images,
+                             [self.back_image, self.front_image])
+        # sides with unchanged images keep their entries
+        self.assertTrue(CardImage.objects.filter(
+            card=self.front_back_card, side="back",
+            id__in=self.card_image_ids).exists())
+
+    def test_nonexistent_image(self):
+        self.note.card_description["_back"]["images"] = [
+            "9f1cb5b4a8b34b0e9e4f5f5c1e0d3f2a"]
+
+        with self.assertRaises(Image.DoesNotExist):
+            self.note.save()
+
+
 class CategoriesInDescription(TestCase):
     """
     Adding categories to double-sided cards.
@@ -0,0 +1,175 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from card_types.models import CardNote, NotesRerenderJob
+from card_types.utils.notes_rerender import NotesRerenderer
+from cards.models import CardTemplate
+
+
+class FormattingTemplateNotes:
+    template_body = "<p>{{ side.text|safe }}</p>"
+    changed_template_body = "<h1>{{ side.text|safe }}</h1>"
+
+    def create_template(self, title="formatting template"):
+        return CardTemplate.objects.create(
+            title=title, body=self.template_body,
+            description="test formatting template")
+
+    @staticmethod
+    def create_note(number, template_title="formatting template"):
+        return CardNote.objects.create(
+            card_description={
+                "_front": {"text": f"front {number}"},
+                "_back": {"text": f"back {number}"},
+                "formatting_template_db": template_title
+            },
+            card_type="double-sided-formatted")
+
+    @staticmethod
+    def get_fronts():
+        return {card.front for note in CardNote.objects.all()
+                for card in note.cards.all()}
+
+    def change_template_body(self):
+        self.template.body = self.changed_template_body
+        self.template.save()
+
+
+class TemplateDependencies(FormattingTemplateNotes, TestCase):
+    """
+    Notes are linked to formatting templates used for rendering their cards.
+    """
+    def setUp(self):
+        self.template = self.create_template()
+
+    def test_double_sided_note(self):
+        note = self.create_note(1)
+
+        self.assertListEqual(list(self.template.formatted_notes.all()),
+                             [note])
+
+    def test_template_changed_in_description(self):
+        other_template = self.create_template("other template")
+        note = self.create_note(1)
+        note.card_description["formatting_template_db"] = "other template"
+        note.save()
+
+        self.assertListEqual(list(note.formatting_templates.all()),
+                             [other_template])
+
+    def test_single_sided_note(self):
+        back_template = self.create_template("back template")
+        note = CardNote.objects.create(
+            card_description={
+                "_front": {"card_question_definition": "question",
+                           "formatting_template_db": "formatting template"},
+                "_back": {"answer": "answer",
+                          "formatting_template_db": "back template"}
+            },
+            card_type="single-sided-formatted")
+
+        self.assertSetEqual(set(note.formatting_templates.all()),
+                            {self.template, back_template})
+
+    def test_not_formatted_note(self):
+        note = CardNote.objects.create(
+            card_description={"_front": {"text": "front"},
+                              "_back": {"text": "back"}},
+            card_type="front-back-back-front")
+
+        self.assertFalse(note.formatting_templates.exists())
+
+
+class SchedulingRerender(FormattingTemplateNotes, TestCase):
+    def setUp(self):
+        self.template = self.create_template()
+
+    def test_body_changed(self):
+        self.create_note(1)
+        self.change_template_body()
+
+        self.assertEqual(NotesRerenderJob.objects.filter(
+            template=self.template).count(), 1)
+
+    def test_single_pending_job(self):
+        self.create_note(1)
+        self.change_template_body()
+        self.template.body = "{{ side.text }}"
+        self.template.save()
+
+        self.assertEqual(NotesRerenderJob.objects.count(), 1)
+
+    def test_description_changed(self):
+        self.create_note(1)
+        self.template.description = "new description"
+        self.template.save()
+
+        self.assertFalse(NotesRerenderJob.objects.exists())
+
+    def test_no_notes(self):
+        self.change_template_body()
+
+        self.assertFalse(NotesRerenderJob.objects.exists())
+
+
+class RerenderingNotes(FormattingTemplateNotes, TestCase):
+    def setUp(self):
+        self.template = self.create_template()
+        self.notes = sorted((self.create_note(number)
+                             for number in range(5)),
+                            key=lambda note: note.id)
+        self.change_template_body()
+        self.job = NotesRerenderJob.objects.get()
+
+    def test_rerendering(self):
+        progress = []
+        NotesRerenderer(chunk_size=2,
+                        progress=lambda job: progress.append(
+                            job.notes_rendered)).run_unfinished()
+        self.job.refresh_from_db()
+
+        self.assertTrue(all(front.startswith("<h1>")
+                            for front in self.get_fronts()))
+        self.assertTrue(self.job.finished_on)
+        self.assertEqual(self.job.notes_total, 5)
+        self.assertEqual(self.job.notes_rendered, 5)
+        self.assertListEqual(progress, [2, 4, 5, 5])
+
+    def test_resuming(self):
+        """Notes up to the last_note_id have already been rendered.
+        """
+        self.job.last_note_id = self.notes[2].id
+        self.job.save()
+        NotesRerenderer(chunk_size=2).run(self.job)
+        rendered_fronts = [card.front.startswith("<h1>")
+                           for note in self.notes
+                           for card in note.cards.all()]
+
+        self.assertListEqual(rendered_fronts, [False] * 6 + [True] * 4)
+
+    def test_command(self):
+        output = StringIO()
+        call_command("rerender_notes", "--chunk-size", "3", stdout=output)
+
+        self.assertIn("5/5 notes", output.getvalue())
+        self.assertFalse(NotesRerenderJob.get_unfinished().exists())
+
+
+class RerenderingNotesInPool(FormattingTemplateNotes, TransactionTestCase):
+    """
+    Worker processes have to see committed notes - hence the
+    TransactionTestCase.
+    """
+    def test_rerendering(self):
+        self.template = self.create_template()
+        for number in range(6):
+            self.create_note(number)
+        self.change_template_body()
+        NotesRerenderer(chunk_size=2, workers=2).run_unfinished()
+        job = NotesRerenderJob.objects.get()
+
+        self.assertTrue(all(front.startswith("<h1>")
+                            for front in self.get_fronts()))
+        self.assertEqual(job.notes_rendered, 6)
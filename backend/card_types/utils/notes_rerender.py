@@ -0,0 +1,67 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from django.db import connections, transaction
+
+from card_types.models import CardNote, NotesRerenderJob
+
+
+def rerender_notes(note_ids) -> int:
+    """Re-renders cards of notes in a single transaction.
+    """
+    with transaction.atomic():
+        notes = CardNote.objects.filter(id__in=note_ids).order_by("id")
+        for note in notes:
+            note.save(update_cards=True)
+    return len(note_ids)
+
+
+class NotesRerenderer:
+    """Runs re-rendering jobs (NotesRerenderJob) in chunks of notes.
+
+    With workers > 1, chunks are rendered by a pool of processes. Progress
+    of a job is stored after every chunk (in the order of note ids), so
+    an interrupted job resumes from the last stored chunk.
+    """
+
+    def __init__(self, chunk_size=500, workers=1,
+                 progress: Optional[Callable] = None):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.progress = progress or (lambda job: None)
+
+    def run_unfinished(self) -> int:
+        jobs = list(NotesRerenderJob.get_unfinished())
+        for job in jobs:
+            self.run(job)
+        return len(jobs)
+
+    def run(self, job: NotesRerenderJob):
+        job.start()
+        note_ids = job.get_pending_note_ids()
+        chunks = [note_ids[start:start + self.chunk_size]
+                  for start in range(0, len(note_ids), self.chunk_size)]
+        if self.workers > 1 and len(chunks) > 1:
+            self._render_in_pool(job, chunks)
+        else:
+            for chunk in chunks:
+                self._record_progress(job, chunk, rerender_notes(chunk))
+        job.finish()
+        self.progress(job)
+
+    def _render_in_pool(self, job, chunks):
+        # forked workers open their own database connections - the parent's
+        # ones must not be shared with them
+        connections.close_all()
+        with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork")) as executor:
+            # map() yields results in the order of chunks
+            for chunk, rendered in zip(
+                    chunks, executor.map(rerender_notes, chunks)):
+                self._record_progress(job, chunk, rendered)
+
+    def _record_progress(self, job, chunk, rendered):
+        job.record_progress(chunk[-1], rendered)
+        self.progress(job)
@@ -0,0 +1,462 @@
+import datetime
+import hashlib
+import random
+import uuid
+from typing import Callable, List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.template import Context
+
+from card_types.card_managers import type_managers, DoubleSidedFormatted, \
+    OccludedClozeDeletion
+from card_types.models import CardNote
+from cards.models import Card, CardImage, CardTemplate, CardUserData, \
+    Category, Image, ReviewLog, Sound
+from cards.utils.helpers import batched
+from cards.utils.supermemo2 import SM2
+from cards.utils.template_cache import compiled_templates
+
+User = get_user_model()
+
+WORDS = ("time", "year", "people", "way", "day", "man", "thing", "woman",
+         "life", "child", "world", "school", "state", "family", "student",
+         "group", "country", "problem", "hand", "part", "place", "case",
+         "week", "company", "system", "program", "question", "work",
+         "government", "number", "night", "point", "home", "water", "room",
+         "mother", "area", "money", "story", "fact", "month", "lot", "right",
+         "study", "book", "eye", "job", "word", "business", "issue", "side",
+         "kind", "head", "house", "service", "friend", "father", "power",
+         "hour", "game", "line", "end", "member", "law", "car", "city",
+         "community", "name", "president", "team", "minute", "idea", "kid",
+         "body", "information", "back", "parent", "face", "others", "level")
+
+# placeholder media: a GIF header/trailer and an ID3 tag around random bytes
+GIF_HEADER = b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00"
+GIF_TRAILER = b"\x02\x4c\x01\x00\x3b"
+MP3_HEADER = b"ID3\x03\x00\x00\x00\x00\x00\x00"
+
+
+class CorpusGenerator:
+    """
+    Generates a synthetic corpus for benchmarking: users, a deep
+    category tree, cards (plain ones and ones created from notes of every
+    card type), images, sounds and users' review data with SM2 review
+    histories (saved in the review log). Rows are inserted in bulk.
+
+    Output is reproducible for a given seed (apart from dates, which are
+    relative to the current day). Names of generated objects start with
+    the label ("benchmark-<seed>"), so corpora for different seeds can
+    coexist in a single database.
+    """
+    card_types = ("plain", *type_managers.keys())
+    grade_weights = (3, 4, 8, 15, 40, 30)  # for grades 0-5
+    # chance of a due review being left undone (so that some cards
+    # are outstanding)
+    skipped_review_chance = 0.15
+    front_image_chance = 0.2
+    back_image_chance = 0.1
+    audio_chance = 0.3
+
+    def __init__(self, seed=0, users=10, cards=10000, category_depth=6,
+                 category_breadth=3, images=500, sounds=500, memorized=0.3,
+                 history_days=365, batch_size=2000,
+                 progress: Callable[[str], None] = None):
+        self.rng = random.Random(seed)
+        self.label = f"benchmark-{seed}"
+        self.number_of_users = users
+        self.number_of_cards = cards
+        self.category_depth = category_depth
+        self.category_breadth = category_breadth
+        self.number_of_images = images
+        self.number_of_sounds = sounds
+        self.memorized = memorized
+        self.history_days = history_days
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.today = datetime.date.today()
+
+        self.categories = []
+        self.images = []
+        self.sounds = []
+        self.card_ids = []
+        self.card_template = None
+        self.formatting_templates = {}
+        self._card_counter = 0
+        self._review_logs_created = 0
+
+    def exists(self) -> bool:
+        return User.objects.filter(
+            username__startswith=f"{self.label}-").exists()
+
+    def generate(self) -> dict:
+        """Generates the corpus and returns numbers of created objects.
+        """
+        with transaction.atomic():
+            self._make_categories()
+            self._make_templates()
+            self._make_images()
+            self._make_sounds()
+            self._make_cards()
+            users = self._make_users()
+            review_data = self._make_review_data(users)
+        return {
+            "users": len(users),
+            "categories": len(self.categories),
+            "images": len(self.images),
+            "sounds": len(self.sounds),
+            "cards": len(self.card_ids),
+            "review_data": review_data,
+            "review_logs": self._review_logs_created
+        }
+
+    def _uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _words(self, number) -> str:
+        return " ".join(self.rng.choices(WORDS, k=number))
+
+    def _sentence(self) -> str:
+        return self._words(self.rng.randint(3, 12)).capitalize() + "."
+
+    def _random_grade(self) -> int:
+        return self.rng.choices(range(6), weights=self.grade_weights)[0]
+
+    def _make_categories(self):
+        level = [Category(id=self._uuid(), name=f"{self.label} {number}")
+                 for number in range(self.category_breadth)]
+        self.categories.extend(level)
+        for _ in range(1, self.category_depth):
+            level = [Category(id=self._uuid(), name=f"{parent.name}.{number}",
+                              parent=parent)
+                     for parent in level
+                     for number in range(self.category_breadth)]
+            self.categories.extend(level)
+        Category.objects.bulk_create(self.categories,
+                                     batch_size=self.batch_size)
+        self.progress(f"{len(self.categories)} categories created.")
+
+    def _make_templates(self):
+        self.card_template = CardTemplate(
+            id=self._uuid(),
+            title=f"{self.label} card template",
+            description="Card template generated for benchmarking.",
+            body='{% extends "_base.html" %}{% block content %}'
+                 '<div class="card-question">{{ card.front|safe }}</div>'
+                 '<div class="card-answer">{{ card.back|safe }}</div>'
+                 '{% endblock content %}')
+        self.formatting_templates = {
+            "_front": CardTemplate(
+                id=self._uuid(),
+                title=f"{self.label} single-sided front",
+                description="Formatting template generated for benchmarking.",
+                body="<p>{{ side.card_question_definition }}</p>"),
+            "_back": CardTemplate(
+                id=self._uuid(),
+                title=f"{self.label} single-sided back",
+                description="Formatting template generated for benchmarking.",
+                body="<p>{{ side.answer }}</p>"
+                     "{% for sentence in side.example_sentences %}"
+                     "<p>{{ sentence }}</p>{% endfor %}")
+        }
+        CardTemplate.objects.bulk_create(
+            [self.card_template, *self.formatting_templates.values()])
+
+    def _save_media_file(self, path, content) -> str:
+        return default_storage.save(path, ContentFile(content))
+
+    def _make_images(self):
+        for number in range(self.number_of_images):
+            content = GIF_HEADER + self.rng.randbytes(23) + GIF_TRAILER
+            self.images.append(Image(
+                id=self._uuid(),
+                image=self._save_media_file(
+                    f"images/{self.label}-{number}.gif", content),
+                sha1_digest=hashlib.sha1(content).hexdigest(),
+                description=self._sentence()))
+        Image.objects.bulk_create(self.images, batch_size=self.batch_size)
+        self.progress(f"{len(self.images)} images created.")
+
+    def _make_sounds(self):
+        for number in range(self.number_of_sounds):
+            content = MP3_HEADER + self.rng.randbytes(64)
+            self.sounds.append(Sound(
+                id=self._uuid(),
+                sound_file=self._save_media_file(
+                    f"sounds/{self.label}-{number}.mp3", content),
+                sha1_digest=hashlib.sha1(content).hexdigest(),
+                description=self._sentence()))
+        Sound.objects.bulk_create(self.sounds, batch_size=self.batch_size)
+        self.progress(f"{len(self.sounds)} sounds created.")
+
+    def _make_cards(self):
+        notes, cards, card_categories, card_images = [], [], [], []
+        note_templates = []
+        while len(self.card_ids) < self.number_of_cards:
+            categories = self.rng.sample(self.categories,
+                                         k=self.rng.randint(1, 2))
+            card_type = self.rng.choice(self.card_types)
+            if card_type == "plain":
+                note, note_cards = None, [self._make_plain_card()]
+            else:
+                note = CardNote(id=self._uuid(), card_type=card_type)
+                note_cards = self._make_note_cards(note, categories)
+                notes.append(note)
+                if card_type == "single-sided-formatted":
+                    note_templates.extend(
+                        CardNote.formatting_templates.through(
+                            cardnote_id=note.id, cardtemplate_id=template.id)
+                        for template in self.formatting_templates.values())
+            for card in note_cards:
+                card.note = note
+                self.card_ids.append(card.id)
+                card_categories.extend(
+                    Card.categories.through(card_id=card.id,
+                                            category_id=category.id)
+                    for category in categories)
+                card_images.extend(self._make_card_images(card))
+            cards.extend(note_cards)
+
+            if len(cards) >= self.batch_size:
+                self._insert_cards(notes, cards, card_categories, card_images,
+                                   note_templates)
+                notes, cards, card_categories, card_images = [], [], [], []
+                note_templates = []
+        self._insert_cards(notes, cards, card_categories, card_images,
+                           note_templates)
+
+    def _insert_cards(self, notes, cards, card_categories, card_images,
+                      note_templates):
+        CardNote.objects.bulk_create(notes, batch_size=self.batch_size)
+        CardNote.formatting_templates.through.objects.bulk_create(
+            note_templates, batch_size=self.batch_size)
+        Card.objects.bulk_create(cards, batch_size=self.batch_size)
+        Card.categories.through.objects.bulk_create(
+            card_categories, batch_size=self.batch_size)
+        CardImage.objects.bulk_create(card_images, batch_size=self.batch_size)
+        self.progress(f"{len(self.card_ids)} cards created.")
+
+    def _next_card_text(self, words=6) -> str:
+        # cards must have unique front/back pairs
+        self._card_counter += 1
+        return f"{self._words(words)} #{self._card_counter}"
+
+    def _random_sound(self, chance=None):
+        if self.sounds and self.rng.random() < (chance or self.audio_chance):
+            return self.rng.choice(self.sounds)
+        return None
+
+    def _make_plain_card(self) -> Card:
+        return Card(id=self._uuid(),
+                    front=self._next_card_text(),
+                    back=self._next_card_text(),
+                    front_audio=self._random_sound(),
+                    template=(self.card_template
+                              if self.rng.random() < 0.5 else None))
+
+    def _make_card_images(self, card) -> List[CardImage]:
+        card_images = []
+        if not self.images:
+            return card_images
+        for side, chance in (("front", self.front_image_chance),
+                             ("back", self.back_image_chance)):
+            if self.rng.random() < chance:
+                card_images.append(CardImage(
+                    card=card, image=self.rng.choice(self.images), side=side))
+        return card_images
+
+    def _make_note_cards(self, note, categories) -> List[Card]:
+        front = {"text": self._next_card_text()}
+        back = {"text": self._next_card_text()}
+        note.card_description = {
+            "_front": front,
+            "_back": back,
+            "template": None,
+            "categories": [category.id.hex for category in categories]
+        }
+        match note.card_type:
+            case "front-back-back-front":
+                cards = self._make_two_sided_cards(note, front, back)
+            case "double-sided-formatted":
+                cards = self._make_two_sided_cards(note, front, back,
+                                                   self._render_default)
+            case "formatted-vocabulary":
+                back_audio = self._random_sound(chance=1)
+                note.card_description["extra_content"] = {
+                    "example_sentences": [self._sentence()
+                                          for _ in range(2)],
+                    "audio": back_audio and back_audio.id.hex
+                }
+                cards = self._make_two_sided_cards(note, front, back,
+                                                   self._render_default)
+                cards[0].back_audio = back_audio
+            case "single-sided-formatted":
+                cards = self._make_single_sided_card(note)
+            case "occluded-cloze-deletion":
+                cards = self._make_cloze_cards(note)
+            case _:
+                raise ValueError(f"Unsupported card type: {note.card_type}")
+        return cards
+
+    @staticmethod
+    def _render(template_string, side) -> str:
+        return compiled_templates.get(template_string).render(
+            Context({"side": side}))
+
+    def _render_default(self, side) -> str:
+        return self._render(DoubleSidedFormatted.default_template_string,
+                            side)
+
+    def _make_two_sided_cards(self, note, front, back,
+                              render=lambda side: side["text"]) -> List[Card]:
+        front_back_card = Card(id=self._uuid(), front=render(front),
+                               back=render(back))
+        back_front_card = Card(id=self._uuid(), front=render(back),
+                               back=render(front))
+        note.metadata = {
+            "front-back-card-id": front_back_card.id.hex,
+            "back-front-card-id": back_front_card.id.hex
+        }
+        return [front_back_card, back_front_card]
+
+    def _make_single_sided_card(self, note) -> List[Card]:
+        description = note.card_description
+        description["_front"] = {
+            "card_question_definition": description["_front"]["text"],
+            "formatting_template_db":
+                self.formatting_templates["_front"].title
+        }
+        description["_back"] = {
+            "answer": description["_back"]["text"],
+            "example_sentences": [self._sentence()],
+            "formatting_template_db": self.formatting_templates["_back"].title
+        }
+        return [Card(id=self._uuid(),
+                     front=self._render(self.formatting_templates[
+                                            "_front"].body,
+                                        description["_front"]),
+                     back=self._render(self.formatting_templates[
+                                           "_back"].body,
+                                       description["_back"]))]
+
+    def _make_cloze_cards(self, note) -> List[Card]:
+        clozes = [f'<cloze id="{number}">{self._words(2)}</cloze>'
+                  for number in range(self.rng.randint(2, 4))]
+        text = " ".join(f"{self._next_card_text(4)} {cloze}"
+                        for cloze in clozes)
+        note.card_description = {
+            "text": text,
+            "template": None,
+            "categories": note.card_description["categories"]
+        }
+        cards_details = OccludedClozeDeletion.Occluder(text).get_cards()
+        cards = [Card(id=self._uuid(), front=card_details["front"],
+                      back=card_details["back"])
+                 for card_details in cards_details]
+        note.metadata = {
+            "managed-cards-mapping": [
+                {"card-id": card.id.hex,
+                 "cloze-id": card_details["cloze-id"]}
+                for card, card_details in zip(cards, cards_details)]
+        }
+        return cards
+
+    def _make_users(self) -> List:
+        password = make_password(None)
+        users = [User(id=self._uuid(), username=f"{self.label}-{number}",
+                      password=password)
+                 for number in range(self.number_of_users)]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        # bulk_create() skips the post_save signal that selects root
+        # categories for new users
+        root_categories = [category for category in self.categories
+                           if category.parent_id is None]
+        User.selected_categories.through.objects.bulk_create([
+            User.selected_categories.through(user_id=user.id,
+                                             category_id=category.id)
+            for user in users for category in root_categories
+        ], batch_size=self.batch_size)
+        self.progress(f"{len(users)} users created.")
+        return users
+
+    def _make_review_data(self, users) -> int:
+        created = 0
+        number_memorized = int(len(self.card_ids) * self.memorized)
+        for user in users:
+            card_ids = self.rng.sample(self.card_ids, k=number_memorized)
+            review_data = (self._simulate_review_history(user, card_id)
+                           for card_id in card_ids)
+            for batch in batched(review_data, self.batch_size):
+                created += self._insert_review_data(batch)
+            self.progress(f"Review data for {user.username} created.")
+        return created
+
+    def _insert_review_data(self, histories) -> int:
+        review_data = [data for data, _ in histories]
+        # introduced_on (auto_now_add) is overwritten on insert
+        introduced_on = [data.introduced_on for data in review_data]
+        CardUserData.objects.bulk_create(review_data)
+        for data, introduction_date in zip(review_data, introduced_on):
+            data.introduced_on = introduction_date
+        CardUserData.objects.bulk_update(review_data, ["introduced_on"])
+        review_logs = [review_log for _, review_logs in histories
+                       for review_log in review_logs]
+        ReviewLog.bulk_log(review_logs, batch_size=self.batch_size)
+        self._review_logs_created += len(review_logs)
+        return len(review_data)
+
+    def _review_time(self, review_date) -> datetime.datetime:
+        return datetime.datetime.combine(
+            review_date, datetime.time(hour=self.rng.randint(0, 23)),
+            tzinfo=datetime.timezone.utc)
+
+    def _simulate_review_history(self, user, card_id):
+        """Simulates reviews (with random grades) of a card memorized
+        within the history_days period, stopping at the first review
+        due in the future or at a randomly skipped one.
+        Returns review data and review log entries.
+        """
+        introduction_date = self.today - datetime.timedelta(
+            days=self.rng.randint(0, self.history_days))
+        grade = self._random_grade()
+        review = SM2.first_review(grade, introduction_date)
+        last_reviewed = introduction_date
+        lapses = int(grade < 3)
+        total_reviews = 1
+        review_logs = []
+
+        while (review.review_date <= self.today
+               and self.rng.random() > self.skipped_review_chance):
+            last_reviewed = review.review_date
+            grade = self._random_grade()
+            review_log = ReviewLog(card_id=card_id,
+                                   user=user,
+                                   reviewed_on=self._review_time(
+                                       last_reviewed),
+                                   grade=grade,
+                                   interval_before=review.interval,
+                                   easiness_before=review.easiness)
+            review = review.review(grade, last_reviewed)
+            review_log.interval_after = review.interval
+            review_log.easiness_after = review.easiness
+            review_logs.append(review_log)
+            lapses += int(grade < 3)
+            total_reviews += 1
+
+        review_data = CardUserData(
+            card_id=card_id,
+            user=user,
+            computed_interval=review.interval,
+            lapses=lapses,
+            reviews=review.repetitions,
+            total_reviews=total_reviews,
+            last_reviewed=last_reviewed,
+            introduced_on=self._review_time(introduction_date),
+            review_date=review.review_date,
+            grade=grade,
+            easiness_factor=review.easiness,
+            crammed=grade < 4)
+        return review_data, review_logs
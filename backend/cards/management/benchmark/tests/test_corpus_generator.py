@@ -0,0 +1,147 @@
+import datetime
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+
+from card_types.card_managers import type_managers
+from card_types.models import CardNote
+from cards.management.benchmark.corpus_generator import CorpusGenerator
+from cards.models import Card, CardImage, CardUserData, Category, Image, \
+    ReviewLog, Sound
+from users.models import User
+
+
+class CorpusGeneration(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.TemporaryDirectory()
+        cls.media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root.name)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        cls.media_root.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corpus_generator = CorpusGenerator(
+            seed=7, users=2, cards=120, category_depth=3, category_breadth=2,
+            images=5, sounds=5, memorized=0.5, history_days=100,
+            batch_size=16)
+        cls.created = cls.corpus_generator.generate()
+
+    def test_numbers_of_objects(self):
+        self.assertEqual(self.created["users"], 2)
+        self.assertEqual(self.created["categories"], 2 + 4 + 8)
+        self.assertEqual(self.created["images"], Image.objects.count())
+        self.assertEqual(self.created["sounds"], Sound.objects.count())
+        # the last note may add a few cards above the requested number
+        self.assertGreaterEqual(self.created["cards"], 120)
+        self.assertEqual(self.created["cards"], Card.objects.count())
+        self.assertEqual(self.created["review_data"],
+                         2 * int(self.created["cards"] * 0.5))
+
+    def test_category_tree_depth(self):
+        deepest_category = Category.objects.filter(
+            parent__parent__isnull=False).first()
+
+        self.assertEqual(deepest_category.get_depth(), 3)
+        self.assertFalse(deepest_category.sub_categories.exists())
+
+    def test_cards_of_all_types(self):
+        card_types = set(CardNote.objects.values_list("card_type", flat=True))
+
+        self.assertEqual(card_types, set(type_managers))
+        self.assertTrue(Card.objects.filter(note__isnull=True).exists())
+
+    def test_notes_metadata(self):
+        """Cards listed in notes' metadata are the ones attached to notes.
+        """
+        for note in CardNote.objects.all():
+            if note.card_type == "occluded-cloze-deletion":
+                metadata_ids = {card_details["card-id"] for card_details
+                                in note.metadata["managed-cards-mapping"]}
+            elif note.card_type == "single-sided-formatted":
+                metadata_ids = set()
+            else:
+                metadata_ids = set(note.metadata.values())
+            card_ids = {card.id.hex for card in note.cards.all()}
+
+            self.assertTrue(card_ids)
+            if metadata_ids:
+                self.assertEqual(metadata_ids, card_ids)
+
+    def test_regenerated_cards_match(self):
+        """Saving a note through its card type manager leaves cards'
+        contents unchanged.
+        """
+        for card_type in type_managers:
+            note = CardNote.objects.filter(card_type=card_type).first()
+            cards_before = {(card.front, card.back)
+                            for card in note.cards.all()}
+            note.save()
+            cards_after = {(card.front, card.back)
+                           for card in note.cards.all()}
+
+            self.assertEqual(cards_before, cards_after, card_type)
+
+    def test_formatting_templates_index(self):
+        """Formatted notes are linked to their formatting templates.
+        """
+        note = CardNote.objects.filter(
+            card_type="single-sided-formatted").first()
+
+        self.assertEqual(note.formatting_templates.count(), 2)
+
+    def test_review_data(self):
+        today = datetime.date.today()
+        review_data = CardUserData.objects.all()
+
+        self.assertTrue(review_data.filter(review_date__lte=today).exists())
+        self.assertTrue(review_data.filter(review_date__gt=today).exists())
+        self.assertTrue(review_data.filter(total_reviews__gt=1).exists())
+        self.assertFalse(review_data.filter(
+            introduced_on__date__lt=today - datetime.timedelta(days=100))
+                         .exists())
+        self.assertFalse(review_data.filter(last_reviewed__gt=today).exists())
+
+    def test_review_logs(self):
+        """Every review after memorization is logged, the last one matching
+        the current review data.
+        """
+        review_data = CardUserData.objects.filter(total_reviews__gt=2).first()
+        review_logs = ReviewLog.objects.filter(
+            card=review_data.card, user=review_data.user) \
+            .order_by("reviewed_on")
+        last_log = review_logs.last()
+
+        self.assertEqual(self.created["review_logs"],
+                         ReviewLog.objects.count())
+        self.assertEqual(review_logs.count(), review_data.total_reviews - 1)
+        self.assertEqual(last_log.grade, review_data.grade)
+        self.assertEqual(last_log.interval_after,
+                         review_data.computed_interval)
+        self.assertEqual(last_log.easiness_after, review_data.easiness_factor)
+        self.assertEqual(last_log.reviewed_on.date(),
+                         review_data.last_reviewed)
+
+    def test_users_selected_categories(self):
+        user = User.objects.filter(
+            username__startswith=self.corpus_generator.label).first()
+
+        self.assertEqual(set(user.selected_categories.all()),
+                         set(Category.get_root_nodes()))
+
+    def test_card_images(self):
+        self.assertTrue(CardImage.objects.filter(side="front").exists())
+
+    def test_existing_corpus(self):
+        with self.assertRaises(CommandError):
+            call_command("generate_benchmark_corpus", "--seed", "7",
+                         stdout=StringIO())
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cards.models import Image, Sound
+from cards.utils.helpers import batched
+from cards.utils.media_storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = ("Moves files of images and sounds to content-addressed paths "
+            "(as used with the CONTENT_ADDRESSED_MEDIA setting) and "
+            "updates their records in bulk.")
+    file_fields = ((Image, "image"), (Sound, "sound_file"))
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Number of records updated at a time.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report files which would be moved.")
+
+    def handle(self, *args, **options):
+        storage = ContentAddressedStorage()
+        for model, file_field in self.file_fields:
+            moved = self._move_files(storage, model, file_field,
+                                     options["chunk_size"],
+                                     options["dry_run"])
+            action = "to move" if options["dry_run"] else "moved"
+            self.stdout.write(f"{model.__name__}: {moved} files {action}.")
+
+    def _move_files(self, storage, model, file_field, chunk_size,
+                    dry_run) -> int:
+        moved = 0
+        records = model.objects.only("id", file_field, "sha1_digest") \
+            .order_by("pk").iterator(chunk_size=chunk_size)
+        for chunk in batched(records, chunk_size):
+            moved_records, old_names = [], []
+            for record in chunk:
+                name = getattr(record, file_field).name
+                if storage.is_content_name(name):
+                    continue
+                content_name = storage.get_content_name(
+                    name, record.sha1_digest)
+                if not dry_run:
+                    try:
+                        # the file is hard-linked, so it stays available
+                        # under its old name until records are updated
+                        storage.link(name, content_name)
+                    except FileNotFoundError:
+                        self.stderr.write(f"Missing file: {name}")
+                        continue
+                setattr(record, file_field, content_name)
+                moved_records.append(record)
+                old_names.append(name)
+            if moved_records and not dry_run:
+                with transaction.atomic():
+                    model.objects.bulk_update(moved_records, [file_field])
+                for old_name in old_names:
+                    storage.delete(old_name)
+            moved += len(moved_records)
+        return moved
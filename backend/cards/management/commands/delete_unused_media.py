@@ -1,56 +1,167 @@
+import heapq
 import os
-from django.core.management.base import BaseCommand
+import posixpath
+import time
+
 from django.apps import apps
-from django.db.models import Q
 from django.conf import settings
-from django.db.models import FileField
+from django.core.management.base import BaseCommand
+from django.db.models import FileField, Q
+from django.db.models.functions import Collate
+
+from cards.utils.helpers import batched
 
-# reused from:
+# based on:
 # https://www.algotech.solutions/blog/python/deleting-unused-django-media-files/
 
 
 class Command(BaseCommand):
-    help = "This command deletes all media files from the MEDIA_ROOT directory"
-    "which are no longer referenced by any of the models from installed_apps"
+    help = ("This command deletes all media files from the MEDIA_ROOT "
+            "directory which are no longer referenced by any of the models "
+            "from installed_apps.")
+
+    # paths are compared as strings of bytes, i.e. in the same order
+    # in which Python sorts them
+    collation = "C"
+    checkpoint_file_name = ".delete_unused_media.checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only list files which would be deleted.")
+        parser.add_argument("--older-than", type=float, default=None,
+                            metavar="DAYS",
+                            help="Delete only files modified more than "
+                                 "DAYS days ago.")
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Number of files deleted at a time.")
+        parser.add_argument("--max-rate", type=float, default=None,
+                            help="Maximum number of files deleted per "
+                                 "second.")
+        parser.add_argument("--checkpoint", type=str, default=None,
+                            help="File in which progress is stored, so "
+                                 "that an interrupted run resumes where it "
+                                 "stopped (by default in MEDIA_ROOT).")
+
     def handle(self, *args, **options):
-        all_models = apps.get_models()
-        physical_files = set()
-        db_files = set()
-        # Get all files from the database
-        for model in all_models:
-            file_fields = []
-            filters = Q()
-            for f_ in model._meta.fields:
-                if isinstance(f_, FileField):
-                    file_fields.append(f_.name)
-                    is_null = {'{}__isnull'.format(f_.name): True}
-                    is_empty = {'{}__exact'.format(f_.name): ''}
-                    filters &= Q(**is_null) | Q(**is_empty)
-            # only retrieve the models which have non-empty,
-            # non-null file fields
-            if file_fields:
-                files = model.objects.exclude(filters).values_list(
-                    *file_fields, flat=True).distinct()
-                db_files.update(files)
-        # Get all files from the MEDIA_ROOT, recursively
-        media_root = getattr(settings, 'MEDIA_ROOT', None)
-        if media_root is not None:
-            for relative_root, dirs, files in os.walk(media_root):
-                for file_ in files:
-                    # Compute the relative file path to the media directory,
-                    # so it can be compared to the values from the db
-                    relative_file = os.path.join(os.path.relpath(
-                        relative_root, media_root), file_)
-                    physical_files.add(relative_file)
-        # Compute the difference and delete those files
-        deletables = physical_files - db_files
-        if deletables:
-            for file_ in deletables:
-                os.remove(os.path.join(media_root, file_))
-            # Bottom-up - delete all empty folders
-            for relative_root, dirs, files in os.walk(
-                    media_root, topdown=False):
-                for dir_ in dirs:
-                    if not os.listdir(os.path.join(relative_root, dir_)):
-                        os.rmdir(os.path.join(relative_root, dir_))
+        self.media_root = getattr(settings, "MEDIA_ROOT", None)
+        if self.media_root is None:
+            return
+        self.checkpoint_path = options["checkpoint"] or os.path.join(
+            self.media_root, self.checkpoint_file_name)
+        self.dry_run = options["dry_run"]
+        self.max_rate = options["max_rate"]
+        self.modified_before = None
+        if options["older_than"] is not None:
+            self.modified_before = time.time() \
+                - options["older_than"] * 24 * 60 * 60
+
+        start_after = "" if self.dry_run else self._read_checkpoint()
+        deleted = 0
+        for chunk in batched(self._get_unused_files(start_after),
+                             options["chunk_size"]):
+            deleted += self._delete_files(chunk)
+        if not self.dry_run and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        action = "would be deleted" if self.dry_run else "deleted"
+        self.stdout.write(f"{deleted} files {action}.")
+
+    def _get_unused_files(self, start_after):
+        """
+        Yields (in order) paths of files from the MEDIA_ROOT, relative to
+        it, which aren't referenced by any record - both sequences of
+        paths are sorted, so they're merged without holding either of
+        them in memory.
+        """
+        referenced_files = self._get_referenced_files(start_after)
+        referenced_file = next(referenced_files, None)
+        for file_path, entry in self._get_media_files(start_after):
+            while referenced_file is not None \
+                    and referenced_file < file_path:
+                referenced_file = next(referenced_files, None)
+            if referenced_file == file_path:
+                continue
+            if self.modified_before is not None \
+                    and entry.stat().st_mtime >= self.modified_before:
+                continue
+            yield file_path
+
+    def _get_referenced_files(self, start_after):
+        """
+        Sorted paths stored in file fields of all models, streamed from
+        the database with server-side cursors.
+        """
+        querysets = []
+        for model in apps.get_models():
+            for field in model._meta.fields:
+                if not isinstance(field, FileField):
+                    continue
+                empty = Q(**{f"{field.name}__isnull": True}) \
+                    | Q(**{f"{field.name}__exact": ""})
+                querysets.append(
+                    model.objects.exclude(empty)
+                    .annotate(file_path=Collate(field.name, self.collation))
+                    .filter(file_path__gt=start_after)
+                    .order_by("file_path")
+                    .values_list("file_path", flat=True)
+                    .iterator(chunk_size=2000))
+        return heapq.merge(*querysets)
+
+    def _get_media_files(self, start_after, directory=""):
+        """
+        Yields (relative path, os.DirEntry) of files in the MEDIA_ROOT
+        sorted by their paths, scanning one directory at a time. Hidden
+        files (i.e. ones being written or the checkpoint) are skipped.
+        """
+        with os.scandir(os.path.join(self.media_root, directory)) as entries:
+            # "a/" (and so "a/b") follows "a.png" - as in sorted paths
+            entries = sorted(
+                (entry.name + "/" if entry.is_dir(follow_symlinks=False)
+                 else entry.name, entry)
+                for entry in entries if not entry.name.startswith("."))
+        for sort_key, entry in entries:
+            # paths as stored in file fields
+            path = posixpath.join(directory, entry.name)
+            if sort_key.endswith("/"):
+                # skipping directories with paths before the checkpoint
+                if path + "/" > start_after \
+                        or start_after.startswith(path + "/"):
+                    yield from self._get_media_files(start_after, path)
+            elif path > start_after:
+                yield path, entry
+
+    def _delete_files(self, file_paths) -> int:
+        started = time.monotonic()
+        for file_path in file_paths:
+            if self.dry_run:
+                self.stdout.write(file_path)
+                continue
+            try:
+                os.remove(os.path.join(self.media_root, file_path))
+            except FileNotFoundError:
+                pass
+            self._remove_empty_directories(posixpath.dirname(file_path))
+        if not self.dry_run:
+            self._write_checkpoint(file_paths[-1])
+            if self.max_rate:
+                time.sleep(max(0.0, len(file_paths) / self.max_rate
+                               - (time.monotonic() - started)))
+        return len(file_paths)
+
+    def _remove_empty_directories(self, directory):
+        while directory:
+            try:
+                os.rmdir(os.path.join(self.media_root, directory))
+            except OSError:
+                # not empty
+                return
+            directory = posixpath.dirname(directory)
+
+    def _read_checkpoint(self) -> str:
+        if not os.path.exists(self.checkpoint_path):
+            return ""
+        with open(self.checkpoint_path) as checkpoint:
+            return checkpoint.read().strip()
 
+    def _write_checkpoint(self, file_path):
+        with open(self.checkpoint_path, "w") as checkpoint:
+            checkpoint.write(file_path)
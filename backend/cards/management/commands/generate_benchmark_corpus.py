@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cards.management.benchmark.corpus_generator import CorpusGenerator
+
+
+class Command(BaseCommand):
+    help = ("Generates a synthetic corpus (users, categories, cards of all "
+            "types, media and review data) for benchmarking.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        corpus_generator = CorpusGenerator(
+            seed=options["seed"],
+            users=options["users"],
+            cards=options["cards"],
+            category_depth=options["category_depth"],
+            category_breadth=options["category_breadth"],
+            images=options["images"],
+            sounds=options["sounds"],
+            memorized=options["memorized"],
+            history_days=options["history_days"],
+            batch_size=options["batch_size"],
+            progress=self._print_progress)
+        if corpus_generator.exists():
+            raise CommandError(f"Corpus '{corpus_generator.label}' "
+                               "already exists - use a different seed.")
+        created = corpus_generator.generate()
+        summary = ", ".join(f"{name}: {number}"
+                            for name, number in created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Corpus '{corpus_generator.label}' generated ({summary})."))
+
+    def _print_progress(self, message):
+        if self.verbosity > 1:
+            self.stdout.write(message)
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Seed for the random data generator.")
+        parser.add_argument("--users", type=int, default=10,
+                            help="Number of users.")
+        parser.add_argument("--cards", type=int, default=10000,
+                            help="(Approximate) number of cards.")
+        parser.add_argument("--category-depth", type=int, default=6,
+                            help="Number of levels of the category tree.")
+        parser.add_argument("--category-breadth", type=int, default=3,
+                            help="Number of sub-categories of each category.")
+        parser.add_argument("--images", type=int, default=500,
+                            help="Number of images.")
+        parser.add_argument("--sounds", type=int, default=500,
+                            help="Number of sounds.")
+        parser.add_argument("--memorized", type=float, default=0.3,
+                            help="Fraction of cards memorized by each user.")
+        parser.add_argument("--history-days", type=int, default=365,
+                            help="Number of days of simulated review "
+                                 "history.")
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Number of rows inserted in a single query.")
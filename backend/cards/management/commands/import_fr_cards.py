@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
 
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    duplicate_policies
 from cards.management.fr_importer.items_importer.modules.items_importer import \
     PendingItemsImporter, MemorizedItemsImporter
 from users.models import User
@@ -15,7 +17,22 @@ class Command(BaseCommand):
         self._set_template(kwargs)
         self._import_from_category(kwargs)
         self._import_into_category(kwargs)
-        self.items_importer.import_cards_into_db()
+        duplicate_policy = kwargs.get("duplicates") or "skip"
+        summary = self.items_importer.import_cards_into_db(
+            batch_size=kwargs.get("batch_size"),
+            offset=kwargs.get("offset") or 0,
+            progress=self._report_progress,
+            workers=kwargs.get("workers") or 1,
+            duplicate_policy=duplicate_policy)
+        self.stdout.write(f"{summary['new']} new cards, "
+                          f"{summary['duplicates']} duplicates "
+                          f"({duplicate_policy}).")
+        for error in summary["errors"]:
+            self.stderr.write(f"Not imported: {error}")
+
+    def _report_progress(self, imported_items):
+        self.stdout.write(f"{imported_items} items imported (resume with "
+                          f"--offset {imported_items}).")
 
     def _set_template(self, main_options):
         if main_options.get("template_by_id", None):
@@ -27,12 +44,14 @@ class Command(BaseCommand):
 
     def _set_items_importer(self, main_options):
         user = self._get_user(main_options)
+        importer_options = {"streaming": True} \
+            if main_options.get("streaming", False) else {}
         if user:
             self.items_importer = MemorizedItemsImporter(
-                main_options["elements_path"], user)
+                main_options["elements_path"], user, **importer_options)
         else:
             self.items_importer = PendingItemsImporter(
-                main_options["elements_path"])
+                main_options["elements_path"], **importer_options)
 
     @staticmethod
     def _get_user(main_options):
@@ -83,3 +102,23 @@ class Command(BaseCommand):
         parser.add_argument("--import-into-category", type=str,
                             help="Import into categories in the database"
                                  "identified by their UUIDs.")
+        parser.add_argument("--streaming", action="store_true",
+                            help="Parse elements.xml incrementally, "
+                                 "without loading the whole file into "
+                                 "memory (for very large files).")
+        parser.add_argument("--batch-size", type=int,
+                            help="Number of items written into the database "
+                                 "in a single transaction.")
+        parser.add_argument("--offset", type=int, default=0,
+                            help="Skip the given number of items (i.e. "
+                                 "ones imported before an interruption).")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of processes converting items "
+                                 "into cards.")
+        parser.add_argument("--duplicates", choices=duplicate_policies,
+                            default="skip",
+                            help="What to do with items matching existing "
+                                 "cards (with the same front and back): "
+                                 "skip them, merge them into the cards "
+                                 "(categories, images and missing sounds) "
+                                 "or update the cards.")
@@ -0,0 +1,56 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cards.models import Image
+from cards.utils.helpers import batched
+
+
+def make_derivatives(image_ids) -> int:
+    for image in Image.objects.filter(id__in=image_ids):
+        image.make_derivatives()
+    return len(image_ids)
+
+
+class Command(BaseCommand):
+    help = ("Makes downscaled copies (derivatives) of images which don't "
+            "have them yet (or of all images, with --all).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Remake derivatives of all images (i.e. "
+                                 "after widths or formats were changed).")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of processes making derivatives.")
+        parser.add_argument("--chunk-size", type=int, default=50,
+                            help="Number of images given to a process "
+                                 "at a time.")
+
+    def handle(self, *args, **options):
+        images = Image.objects.order_by("id")
+        if not options["all"]:
+            images = images.filter(width__isnull=True)
+        chunks = list(batched(images.values_list("id", flat=True),
+                              options["chunk_size"]))
+        processed = 0
+        if options["workers"] > 1 and len(chunks) > 1:
+            # forked workers open their own database connections - the
+            # parent's ones must not be shared with them
+            connections.close_all()
+            with ProcessPoolExecutor(
+                    max_workers=options["workers"],
+                    mp_context=multiprocessing.get_context("fork")) \
+                    as executor:
+                for made in executor.map(make_derivatives, chunks):
+                    processed += made
+                    self._report_progress(processed)
+        else:
+            for chunk in chunks:
+                processed += make_derivatives(chunk)
+                self._report_progress(processed)
+        self.stdout.write(f"Derivatives of {processed} images made.")
+
+    def _report_progress(self, processed):
+        self.stdout.write(f"{processed} images processed.")
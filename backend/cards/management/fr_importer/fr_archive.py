@@ -0,0 +1,111 @@
+import os
+import posixpath
+import shutil
+import zipfile
+
+from django.conf import settings
+from lxml import etree
+
+from cards.utils.xml_parser import iterparse
+
+
+class InvalidArchive(ValueError):
+    pass
+
+
+class FullRecallArchive:
+    """
+    Zip archive of FullRecall's elements.xml and media files (images and
+    sounds, with paths relative to elements.xml).
+
+    validate() reads only the archive's central directory and the root
+    element of elements.xml, so it takes about the same time no matter
+    how large the archive is. extract() writes the files one at a time,
+    in chunks.
+    """
+    elements_file_name = "elements.xml"
+    root_tag = "fullrecall"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def validate(self) -> str:
+        """
+        Checks that the archive is a zip with a single, top-most
+        elements.xml, members with safe paths and limited total size.
+        Returns the name of elements.xml in the archive.
+
+        Raises InvalidArchive.
+        """
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                members = archive.infolist()
+                elements_name = self._find_elements_file(members)
+                self._check_members(members)
+                with archive.open(elements_name) as elements_file:
+                    self._check_root(elements_file)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError) as e:
+            raise InvalidArchive(f"Not a valid zip archive: {e}")
+        return elements_name
+
+    def extract(self, directory: str) -> str:
+        """
+        Extracts the (validated) archive into the directory and returns
+        the path of elements.xml.
+        """
+        elements_name = self.validate()
+        with zipfile.ZipFile(self.path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                target_path = os.path.join(directory, *member.filename.split(
+                    "/"))
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                # sizes of decompressed members don't exceed the declared
+                # ones (which have been checked)
+                with archive.open(member) as source, \
+                        open(target_path, "wb") as target:
+                    shutil.copyfileobj(source, target)
+        return os.path.join(directory, *elements_name.split("/"))
+
+    def _find_elements_file(self, members) -> str:
+        elements_names = sorted(
+            (member.filename for member in members
+             if posixpath.basename(member.filename)
+             == self.elements_file_name),
+            key=lambda name: name.count("/"))
+        if not elements_names:
+            raise InvalidArchive(
+                f"No {self.elements_file_name} in the archive.")
+        if len(elements_names) > 1 and elements_names[0].count("/") \
+                == elements_names[1].count("/"):
+            raise InvalidArchive(
+                f"More than one {self.elements_file_name} in the archive.")
+        return elements_names[0]
+
+    @staticmethod
+    def _check_members(members):
+        if len(members) > settings.FULLRECALL_ARCHIVE_MAX_MEMBERS:
+            raise InvalidArchive("Too many files in the archive.")
+        if sum(member.file_size for member in members) \
+                > settings.FULLRECALL_ARCHIVE_MAX_SIZE:
+            raise InvalidArchive("Files in the archive are too large.")
+        for member in members:
+            parts = member.filename.split("/")
+            if member.filename.startswith("/") or ".." in parts \
+                    or "\\" in member.filename or ":" in parts[0]:
+                raise InvalidArchive(
+                    f"Unsafe path in the archive: {member.filename}")
+
+    def _check_root(self, elements_file):
+        try:
+            root = next((element for _, element
+                         in iterparse(elements_file, events=("start",))),
+                        None)
+        except etree.LxmlError as e:
+            raise InvalidArchive(
+                f"{self.elements_file_name} can't be parsed: {e}")
+        if root is None or root.tag != self.root_tag \
+                or not root.get("time_of_start", "").isdigit():
+            raise InvalidArchive(
+                f"{self.elements_file_name} isn't a FullRecall database.")
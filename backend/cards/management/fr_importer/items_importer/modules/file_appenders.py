@@ -7,7 +7,13 @@ from django.db import IntegrityError, transaction
 from django.db.models import Model
 
 from cards.models import Image, Sound
-from cards.utils.helpers import get_file_hash
+
+
+class MediaPathError(ValueError):
+    """
+    Path of a media file outside the directory media files may be taken
+    from.
+    """
 
 
 class FileAppender:
@@ -20,18 +26,27 @@ class FileAppender:
         self._file_path = self.validate_path(file_path)
 
     @staticmethod
-    def validate_path(file_path: str | PathLike):
-        if os.path.exists(file_path):
+    def validate_path(file_path: str | PathLike,
+                      root: str | PathLike | None = None):
+        """
+        With the root given, the path is resolved (with symbolic links)
+        and has to be inside the root - otherwise MediaPathError is raised.
+        """
+        if root is not None:
+            real_root = os.path.realpath(root)
+            real_path = os.path.realpath(file_path)
+            if os.path.commonpath([real_root, real_path]) != real_root:
+                raise MediaPathError(f"{file_path} is outside {root}")
+            file_path = real_path
+        if os.path.isfile(file_path):
             return file_path
         else:
             raise FileNotFoundError(f"{file_path} does not exist")
 
     @property
     def file_instance(self):
-        self._file_instance = self._get_file_by_hash()
         if self._file_instance is None:
-            with transaction.atomic():
-                self.save_file()
+            self.save_file()
         return self._file_instance
 
     def save_file(self):
@@ -40,17 +55,35 @@ class FileAppender:
             self._create_file_instance(file)
 
     def _create_file_instance(self, file: File):
+        """
+        The file is hashed while it's stored, so it's read just once. If
+        it turns out to be a duplicate (also of a file stored concurrently
+        by another process), the stored copy is removed and the existing
+        record is used instead.
+        """
         parameter = {self.file_field: file}
-        self._file_instance = self.DatabaseFileModel(**parameter)
-        self._file_instance.save()
+        file_instance = self.DatabaseFileModel(**parameter)
+        try:
+            with transaction.atomic():
+                file_instance.save()
+        except IntegrityError:
+            self._file_instance = self._get_file_by_hash(
+                getattr(file_instance, self.hash_field))
+            if self._file_instance is None:
+                raise
+            stored_file = getattr(file_instance, self.file_field)
+            # content-addressed storage keeps a single copy of contents
+            if stored_file.name != getattr(self._file_instance,
+                                           self.file_field).name:
+                stored_file.delete(save=False)
+        else:
+            self._file_instance = file_instance
 
     @property
     def file_name(self) -> str:
         return os.path.basename(self._file_path)
 
-    def _get_file_by_hash(self) -> Model:
-        with open(self._file_path, "rb") as file:
-            file_hash_digest = get_file_hash(File(file))
+    def _get_file_by_hash(self, file_hash_digest: str) -> Model:
         search_parameter = {f'{self.hash_field}__exact': file_hash_digest}
         return self.DatabaseFileModel.objects.filter(
             **search_parameter).first()
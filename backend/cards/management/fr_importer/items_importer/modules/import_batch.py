@@ -0,0 +1,301 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Sequence, Type
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from cards.management.fr_importer.items_importer.modules.file_appenders import \
+    FileAppender, ImageFileAppender, MediaPathError, SoundFileAppender, \
+    add_image_get_instance, add_sound_get_instance
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    duplicate_policies
+from cards.management.fr_importer.items_parser.modules.html_formatted_card import \
+    HtmlFormattedCard
+from cards.management.fr_importer.items_parser.modules.html_memorized_card import \
+    HtmlFormattedMemorizedCard
+from cards.management.fr_importer.items_parser.modules.user_review import \
+    UserReview
+from cards.models import Card, CardImage, CardTemplate, CardUserData, \
+    Category
+from cards.utils.helpers import batched, get_file_hash
+from users.models import User
+
+
+class ImportedMedia:
+    """
+    Images and sounds of imported items by paths of their files - each
+    file is added to (or found in) the database once per import, no
+    matter how many items refer to it.
+
+    prefetch() resolves all files referred to by a batch of items: files
+    are hashed by a pool of threads, digests are looked up with a query
+    per chunk and only files not found in the database are added.
+
+    With the root given, files have to be inside it (see
+    FileAppender.validate_path()). Files which are missing or outside
+    the root aren't added - their paths are kept in errors instead, and
+    get_errors() tells which of an item's files they are.
+    """
+    # number of digests looked up with a single query
+    lookup_chunk_size = 1000
+
+    def __init__(self, hash_workers: int | None = None,
+                 root: str | None = None):
+        self.hash_workers = hash_workers
+        self.root = root
+        self.errors = {}
+        self._images = {}
+        self._sounds = {}
+
+    def prefetch(self, card_objects: Iterable[HtmlFormattedCard]):
+        image_paths, sound_paths = set(), set()
+        for card_object in card_objects:
+            for card_part in ("question", "answer"):
+                side_fields = card_object[card_part]
+                image_paths.add(side_fields["image_file_path"])
+                sound_paths.add(side_fields["sound_file_path"])
+        self._prefetch_files(self._images, image_paths, ImageFileAppender)
+        self._prefetch_files(self._sounds, sound_paths, SoundFileAppender)
+
+    def _prefetch_files(self, instances: dict, paths: set,
+                        Appender: Type[FileAppender]):
+        valid_paths = {}
+        for path in paths:
+            if not path or path in instances or path in self.errors:
+                continue
+            try:
+                valid_paths[path] = Appender.validate_path(path, self.root)
+            except (MediaPathError, FileNotFoundError) as e:
+                self.errors[path] = str(e)
+        if not valid_paths:
+            return
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as executor:
+            digests = dict(zip(valid_paths, executor.map(
+                self._hash_file, valid_paths.values())))
+        found = {}
+        for digests_chunk in batched(set(digests.values()),
+                                     self.lookup_chunk_size):
+            lookup = {f"{Appender.hash_field}__in": digests_chunk}
+            found.update(
+                (getattr(instance, Appender.hash_field), instance)
+                for instance in Appender.DatabaseFileModel.objects.filter(
+                    **lookup))
+        for path, digest in digests.items():
+            if digest not in found:
+                found[digest] = Appender(valid_paths[path]).file_instance
+            instances[path] = found[digest]
+
+    @staticmethod
+    def _hash_file(path) -> str:
+        with open(path, "rb") as opened_file:
+            return get_file_hash(File(opened_file))
+
+    def get_errors(self, card_object: HtmlFormattedCard) -> list[str]:
+        """
+        Errors of (prefetched) files of the item.
+        """
+        return [self.errors[side_fields[field]]
+                for side_fields in (card_object["question"],
+                                    card_object["answer"])
+                for field in ("image_file_path", "sound_file_path")
+                if side_fields[field] in self.errors]
+
+    def get_image(self, image_path):
+        if image_path not in self._images:
+            self._images[image_path] = add_image_get_instance(
+                ImageFileAppender.validate_path(image_path, self.root))
+        return self._images[image_path]
+
+    def get_sound(self, sound_path):
+        if sound_path not in self._sounds:
+            self._sounds[sound_path] = add_sound_get_instance(
+                SoundFileAppender.validate_path(sound_path, self.root))
+        return self._sounds[sound_path]
+
+
+class ImportBatch:
+    """
+    Cards made of a batch of imported items. save() writes the cards,
+    their images and categories with a bulk insert per table, in a single
+    transaction.
+
+    Items matching existing cards are handled according to
+    the duplicate_policy (see import_plan.duplicate_policies).
+    """
+    def __init__(self, media: ImportedMedia,
+                 template: CardTemplate | None = None,
+                 categories: Sequence[Category] = (),
+                 duplicate_policy: str = "skip"):
+        if duplicate_policy not in duplicate_policies:
+            raise ValueError(f"unknown duplicate policy: {duplicate_policy}")
+        self._media = media
+        self._template = template
+        self._categories = categories
+        self.duplicate_policy = duplicate_policy
+        self.cards = []
+        self.duplicates = []
+        # existing cards which are merged or updated
+        self._changed_cards = []
+        self._card_images = []
+        # ids of updated cards, whose images are replaced
+        self._replaced_images = []
+
+    def add(self, card_object: HtmlFormattedCard
+                               | HtmlFormattedMemorizedCard) -> Card:
+        card = Card(front=card_object.question_output_text,
+                    back=card_object.answer_output_text)
+        self._fill_card(card, card_object)
+        self.cards.append(card)
+        return card
+
+    def add_duplicate(self, card_object: HtmlFormattedCard
+                                         | HtmlFormattedMemorizedCard,
+                      card: Card) -> Card:
+        """
+        Existing card with the same front and back as the item.
+        """
+        self.duplicates.append(card)
+        if self.duplicate_policy == "skip":
+            return card
+        if self.duplicate_policy == "update":
+            self._fill_card(card, card_object)
+            self._replaced_images.append(card.id)
+        else:
+            if card.front_audio_id is None:
+                card.front_audio = self._get_sound(card_object["question"])
+            if card.back_audio_id is None:
+                card.back_audio = self._get_sound(card_object["answer"])
+            self._add_images(card, card_object)
+        self._changed_cards.append(card)
+        return card
+
+    def _fill_card(self, card: Card, card_object):
+        card.template = self._template
+        card.front_audio = self._get_sound(card_object["question"])
+        card.back_audio = self._get_sound(card_object["answer"])
+        self._add_images(card, card_object)
+
+    def _add_images(self, card: Card, card_object):
+        for side, card_part in (("front", "question"), ("back", "answer")):
+            image_path = card_object[card_part]["image_file_path"]
+            if image_path:
+                self._card_images.append(CardImage(
+                    card=card, image=self._media.get_image(image_path),
+                    side=side))
+
+    def _get_sound(self, card_part):
+        sound_path = card_part["sound_file_path"]
+        return self._media.get_sound(sound_path) if sound_path else None
+
+    @property
+    def has_changes(self) -> bool:
+        """
+        Whether saving the batch writes anything (it doesn't if all items
+        are skipped duplicates).
+        """
+        return bool(self.cards or self._changed_cards)
+
+    def save(self):
+        if not self.has_changes:
+            return
+        CardCategory = Card.categories.through
+        with transaction.atomic():
+            Card.objects.bulk_create(self.cards)
+            if self._changed_cards:
+                self._save_changed_cards()
+            # merged cards may already have some of the images and
+            # categories
+            CardImage.objects.bulk_create(
+                self._card_images, ignore_conflicts=bool(self._changed_cards))
+            CardCategory.objects.bulk_create([
+                CardCategory(card_id=card.id, category_id=category.id)
+                for card in self.cards + self._changed_cards
+                for category in self._categories],
+                ignore_conflicts=bool(self._changed_cards))
+
+    def _save_changed_cards(self):
+        # last_modified (auto_now) isn't set by bulk_update()
+        modification_time = timezone.now()
+        for card in self._changed_cards:
+            card.last_modified = modification_time
+        Card.objects.bulk_update(self._changed_cards,
+                                 ["template", "front_audio", "back_audio",
+                                  "last_modified"])
+        if self._replaced_images:
+            CardImage.objects.filter(
+                card_id__in=self._replaced_images).delete()
+
+    def __len__(self):
+        return len(self.cards)
+
+
+class MemorizedImportBatch(ImportBatch):
+    """
+    Cards imported together with the user's review data.
+
+    Merged cards get review data only if the user has none; updated
+    cards have it overwritten.
+    """
+    def __init__(self, media: ImportedMedia, user: User, **kwargs):
+        super().__init__(media, **kwargs)
+        self._user = user
+        self._review_data = []
+        self._duplicates_review_data = []
+
+    def add(self, card_object: HtmlFormattedMemorizedCard) -> Card:
+        card = super().add(card_object)
+        self._review_data.append(CardUserData(
+            card=card, user=self._user, **card_object["review_details"]))
+        return card
+
+    def add_duplicate(self, card_object: HtmlFormattedMemorizedCard,
+                      card: Card) -> Card:
+        card = super().add_duplicate(card_object, card)
+        if self.duplicate_policy != "skip":
+            self._duplicates_review_data.append(CardUserData(
+                card=card, user=self._user,
+                **card_object["review_details"]))
+        return card
+
+    def save(self):
+        if not self.has_changes:
+            return
+        with transaction.atomic():
+            super().save()
+            new_review_data, updated_review_data = \
+                self._split_duplicates_review_data()
+            new_review_data = self._review_data + new_review_data
+            # introduced_on (auto_now_add) is overwritten on insert
+            introduced_on = [review_data.introduced_on
+                             for review_data in new_review_data]
+            CardUserData.objects.bulk_create(new_review_data)
+            for review_data, introduction_date in zip(new_review_data,
+                                                      introduced_on):
+                review_data.introduced_on = introduction_date
+            CardUserData.objects.bulk_update(new_review_data,
+                                             ["introduced_on"])
+            if updated_review_data:
+                CardUserData.objects.bulk_update(updated_review_data,
+                                                 UserReview.keys())
+
+    def _split_duplicates_review_data(self) -> tuple[list, list]:
+        """
+        Review data of duplicates which the user doesn't have yet and
+        review data replacing the user's existing one (with update policy).
+        """
+        if not self._duplicates_review_data:
+            return [], []
+        existing_ids = dict(CardUserData.objects.filter(
+            user=self._user,
+            card_id__in=[review_data.card_id for review_data
+                         in self._duplicates_review_data]
+        ).values_list("card_id", "id"))
+        new_review_data, updated_review_data = [], []
+        for review_data in self._duplicates_review_data:
+            if review_data.card_id not in existing_ids:
+                new_review_data.append(review_data)
+            elif self.duplicate_policy == "update":
+                review_data.id = existing_ids[review_data.card_id]
+                updated_review_data.append(review_data)
+        return new_review_data, updated_review_data
@@ -0,0 +1,68 @@
+from typing import Iterable
+
+from cards.management.fr_importer.items_parser.modules.html_formatted_card import \
+    HtmlFormattedCard
+from cards.models import Card
+from cards.utils.helpers import batched
+
+# what is done with an imported item matching an existing card:
+# skip - the card is left as it is,
+# merge - the card gets the item's categories, images and missing sounds,
+# update - the card is overwritten with the item
+duplicate_policies = ("skip", "merge", "update")
+
+
+def get_card_key(card_object: HtmlFormattedCard) -> tuple[str, str]:
+    """
+    Fields of a card made of the item which have to be unique together.
+    """
+    return card_object.question_output_text, card_object.answer_output_text
+
+
+class ImportPlan:
+    """
+    Splits a batch of imported items into new cards and duplicates -
+    items with the same front and back as cards already in the database.
+
+    Existing cards are looked up with a query per chunk of fronts and
+    matched by (front, back) in a dictionary. An item repeated within
+    the batch is planned once (its first occurrence).
+    """
+    # number of fronts looked up with a single query
+    lookup_chunk_size = 1000
+
+    def __init__(self, card_objects: Iterable[HtmlFormattedCard]):
+        self.new = []
+        # (item, existing card) pairs
+        self.duplicates = []
+        planned = {}
+        for card_object in card_objects:
+            planned.setdefault(get_card_key(card_object), card_object)
+        existing_cards = self._find_cards(planned.keys())
+        for card_key, card_object in planned.items():
+            if card_key in existing_cards:
+                self.duplicates.append((card_object,
+                                        existing_cards[card_key]))
+            else:
+                self.new.append(card_object)
+
+    def _find_cards(self, card_keys) -> dict[tuple[str, str], Card]:
+        card_keys = set(card_keys)
+        cards = {}
+        for fronts in batched({front for front, _ in card_keys},
+                              self.lookup_chunk_size):
+            for card in Card.objects.filter(front__in=fronts).only(
+                    "front", "back", "template", "front_audio",
+                    "back_audio"):
+                if (card.front, card.back) in card_keys:
+                    cards[card.front, card.back] = card
+        return cards
+
+    def get_items(self, duplicate_policy: str) -> list[HtmlFormattedCard]:
+        """
+        Items which will be written into the database.
+        """
+        if duplicate_policy == "skip":
+            return self.new
+        return self.new + [card_object
+                           for card_object, _ in self.duplicates]
@@ -1,37 +1,113 @@
-from typing import Sequence, Type
+from typing import Callable, Sequence
 from uuid import UUID
 
-from cards.management.fr_importer.items_importer.modules.imported_card import \
-    ImportedCard
-from cards.management.fr_importer.items_importer.modules.imported_memorized_card import \
-    ImportedMemorizedCard
-from cards.management.fr_importer.items_parser.items_parser import ItemsParser
+from cards.management.fr_importer.items_importer.modules.import_batch import \
+    ImportBatch, ImportedMedia, MemorizedImportBatch
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    ImportPlan
+from cards.management.fr_importer.items_parser.items_parser import \
+    ItemsParser, StreamingItemsParser
 from cards.models import Category, CardTemplate
+from cards.utils.helpers import batched
+
+
+def match_category(_category: Category | UUID | str) -> Category:
+    """
+    Category into which imported cards are put - given as an object or
+    by its id.
+    """
+    match _category:
+        case UUID() | str():
+            return Category.objects.get(id=_category)
+        case Category():
+            return _category
+        case _:
+            raise ValueError("Invalid argument for setting categories.")
 
 
 class ItemsImporter:
-    def __init__(self, elements_path: str):
+    default_batch_size = 500
+
+    def __init__(self, elements_path: str, streaming: bool = False,
+                 media_root: str | None = None):
+        """
+        With streaming set, elements.xml is parsed incrementally rather
+        than loaded into memory as a whole. With media_root set, media
+        files referred to by items have to be inside it (i.e. in
+        the directory an uploaded archive was extracted into).
+        """
+        self._media_root = media_root
         self._template = None
         self._categories = None
-        self._items_parser = ItemsParser(elements_path)
-
-    def import_cards_into_db(self):
+        parser_class = StreamingItemsParser if streaming else ItemsParser
+        self._items_parser = parser_class(elements_path)
+
+    def import_cards_into_db(self, batch_size: int | None = None,
+                             offset: int = 0,
+                             progress: Callable[[int], None] | None = None,
+                             workers: int = 1,
+                             duplicate_policy: str = "skip") -> dict:
         """
         Uploads items from FullRecall's elements.xml into the database.
-        """
-        for card_to_import in self._items_parser:
-            imported_card = self.import_single_card(card_to_import)
-            self.configure_imported_card(imported_card)
-            imported_card.save()
 
-    def import_single_card(self, card_to_import):
-        pass
+        Items are written batch_size at a time, with bulk inserts in
+        a transaction per batch. The first offset items are skipped, so an
+        interrupted import may be resumed from the number of items most
+        recently passed to progress - it's called after each batch with
+        the number of items (including skipped ones) imported so far.
 
-    def configure_imported_card(self, imported_card):
-        if self._categories:
-            imported_card.set_categories(self._categories)
-        if self._template:
-            imported_card.set_template(self._template)
+        With workers > 1, items are converted into cards by a pool of
+        processes, leaving only database writes to this one.
+
+        Items with the same front and back as existing cards are found
+        before each batch is written and skipped, merged into the cards
+        or update them - depending on the duplicate_policy.
+
+        Items whose media files are missing (or outside the media root)
+        aren't imported. Returns numbers of new cards and of duplicates
+        and errors of items which weren't imported.
+        """
+        batch_size = batch_size or self.default_batch_size
+        media = ImportedMedia(root=self._media_root)
+        categories = [match_category(category)
+                      for category in self._categories or []]
+        imported_items = offset
+        summary = {"new": 0, "duplicates": 0, "errors": []}
+        for cards_to_import in batched(
+                self._items_parser.iter_cards(offset, workers),
+                batch_size):
+            plan = ImportPlan(cards_to_import)
+            # skipped duplicates don't even have their media looked up
+            media.prefetch(plan.get_items(duplicate_policy))
+            batch = self.make_batch(media, template=self._template,
+                                    categories=categories,
+                                    duplicate_policy=duplicate_policy)
+            for card_to_import in plan.new:
+                if not self._has_errors(card_to_import, media, summary):
+                    batch.add(card_to_import)
+            for card_to_import, card in plan.duplicates:
+                if duplicate_policy == "skip" or not self._has_errors(
+                        card_to_import, media, summary):
+                    batch.add_duplicate(card_to_import, card)
+            batch.save()
+            summary["new"] += len(batch)
+            summary["duplicates"] += len(batch.duplicates)
+            imported_items += len(cards_to_import)
+            if progress:
+                progress(imported_items)
+        return summary
+
+    @staticmethod
+    def _has_errors(card_object, media: ImportedMedia,
+                    summary: dict) -> bool:
+        errors = media.get_errors(card_object)
+        summary["errors"].extend(
+            f"'{card_object.question_output_text}': {error}"
+            for error in errors)
+        return bool(errors)
+
+    def make_batch(self, media: ImportedMedia, **kwargs) -> ImportBatch:
+        return ImportBatch(media, **kwargs)
 
     def set_template(self, template: CardTemplate):
         self._template = template
@@ -71,14 +147,14 @@ class PendingItemsImporter(ItemsImporter):
     """
     Imports cards without adding review details into the database.
     """
-    def import_single_card(self, card_to_import):
-        return ImportedCard(card_to_import)
 
 
 class MemorizedItemsImporter(ItemsImporter):
-    def __init__(self, elements_path, user):
-        super(MemorizedItemsImporter, self).__init__(elements_path)
+    def __init__(self, elements_path, user, streaming=False,
+                 media_root=None):
+        super(MemorizedItemsImporter, self).__init__(elements_path,
+                                                     streaming, media_root)
         self._user = user
 
-    def import_single_card(self, card_to_import):
-        return ImportedMemorizedCard(card_to_import, self._user)
+    def make_batch(self, media, **kwargs):
+        return MemorizedImportBatch(media, self._user, **kwargs)
@@ -1,11 +1,12 @@
 import os.path
 from unittest import skip
 
+from django.core.files.storage import default_storage
 from django.test import TestCase
 
 from cards.management.fr_importer.items_importer.modules.file_appenders import \
-    ImageFileAppender, add_image_get_instance, add_sound_get_instance, \
-    SoundFileAppender
+    ImageFileAppender, MediaPathError, add_image_get_instance, \
+    add_sound_get_instance, SoundFileAppender
 from cards.models import Image, Sound
 
 
@@ -45,6 +46,23 @@ class AddingNewImageFile(TestCase):
 
         self.assertRaises(FileNotFoundError, throw_file_not_found)
 
+    def test_path_outside_root(self):
+        """
+        Paths leading (through '..' or an absolute path) outside the root
+        are rejected.
+        """
+        root = os.path.dirname(os.path.dirname(self.image_file_path))
+        for file_path in (os.path.join(root, "images", "..", "..",
+                                       "fdb", "images", "teller.png"),
+                          os.path.abspath(self.image_file_path)):
+            self.assertEqual(ImageFileAppender.validate_path(file_path,
+                                                             root),
+                             os.path.realpath(self.image_file_path))
+        for file_path in (os.path.join(root, "..", "elements.xml"),
+                          "/etc/passwd"):
+            with self.assertRaises(MediaPathError):
+                ImageFileAppender.validate_path(file_path, root)
+
     def test_add_image_get_instance(self):
         image_instance = add_image_get_instance(self.image_file_path)
         self.assertIsNotNone(image_instance)
@@ -82,6 +100,13 @@ class AddingExistingImageFile(TestCase):
         self.assertEqual(str(self.instance_1),
                          str(self.instance_2))
 
+    def test_duplicate_removed_from_storage(self):
+        images_path = default_storage.path("images")
+        stored_files = set(os.listdir(images_path))
+        ImageFileAppender(self.file_in_db_path).file_instance
+
+        self.assertSetEqual(set(os.listdir(images_path)), stored_files)
+
 
 class AddingNewSoundFile(TestCase):
     @classmethod
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import zipfile
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+
+from cards.management.fr_importer.fr_archive import FullRecallArchive, \
+    InvalidArchive
+
+fdb_path = "cards/management/fr_importer/items_importer/tests/test_data/fdb/"
+
+
+def make_archive(directory="fdb/", extra_members=()) -> bytes:
+    """
+    Zip of the test FullRecall database (in the directory).
+    """
+    archive_file = BytesIO()
+    with zipfile.ZipFile(archive_file, "w",
+                         compression=zipfile.ZIP_DEFLATED) as archive:
+        for root, _, file_names in os.walk(fdb_path):
+            for file_name in file_names:
+                path = os.path.join(root, file_name)
+                archive.write(path, directory + os.path.relpath(path,
+                                                                fdb_path))
+        for name, contents in extra_members:
+            archive.writestr(name, contents)
+    return archive_file.getvalue()
+
+
+class ValidatingArchives(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.directory.name, "archive.zip")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_archive(self, contents: bytes) -> FullRecallArchive:
+        with open(self.archive_path, "wb") as archive_file:
+            archive_file.write(contents)
+        return FullRecallArchive(self.archive_path)
+
+    def test_valid(self):
+        archive = self.get_archive(make_archive(
+            extra_members=[("fdb/backup/elements.xml", "")]))
+
+        self.assertEqual(archive.validate(), "fdb/elements.xml")
+
+    def test_extracting(self):
+        elements_path = self.get_archive(make_archive()).extract(
+            os.path.join(self.directory.name, "extracted"))
+
+        self.assertEqual(elements_path, os.path.join(
+            self.directory.name, "extracted", "fdb", "elements.xml"))
+        self.assertTrue(os.path.isfile(os.path.join(
+            os.path.dirname(elements_path), "images", "teller.png")))
+
+    def test_not_zip(self):
+        with self.assertRaisesRegex(InvalidArchive, "zip"):
+            self.get_archive(b"not a zip").validate()
+
+    def test_no_elements(self):
+        archive_file = BytesIO()
+        with zipfile.ZipFile(archive_file, "w") as archive:
+            archive.writestr("images/a.png", b"")
+
+        with self.assertRaisesRegex(InvalidArchive, "No elements.xml"):
+            self.get_archive(archive_file.getvalue()).validate()
+
+    def test_ambiguous_elements(self):
+        archive = self.get_archive(make_archive(
+            extra_members=[("other/elements.xml", "")]))
+
+        with self.assertRaisesRegex(InvalidArchive, "More than one"):
+            archive.validate()
+
+    def test_not_fullrecall(self):
+        archive_file = BytesIO()
+        with zipfile.ZipFile(archive_file, "w") as archive:
+            archive.writestr("elements.xml", "<html></html>")
+
+        with self.assertRaisesRegex(InvalidArchive, "FullRecall"):
+            self.get_archive(archive_file.getvalue()).validate()
+
+    def test_unsafe_path(self):
+        archive = self.get_archive(make_archive(
+            extra_members=[("fdb/../../outside.png", b"")]))
+
+        with self.assertRaisesRegex(InvalidArchive, "Unsafe path"):
+            archive.validate()
+
+    @override_settings(FULLRECALL_ARCHIVE_MAX_SIZE=1000)
+    def test_too_large(self):
+        with self.assertRaisesRegex(InvalidArchive, "too large"):
+            self.get_archive(make_archive()).validate()
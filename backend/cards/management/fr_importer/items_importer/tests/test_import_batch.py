@@ -0,0 +1,100 @@
+import os.path
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cards.management.fr_importer.items_importer.modules.file_appenders import \
+    add_image_get_instance, add_sound_get_instance
+from cards.management.fr_importer.items_importer.modules.import_batch import \
+    ImportedMedia
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    ImportPlan
+from cards.management.fr_importer.items_parser.items_parser import ItemsParser
+from cards.models import Card, Image, Sound
+
+
+class PrefetchingMedia(TestCase):
+    elements_path = ("cards/management/fr_importer/items_importer/"
+                     "tests/test_data/fdb/elements.xml")
+    images_path = ("cards/management/fr_importer/items_importer/"
+                   "tests/test_data/fdb/images/")
+
+    def setUp(self):
+        self.cards = list(ItemsParser(self.elements_path))
+        self.media = ImportedMedia(hash_workers=2)
+
+    def test_adding_files(self):
+        self.media.prefetch(self.cards)
+
+        self.assertEqual(Image.objects.count(), 2)
+        self.assertEqual(Sound.objects.count(), 3)
+
+    def test_existing_files(self):
+        """
+        Files already in the database are looked up with a query
+        per model.
+        """
+        image = add_image_get_instance(self.images_path + "teller.png")
+        for card in self.cards:
+            for card_part in ("question", "answer"):
+                if card[card_part]["sound_file_path"]:
+                    add_sound_get_instance(card[card_part]["sound_file_path"])
+        with CaptureQueriesContext(connection) as queries:
+            self.media.prefetch(self.cards[2:])
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(self.media.get_image(
+            self.cards[2]["question"]["image_file_path"]), image)
+
+    def test_same_contents(self):
+        """
+        Files with the same contents (under different paths) are added
+        once.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, file_name)
+                     for file_name in ("first.png", "second.png")]
+            for path in paths:
+                shutil.copy(self.images_path + "teller.png", path)
+            card_objects = [
+                {"question": {"image_file_path": path,
+                              "sound_file_path": None},
+                 "answer": {"image_file_path": None,
+                            "sound_file_path": None}}
+                for path in paths]
+            self.media.prefetch(card_objects)
+
+            self.assertEqual(Image.objects.count(), 1)
+            self.assertEqual(self.media.get_image(paths[0]),
+                             self.media.get_image(paths[1]))
+
+
+class PlanningImport(TestCase):
+    elements_path = PrefetchingMedia.elements_path
+
+    def setUp(self):
+        self.cards = list(ItemsParser(self.elements_path))
+
+    def test_existing_cards(self):
+        card = Card.objects.create(front=self.cards[0].question_output_text,
+                                   back=self.cards[0].answer_output_text)
+        Card.objects.create(front=self.cards[1].question_output_text,
+                            back="other back")
+        with self.assertNumQueries(1):
+            plan = ImportPlan(self.cards)
+
+        self.assertListEqual(plan.duplicates, [(self.cards[0], card)])
+        self.assertListEqual(plan.new, self.cards[1:])
+        self.assertListEqual(plan.get_items("skip"), self.cards[1:])
+        self.assertEqual(len(plan.get_items("merge")), 3)
+
+    def test_repeated_items(self):
+        """
+        An item repeated within a batch is planned once.
+        """
+        plan = ImportPlan(self.cards + self.cards[:1])
+
+        self.assertListEqual(plan.new, self.cards)
@@ -1,9 +1,16 @@
 import datetime
+import os.path
+import shutil
+import tempfile
+import uuid
 from unittest import skip
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import MultipleObjectsReturned
-from django.test import TestCase
+from django.core.exceptions import MultipleObjectsReturned, \
+    ObjectDoesNotExist
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 from cards.management.fr_importer.items_importer.modules.items_importer import \
@@ -13,7 +20,10 @@ from cards.management.fr_importer.items_parser.modules.html_formatted_card impor
     HtmlFormattedCard
 from cards.management.fr_importer.items_parser.modules.user_review import \
     UserReview
-from cards.models import Category, Card, CardTemplate, CardUserData
+from cards.models import Category, Card, CardTemplate, CardUserData, Image, \
+    Sound
+
+fdb_path = "cards/management/fr_importer/items_importer/tests/test_data/fdb/"
 
 
 class ItemsImporterTests(TestCase):
@@ -88,6 +98,33 @@ class ItemsImporterTests(TestCase):
             self.assertEqual(card_categories[0].name,
                              self.category_1_name)
 
+    def test_adding_cards_to_mixed_categories(self):
+        """
+        Categories given by objects and by ids.
+        """
+        self.items_importer.set_categories([self.categories[0],
+                                            str(self.categories[1].id)])
+        self.items_importer.import_cards_into_db()
+
+        self.assertEqual(Card.objects.filter(
+            categories=self.categories[1]).count(), 3)
+        self.assertEqual(Card.objects.filter(
+            categories=self.categories[0]).count(), 3)
+
+    def test_adding_cards_to_non_existing_category(self):
+        self.items_importer.set_categories([uuid.uuid4()])
+
+        with self.assertRaises(ObjectDoesNotExist):
+            self.items_importer.import_cards_into_db()
+        self.assertFalse(Card.objects.exists())
+
+    def test_adding_cards_to_invalid_category(self):
+        self.items_importer.set_categories([1])
+
+        with self.assertRaisesMessage(
+                ValueError, "Invalid argument for setting categories."):
+            self.items_importer.import_cards_into_db()
+
     def test_adding_template(self):
         """
         Each card is given the same template.
@@ -106,6 +143,20 @@ class ItemsImporterTests(TestCase):
         self.items_importer.import_cards_into_db()
         self.assert_template_title()
 
+    def test_adding_template_by_uuid_string(self):
+        self.items_importer.set_template_by_uuid(str(self.template.id))
+        self.items_importer.import_cards_into_db()
+        self.assert_template_title()
+
+    def test_adding_template_wrong_uuid(self):
+        with self.assertRaises(ObjectDoesNotExist):
+            self.items_importer.set_template_by_uuid(uuid.uuid4())
+
+    def test_adding_template_wrong_title(self):
+        with self.assertRaises(ObjectDoesNotExist):
+            self.items_importer.set_template_by_title(
+                "no title, even fake one")
+
     def assert_template_title(self):
         """
         A shortcut for tests of setting cards' template:
@@ -164,6 +215,106 @@ class ItemsImporterTests(TestCase):
         self.items_importer.import_cards_into_db()
         self.assert_cards_from_categories()
 
+    def test_streaming_import(self):
+        """
+        Importing from an incrementally parsed file.
+        """
+        items_importer = PendingItemsImporter(self.elements_path,
+                                              streaming=True)
+        items_importer.set_import_category("category_1.category_2.category 3")
+        items_importer.import_cards_into_db()
+        self.assert_cards_from_categories()
+
+    def test_importing_in_batches(self):
+        progress = []
+        self.items_importer.import_cards_into_db(batch_size=2,
+                                                 progress=progress.append)
+
+        self.assertEqual(Card.objects.count(), 3)
+        self.assertListEqual(progress, [2, 3])
+
+    def test_resuming_import(self):
+        """
+        Items before the offset have already been imported.
+        """
+        progress = []
+        self.items_importer.import_cards_into_db(batch_size=2, offset=2,
+                                                 progress=progress.append)
+
+        self.assert_cards_from_categories()
+        self.assertListEqual(progress, [3])
+
+    def test_imported_media(self):
+        self.items_importer.import_cards_into_db(batch_size=2)
+        card = Card.objects.get(front__contains="question 1")
+
+        self.assertFalse(card.front_images)
+        self.assertEqual(len(card.back_images), 1)
+        self.assertIsNone(card.front_audio)
+        self.assertTrue(card.back_audio.sound_file.name.endswith(".mp3"))
+
+    def test_reimport_skips_duplicates(self):
+        """
+        Items already imported are neither written nor have their media
+        looked up.
+        """
+        self.items_importer.import_cards_into_db()
+        with CaptureQueriesContext(connection) as queries:
+            summary = PendingItemsImporter(
+                self.elements_path).import_cards_into_db()
+
+        self.assertDictEqual(summary, {"new": 0, "duplicates": 3,
+                                       "errors": []})
+        self.assertEqual(Card.objects.count(), 3)
+        # a lookup of existing cards
+        self.assertEqual(len(queries.captured_queries), 1)
+
+    def test_media_outside_root(self):
+        """
+        Items whose media files are outside the media root aren't
+        imported - the rest of them is.
+        """
+        media_root = os.path.join(os.path.dirname(self.elements_path),
+                                  "snds")
+        summary = PendingItemsImporter(
+            self.elements_path, media_root=media_root).import_cards_into_db()
+
+        self.assertEqual(summary["new"], 1)
+        self.assertEqual(len(summary["errors"]), 2)
+        self.assertIn("is outside", summary["errors"][0])
+        self.assertIn("question 2", Card.objects.get().front)
+        self.assertFalse(Image.objects.exists())
+
+    def test_merging_duplicates(self):
+        card = self.make_duplicate_of("question 1")
+        self.items_importer.set_categories(self.categories)
+        summary = self.items_importer.import_cards_into_db(
+            duplicate_policy="merge")
+
+        self.assertDictEqual(summary, {"new": 2, "duplicates": 1,
+                                       "errors": []})
+        card.refresh_from_db()
+        self.assertIsNone(card.template)
+        self.assertTrue(card.back_audio.sound_file.name.endswith(".mp3"))
+        self.assertEqual(len(card.back_images), 1)
+        self.assertEqual(card.categories.count(), 2)
+
+    def test_updating_duplicates(self):
+        card = self.make_duplicate_of("question 1")
+        self.items_importer.set_template(self.template)
+        self.items_importer.import_cards_into_db(duplicate_policy="update")
+
+        card.refresh_from_db()
+        self.assertEqual(card.template, self.template)
+        self.assertEqual(len(card.back_images), 1)
+        self.assertEqual(Card.objects.count(), 3)
+
+    def make_duplicate_of(self, question) -> Card:
+        card_object = next(card for card in ItemsParser(self.elements_path)
+                           if question in card.question_output_text)
+        return Card.objects.create(front=card_object.question_output_text,
+                                   back=card_object.answer_output_text)
+
     def assert_cards_from_categories(self):
         """
         A shortcut for tests:
@@ -184,6 +335,127 @@ class ItemsImporterTests(TestCase):
         self.assertEqual(received_card.back, expected_answer_value)
 
 
+class ImportingMediaBySide(TestCase):
+    """
+    Images and sounds of items are added to the side of the card they
+    appear on.
+    """
+    items = {
+        "both images": ("<img>images/teller.png</img>",
+                        "<img>images/chess_board.jpg</img>"),
+        "front image": ("<img>images/teller.png</img>", ""),
+        "back image": ("", "<img>images/chess_board.jpg</img>"),
+        "both sounds": ("<snd>snds/but_the_only_jobs.mp3</snd>",
+                        "<snd>snds/english_examples_0609.mp3</snd>"),
+        "front sound": ("<snd>snds/but_the_only_jobs.mp3</snd>", ""),
+        "back sound": ("", "<snd>snds/english_examples_0609.mp3</snd>"),
+        "no media": ("", ""),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copytree(fdb_path, directory, dirs_exist_ok=True)
+            elements_path = os.path.join(directory, "elements.xml")
+            with open(elements_path, "w") as elements_file:
+                elements_file.write(cls.make_elements())
+            PendingItemsImporter(elements_path).import_cards_into_db()
+
+    @classmethod
+    def make_elements(cls) -> str:
+        items = "".join(
+            f'<item id="{number}" tmtrpt="1" stmtrpt="1" livl="1" '
+            f'rllivl="1" ivl="1" rp="1" gr="4">'
+            f"<q><![CDATA[{name} question{question}]]></q>"
+            f"<a><![CDATA[{name} answer{answer}]]></a></item>"
+            for number, (name, (question, answer))
+            in enumerate(cls.items.items(), 1))
+        return ('<fullrecall core_version="12" time_of_start="1186655166">'
+                f'<category name="category">{items}</category></fullrecall>')
+
+    @staticmethod
+    def get_card(name) -> Card:
+        return Card.objects.get(front__contains=f"{name} question")
+
+    def test_images(self):
+        card = self.get_card("both images")
+
+        self.assertEqual(len(card.front_images), 1)
+        self.assertRegex(str(card.front_images[0].image),
+                         r"images/teller.*\.png")
+        self.assertEqual(len(card.back_images), 1)
+        self.assertRegex(str(card.back_images[0].image),
+                         r"images/chess_board.*\.jpg")
+
+    def test_front_image_only(self):
+        card = self.get_card("front image")
+
+        self.assertEqual(len(card.front_images), 1)
+        self.assertFalse(card.back_images)
+
+    def test_back_image_only(self):
+        card = self.get_card("back image")
+
+        self.assertFalse(card.front_images)
+        self.assertEqual(len(card.back_images), 1)
+
+    def test_sounds(self):
+        card = self.get_card("both sounds")
+
+        self.assertIn("but_the_only_jobs", str(card.front_audio))
+        self.assertIn("english_examples_0609", str(card.back_audio))
+
+    def test_front_sound_only(self):
+        card = self.get_card("front sound")
+
+        self.assertIn("but_the_only_jobs", str(card.front_audio))
+        self.assertIsNone(card.back_audio)
+
+    def test_back_sound_only(self):
+        card = self.get_card("back sound")
+
+        self.assertIsNone(card.front_audio)
+        self.assertIn("english_examples_0609", str(card.back_audio))
+
+    def test_no_media(self):
+        card = self.get_card("no media")
+
+        self.assertFalse(card.front_images)
+        self.assertFalse(card.back_images)
+        self.assertIsNone(card.front_audio)
+        self.assertIsNone(card.back_audio)
+
+    def test_shared_media(self):
+        """
+        Media files used by several items are added once.
+        """
+        self.assertEqual(Image.objects.count(), 2)
+        self.assertEqual(Sound.objects.count(), 2)
+
+
+class ImportingInPool(TransactionTestCase):
+    """
+    Converting items by a pool of processes (which have to see committed
+    data - hence the TransactionTestCase).
+    """
+    elements_path = ("cards/management/fr_importer/items_importer/"
+                     "tests/test_data/fdb/elements.xml")
+
+    def test_import(self):
+        User = get_user_model()
+        user = User.objects.create(username="user")
+        items_importer = MemorizedItemsImporter(self.elements_path, user)
+        items_importer.import_cards_into_db(batch_size=2, workers=2)
+
+        self.assertSetEqual(
+            set(Card.objects.values_list("front", flat=True)),
+            {card.question_output_text
+             for card in ItemsParser(self.elements_path)})
+        self.assertEqual(CardUserData.objects.filter(user=user).count(), 3)
+        self.assertEqual(len(Card.objects.get(
+            front__contains="question 1").back_images), 1)
+
+
 class MemorizedItemsImporterTestCase(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -222,3 +494,43 @@ class MemorizedItemsImporterTestCase(TestCase):
                             "introduced_on": introduced_on,
                             'review_date': datetime.date(2027, 12, 22)}
         self.assertDictEqual(dict_user_review, dict(review_data))
+
+    def test_merged_card_introduced_on(self):
+        """
+        Review data added to a merged card is introduced on the date from
+        elements.xml rather than on the date of the import.
+        """
+        card_object = next(card for card in ItemsParser(self.elements_path)
+                           if "question 3" in card.question_output_text)
+        card = Card.objects.create(front=card_object.question_output_text,
+                                   back=card_object.answer_output_text)
+        self.card_importer.import_cards_into_db(duplicate_policy="merge")
+        review_data = CardUserData.objects.get(user=self.user)
+
+        self.assertEqual(review_data.card, card)
+        self.assertEqual(review_data.introduced_on.date(),
+                         self.user_review.introduced_on.date())
+
+    def test_merged_card_review_data(self):
+        """
+        Review data of a merged card is added only if the user has none.
+        """
+        self.card_importer.import_cards_into_db()
+        CardUserData.objects.update(grade=1)
+        card = Card.objects.get()
+        other_user = get_user_model().objects.create(username="other user")
+        MemorizedItemsImporter(self.elements_path, other_user) \
+            .import_cards_into_db(duplicate_policy="merge")
+        self.card_importer.import_cards_into_db(duplicate_policy="merge")
+
+        self.assertEqual(CardUserData.objects.get(
+            card=card, user=self.user).grade, 1)
+        self.assertEqual(CardUserData.objects.get(
+            card=card, user=other_user).grade, 5)
+
+    def test_updated_card_review_data(self):
+        self.card_importer.import_cards_into_db()
+        CardUserData.objects.update(grade=1)
+        self.card_importer.import_cards_into_db(duplicate_policy="update")
+
+        self.assertEqual(CardUserData.objects.get(user=self.user).grade, 5)
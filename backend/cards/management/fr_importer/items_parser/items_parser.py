@@ -1,15 +1,56 @@
+import multiprocessing
 import os.path
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from os import PathLike
 from xml.etree.ElementTree import Element
 
+from django.db import connections
+
 from cards.management.fr_importer.items_parser.modules.html_memorized_card import \
     HtmlFormattedMemorizedCard
 from cards.management.fr_importer.items_parser.modules.item import Item
-from cards.utils.xml_parser import parse
+from cards.utils.helpers import batched
+from cards.utils.xml_parser import iterparse, parse
+
+
+class ConvertedCard:
+    """
+    Plain data of a card - output texts and fields of its sides and review
+    details - which, unlike the card itself, may be passed between
+    processes.
+    """
+    def __init__(self, card: HtmlFormattedMemorizedCard):
+        self.question_output_text = card.question_output_text
+        self.answer_output_text = card.answer_output_text
+        self._fields = dict(zip(card.keys(), card.values()))
+
+    def keys(self):
+        return self._fields.keys()
+
+    def __getitem__(self, key):
+        return self._fields[key]
+
+
+def convert_items(items_data, time_of_start, dirname) -> list[ConvertedCard]:
+    """
+    Turns items (as returned by ItemsParser.iter_items_data()) into
+    converted cards; run by processes of a pool.
+    """
+    converted_cards = []
+    for item_data in items_data:
+        card = ItemsParser.Card(item_data, time_of_start)
+        card.expanding_path = dirname
+        converted_cards.append(ConvertedCard(card))
+    return converted_cards
 
 
 class ItemsParser:
     Card = HtmlFormattedMemorizedCard
+    # number of items sent to a process of a pool at a time
+    pool_chunk_size = 200
 
     def __init__(self, path):
         self._original_path = path
@@ -50,8 +91,149 @@ class ItemsParser:
     def items(self):
         return self._starting_node.iter("item")
 
-    def __iter__(self):
-        for item_element in self.items:
+    def iter_items_data(self, offset: int = 0):
+        """
+        Yields contents of items (questions, answers and review details)
+        as plain dictionaries, skipping the first offset items.
+        """
+        for item_element in islice(self.items, offset, None):
+            item = Item(item_element)
+            yield {"question": item.question, "answer": item.answer,
+                   "review_details": dict(item.review_details)}
+
+    def iter_cards(self, offset: int = 0, workers: int = 1):
+        """
+        Yields cards made of items, skipping the first offset items
+        (which aren't turned into cards at all).
+
+        With workers > 1, items are converted by a pool of processes and
+        yielded (in their order) as ConvertedCard objects.
+        """
+        if workers > 1:
+            yield from self._iter_cards_in_pool(offset, workers)
+            return
+        for item_element in islice(self.items, offset, None):
             card = self.Card(Item(item_element), self.time_of_start)
             card.expanding_path = self.dirname
             yield card
+
+    def _iter_cards_in_pool(self, offset, workers):
+        # forked workers would share the parent's database connections
+        connections.close_all()
+        # the number of chunks being converted is limited, so that items
+        # aren't read (much) faster than converted cards are consumed
+        max_pending = 2 * workers
+        pending = deque()
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork")) as executor:
+            for items_data in batched(self.iter_items_data(offset),
+                                      self.pool_chunk_size):
+                pending.append(executor.submit(
+                    convert_items, items_data, self.time_of_start,
+                    self.dirname))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def __iter__(self):
+        return self.iter_cards()
+
+
+class StreamingItemsParser(ItemsParser):
+    """
+    Parses elements.xml incrementally: items are yielded as soon as they
+    are read and processed elements are cleared, so memory use doesn't
+    depend on the size of the file.
+
+    The import xpath is limited to paths of categories, as set by
+    ItemsImporter.set_import_category():
+    ./category[@name='category1']/category[@name='category2']
+    """
+    _category_xpath_step = re.compile(r"category\[@name='([^']*)'\]")
+
+    def __init__(self, path):
+        self._original_path = path
+        self._import_xpath = None
+        self._import_category_path = None
+        self._time_of_start = self._read_time_of_start()
+
+    def _read_time_of_start(self) -> int:
+        for _, root in iterparse(self._original_path, events=("start",)):
+            return int(root.attrib["time_of_start"])
+        raise ValueError(f"No elements in {self._original_path}.")
+
+    @property
+    def time_of_start(self) -> int:
+        return self._time_of_start
+
+    @ItemsParser.import_xpath.setter
+    def import_xpath(self, path: str|None):
+        category_path = None
+        if path is not None:
+            category_path = self._get_category_path(path)
+            if not self._has_category(category_path):
+                raise ValueError(f"Given path: {path} was not found.")
+        self._import_xpath = path
+        self._import_category_path = category_path
+
+    def _get_category_path(self, xpath: str) -> list[str]:
+        steps = xpath.removeprefix("./").split("/")
+        matches = [self._category_xpath_step.fullmatch(step)
+                   for step in steps]
+        if not all(matches):
+            raise ValueError(f"Given path: {xpath} is not a path of "
+                             "categories.")
+        return [match.group(1) for match in matches]
+
+    def _has_category(self, category_path: list[str]) -> bool:
+        return any(found for found, _ in self._iter_elements(
+            category_path, tags=("category",)))
+
+    def _iter_elements(self, category_path, tags):
+        """
+        Yields (in_category, element) pairs for ends of elements with
+        given tags - in_category tells if the element is inside the
+        category at category_path (within the first such category, like
+        Element.find()). Stops after the end of that category.
+        """
+        # names of categories enclosing the current element; the root
+        # element is not counted
+        current_path = []
+        depth = 0
+        # depth of the category to import from (0 - the whole file)
+        import_depth = None if category_path else 0
+        for event, element in iterparse(self._original_path,
+                                        events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == "category" and depth > 1:
+                    current_path.append(element.get("name"))
+                    if import_depth is None \
+                            and current_path == category_path:
+                        import_depth = depth
+                continue
+            in_category = import_depth is not None
+            if element.tag in tags:
+                yield in_category, element
+            if element.tag == "category" and depth > 1:
+                current_path.pop()
+                if depth == import_depth:
+                    return
+            depth -= 1
+            if element.tag in ("item", "category"):
+                self._clear(element)
+
+    @staticmethod
+    def _clear(element):
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    @property
+    def items(self):
+        category_path = self._import_category_path or []
+        return (item_element for in_category, item_element
+                in self._iter_elements(category_path, tags=("item",))
+                if in_category)
@@ -4,6 +4,8 @@ class with methods/fields common for both question and answer as well
 as method/field signatures implemented in concrete classes.
 """
 
+from dataclasses import dataclass
+from functools import cached_property
 from os import path, PathLike
 import re
 
@@ -13,6 +15,18 @@ from cards.utils.xml_parser import from_string
 from cards.utils.helpers import compose
 
 
+@dataclass(frozen=True)
+class ParsedSide:
+    """
+    Contents of a side parsed once - everything the side's properties
+    are derived from.
+    """
+    contents: str
+    lines: tuple[str, ...]
+    image_path: str | None
+    sound_path: str | None
+
+
 class CardSide:
     """
     Abstract class for Item's question/answer (fields common
@@ -37,18 +51,32 @@ class CardSide:
                 e.unwrap()
         return str(soup)
 
+    @cached_property
+    def _parsed(self) -> ParsedSide:
+        contents = self._clean_contents(self._original_side_contents)
+        side_element = from_string(self._original_side_contents)
+        return ParsedSide(
+            contents=contents,
+            lines=tuple(contents.splitlines()),
+            image_path=self._get_element_text(side_element.find("img")),
+            sound_path=self._get_element_text(side_element.find("snd")))
+
+    @staticmethod
+    def _get_element_text(element) -> str | None:
+        if element is not None:
+            return element.text
+
     def _get_tag_contents(self, tag) -> str | None:
         """
         Extracts a path as it is embedded in the elements.xml file (which
         contains only relative paths to media files) - without expanding it
         into an absolute path.
         """
-        tag_contents = from_string(self._original_side_contents).find(tag)
-        if tag_contents is not None:
-            return tag_contents.text
+        return {"img": self._parsed.image_path,
+                "snd": self._parsed.sound_path}.get(tag)
 
     def _get_examples(self, from_line=1) -> list[str]:
-        return list(filter(None, self.side_contents.splitlines()[from_line:]))
+        return list(filter(None, self._parsed.lines[from_line:]))
 
     @staticmethod
     def _get_filename(file_path) -> str | None:
@@ -64,7 +92,7 @@ class CardSide:
         return output[0]
 
     def _get_line(self, index) -> str | None:
-        split_contents = self.side_contents.splitlines()
+        split_contents = self._parsed.lines
         try:
             line = split_contents[index]
         except IndexError:
@@ -101,8 +129,8 @@ class CardSide:
         self._expanding_path = file_path
 
     @property
-    def side_contents(self):
-        return self._clean_contents(self._original_side_contents)
+    def side_contents(self) -> str:
+        return self._parsed.contents
 
     @staticmethod
     def keys():
@@ -110,12 +138,12 @@ class CardSide:
                 "sound_file_path", "sound_file_name"]
 
     def values(self):
-        return [self.output_text, self.image_file_path,
-                self.image_file_name, self.sound_file_path,
-                self.sound_file_name]
+        return [getattr(self, key) for key in self.keys()]
 
     def __getitem__(self, key):
-        return dict(zip(self.keys(), self.values()))[key]
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
 
     @property
     def image_file_path(self) -> str|None:
@@ -1,6 +1,6 @@
 from cards.management.fr_importer.items_parser.modules.card_answer import Answer
 from cards.management.fr_importer.items_parser.modules.phonetics_converter import \
-    PhoneticsConverter
+    convert_techland_phonetics
 
 
 class HTMLFormattedAnswer(Answer):
@@ -32,8 +32,7 @@ class HTMLFormattedAnswer(Answer):
         raw_phonetics = super().phonetics_spelling
         formatted_phonetics = None
         if raw_phonetics is not None:
-            formatted_phonetics = PhoneticsConverter(
-                raw_phonetics).converted_phonetics
+            formatted_phonetics = convert_techland_phonetics(raw_phonetics)
         return formatted_phonetics
 
     @property
@@ -24,9 +24,8 @@ class HTMLFormattedQuestion(Question):
             new_text = new_text.replace(character[0], character[1])
         return new_text
 
-    @property
-    def side_contents(self):
-        return self._format_text(super().side_contents)
+    def _clean_contents(self, original_contents: str) -> str:
+        return self._format_text(super()._clean_contents(original_contents))
 
     @property
     def definition(self) -> str:
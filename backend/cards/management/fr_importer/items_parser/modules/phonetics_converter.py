@@ -1,3 +1,7 @@
+import re
+from functools import lru_cache
+
+
 class InvalidTokenError(Exception):
     pass
 
@@ -259,54 +263,42 @@ class Token:
 
 
 class PhoneticsConverter:
+    """
+    Splits phonetics into tokens - at every position the longest available
+    lexeme is matched (characters matching none are UNRECOGNIZED). The
+    tokenizer is a regular expression compiled once from the available
+    lexemes: alternatives are tried in order, longest lexemes first.
+    """
     _available_tokens = {tpl[0]: Token(tpl[0], **tpl[1])
                          for tpl in TECHLAND_PHONETICS}
+    longest_lexeme = max(len(lexeme) for lexeme in _available_tokens)
+    _lexeme_pattern = re.compile(
+        "|".join(re.escape(lexeme) for lexeme in sorted(
+            _available_tokens, key=len, reverse=True)) + "|.",
+        re.DOTALL)
 
     def __init__(self, phonetics):
         self._phonetics = phonetics
-        self._tokens = []
-        self._current = 0
-        self._longest_available_lexeme = self.longest_lexeme
-        self._scan_phonetics()
+        self._tokens = [self._get_token(lexeme) for lexeme
+                        in self._lexeme_pattern.findall(phonetics)]
 
     tokens = property(lambda self: tuple(self._tokens))
 
-    longest_lexeme = property(
-        lambda self: max([len(key) for key in self._available_tokens.keys()]))
-
     converted_phonetics = property(
         lambda self: "".join(token.html_output for token in self.tokens))
 
-    def _scan_token(self, length):
-        end = self._current + length
-        current_char = self._phonetics[self._current:end]
-        self._add_token(current_char)
-
-    def _add_token(self, lexeme):
-        if len(lexeme) < 2:
-            token = self._available_tokens.get(
-                lexeme, Token(lexeme, "UNRECOGNIZED"))
-        else:
-            token = self._available_tokens[lexeme]
-        self._tokens.append(token)
-
-    def _scan_phonetics(self):
-        while not self.is_at_end():
-            self._scan_tokens()
-
-    def _scan_tokens(self):
-        for length in range(self._longest_available_lexeme, 0, -1):
-            try:
-                self._scan_token(length)
-                self._current += length
-                break
-            except KeyError:
-                pass
-
-    def is_at_end(self):
-        return self._current >= len(self._phonetics)
+    def _get_token(self, lexeme):
+        token = self._available_tokens.get(lexeme)
+        if token is None:
+            token = Token(lexeme, "UNRECOGNIZED")
+        return token
 
 
+@lru_cache(maxsize=4096)
 def convert_techland_phonetics(phonetics):
+    """
+    Phonetics converted into HTML - memoized, since (vocabulary) cards
+    convert the same phonetics on every display.
+    """
     converter = PhoneticsConverter(phonetics)
     return converter.converted_phonetics
@@ -1,11 +1,14 @@
 """
 Tests for CardSide (itself tested through inheriting classes).
 """
+from dataclasses import FrozenInstanceError
 from unittest import TestCase
+from unittest.mock import patch
 
 from cards.management.fr_importer.items_parser.modules.card_answer import Answer
 from cards.management.fr_importer.items_parser.modules.card_question import Question
 from cards.management.fr_importer.items_parser.modules.card_side import CardSide
+from cards.utils.xml_parser import from_string
 
 
 class SoundExtractionTestCase(TestCase):
@@ -219,3 +222,35 @@ class ExpandingPathNoPathTags(TestCase):
     def test_no_snd(self):
         self.assertFalse(self.card_side.sound_file_path)
         self.assertFalse(self.card_side.sound_file_name)
+
+
+class ParsingOnce(TestCase):
+    """
+    Contents of a side are parsed once - all properties are read from
+    the parsed representation.
+    """
+    def setUp(self):
+        self.answer = Answer("jocular ['d7Ckjul2(r)]\n"
+                             "He, he, he! You will pardon me."
+                             "<img>images/a.jpg</img><snd>snds/a.mp3</snd>")
+
+    def test_parsed_once(self):
+        with patch.object(Answer, "_strip_tags_except_specific",
+                          wraps=Answer._strip_tags_except_specific) \
+                as stripping, \
+                patch("cards.management.fr_importer.items_parser.modules."
+                      "card_side.from_string", wraps=from_string) as parsing:
+            self.answer.values()
+            self.answer.example_sentences
+            self.answer["sound_file_name"]
+
+        stripping.assert_called_once()
+        parsing.assert_called_once()
+
+    def test_immutable(self):
+        with self.assertRaises(FrozenInstanceError):
+            self.answer._parsed.contents = ""
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            self.answer["phonetics"]
@@ -44,7 +44,8 @@ class CLIImportingCardsTestCase(TestCase):
         invokes PendingItemsImporter class.
         """
         with self.patch_pending_items_importer() as items_importer:
-            call_command(self.command, self.options["elements_path"])
+            call_command(self.command, self.options["elements_path"],
+                         stdout=self.command_output)
             items_importer.assert_called_once_with(self.options["elements_path"])
 
     def test_import_cards_for_user_id(self):
@@ -56,7 +57,7 @@ class CLIImportingCardsTestCase(TestCase):
         with self.patch_memorized_items_importer() as memorized_items_importer:
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             memorized_items_importer.assert_called_once_with(
                 self.options["elements_path"], self.user)
 
@@ -65,7 +66,7 @@ class CLIImportingCardsTestCase(TestCase):
         with self.patch_memorized_items_importer() as memorized_items_importer:
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             memorized_items_importer.assert_called_once_with(
                 self.options["elements_path"], self.user)
 
@@ -77,7 +78,7 @@ class CLIImportingCardsTestCase(TestCase):
                    return_value=mocked_instance):
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             mocked_instance.set_template_by_uuid.assert_called_once_with(
                 options["template_by_id"])
 
@@ -89,7 +90,7 @@ class CLIImportingCardsTestCase(TestCase):
                    return_value=mocked_instance):
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             mocked_instance.set_template_by_title.assert_called_once_with(
                 options["template_by_title"])
 
@@ -101,7 +102,7 @@ class CLIImportingCardsTestCase(TestCase):
                    return_value=mocked_instance):
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             mocked_instance.set_import_category.assert_called_once_with(
                 options["import_from_category"])
 
@@ -113,10 +114,66 @@ class CLIImportingCardsTestCase(TestCase):
                    return_value=mocked_instance):
             call_command(self.command,
                          self.options["elements_path"],
-                         **options)
+                         stdout=self.command_output, **options)
             mocked_instance.set_categories.assert_called_once_with(
                 [options["import_into_category"]])
 
+    def test_batch_size_offset_and_workers(self):
+        mocked_instance = MagicMock()
+
+        with patch(self.path_pending_items_importer, autospec=True,
+                   return_value=mocked_instance):
+            call_command(self.command,
+                         self.options["elements_path"],
+                         batch_size=100, offset=200, workers=4,
+                         stdout=self.command_output)
+            _, kwargs = mocked_instance.import_cards_into_db.call_args
+            self.assertEqual(kwargs["batch_size"], 100)
+            self.assertEqual(kwargs["offset"], 200)
+            self.assertEqual(kwargs["workers"], 4)
+
+    def test_reporting_progress(self):
+        mocked_instance = MagicMock()
+        mocked_instance.import_cards_into_db.side_effect = \
+            lambda progress, **kwargs: progress(500) \
+            or {"new": 480, "duplicates": 20, "errors": []}
+
+        with patch(self.path_pending_items_importer, autospec=True,
+                   return_value=mocked_instance):
+            call_command(self.command,
+                         self.options["elements_path"],
+                         stdout=self.command_output)
+        self.assertListEqual(
+            self.get_stripped_command_output().splitlines(),
+            ["500 items imported (resume with --offset 500).",
+             "480 new cards, 20 duplicates (skip)."])
+
+    def test_reporting_errors(self):
+        mocked_instance = MagicMock()
+        mocked_instance.import_cards_into_db.return_value = {
+            "new": 0, "duplicates": 0,
+            "errors": ["'question': snds/a.mp3 does not exist"]}
+        errors_output = StringIO()
+
+        with patch(self.path_pending_items_importer, autospec=True,
+                   return_value=mocked_instance):
+            call_command(self.command,
+                         self.options["elements_path"],
+                         stdout=self.command_output, stderr=errors_output)
+        self.assertIn("Not imported: 'question': snds/a.mp3 does not exist",
+                      errors_output.getvalue())
+
+    def test_duplicate_policy(self):
+        mocked_instance = MagicMock()
+
+        with patch(self.path_pending_items_importer, autospec=True,
+                   return_value=mocked_instance):
+            call_command(self.command,
+                         self.options["elements_path"],
+                         duplicates="merge", stdout=self.command_output)
+            _, kwargs = mocked_instance.import_cards_into_db.call_args
+            self.assertEqual(kwargs["duplicate_policy"], "merge")
+
     def patch_pending_items_importer(self):
         return patch(self.path_pending_items_importer, autospec=True)
 
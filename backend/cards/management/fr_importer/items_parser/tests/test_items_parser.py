@@ -1,9 +1,11 @@
+import os
+import tempfile
 import unittest
 from unittest import mock
 import xml.etree.ElementTree as ET
 
 from cards.management.fr_importer.items_parser.items_parser import \
-    ItemsParser as OriginalParser
+    ItemsParser as OriginalParser, StreamingItemsParser
 from cards.management.fr_importer.items_parser.modules.html_formatted_question import \
     HTMLFormattedQuestion
 
@@ -219,3 +221,131 @@ class ImportFromXPath(unittest.TestCase):
         self.assertEqual(xpath, self.items_importer.import_xpath)
 
 
+class StreamingParsing(unittest.TestCase):
+    """
+    Items parsed incrementally are the same as those from the whole tree.
+    """
+    elements_path = ("cards/management/fr_importer/items_importer/"
+                     "tests/test_data/fdb/elements.xml")
+    category_path = ("./category[@name='category_1']"
+                     "/category[@name='category_2']")
+
+    def setUp(self):
+        self.tree_parser = OriginalParser(self.elements_path)
+        self.streaming_parser = StreamingItemsParser(self.elements_path)
+
+    def get_cards(self, parser):
+        return [(card.question_output_text, card.answer_output_text,
+                 dict(card)) for card in parser]
+
+    def test_all_items(self):
+        self.assertListEqual(self.get_cards(self.streaming_parser),
+                             self.get_cards(self.tree_parser))
+        self.assertEqual(len(self.get_cards(self.streaming_parser)), 3)
+
+    def test_items_from_category(self):
+        self.tree_parser.import_xpath = self.category_path
+        self.streaming_parser.import_xpath = self.category_path
+
+        self.assertListEqual(self.get_cards(self.streaming_parser),
+                             self.get_cards(self.tree_parser))
+        self.assertEqual(len(self.get_cards(self.streaming_parser)), 2)
+
+    def test_time_of_start(self):
+        self.assertEqual(self.streaming_parser.time_of_start, 1186655166)
+
+    def test_missing_category(self):
+        def set_missing_category():
+            self.streaming_parser.import_xpath = \
+                "./category[@name='category_2']"
+
+        self.assertRaises(ValueError, set_missing_category)
+
+    def test_not_category_path(self):
+        def set_item_path():
+            self.streaming_parser.import_xpath = "./category/item"
+
+        self.assertRaises(ValueError, set_item_path)
+
+    def test_clearing_elements(self):
+        """
+        Processed elements are cleared.
+        """
+        elements = [element for _, element in
+                    self.streaming_parser._iter_elements([], ("item",))]
+
+        self.assertEqual(len(elements), 3)
+        self.assertTrue(all(len(element) == 0 and not element.attrib
+                            for element in elements))
+
+
+class ParsingExternalEntities(unittest.TestCase):
+    """
+    External entities aren't resolved - neither incrementally nor in
+    the whole tree.
+    """
+    secret = "SECRET-CONTENT"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        secret_path = os.path.join(self.directory.name, "secret.txt")
+        with open(secret_path, "w") as secret_file:
+            secret_file.write(self.secret)
+        self.elements_path = os.path.join(self.directory.name,
+                                          "elements.xml")
+        with open(self.elements_path, "w") as elements_file:
+            elements_file.write(
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<!DOCTYPE fullrecall [<!ENTITY e SYSTEM '
+                f'"file://{secret_path}">]>'
+                '<fullrecall time_of_start="1186655166">'
+                '<category name="category"><item id="1" tmtrpt="6411" '
+                'stmtrpt="6411" livl="268" rllivl="271" ivl="33" rp="12" '
+                'gr="1"><q>hello &e;</q><a>answer</a></item></category>'
+                '</fullrecall>')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_external_entity(self):
+        tree_cards = [(card.question_output_text, card.answer_output_text)
+                      for card in OriginalParser(self.elements_path)]
+        streamed_cards = [
+            (card.question_output_text, card.answer_output_text)
+            for card in StreamingItemsParser(self.elements_path)]
+
+        self.assertListEqual(streamed_cards, tree_cards)
+        self.assertEqual(len(tree_cards), 1)
+        self.assertIn("hello", tree_cards[0][0])
+        self.assertNotIn(self.secret, str(tree_cards))
+
+
+class ConvertingInPool(unittest.TestCase):
+    """
+    Cards converted by a pool of processes are the same (and in the same
+    order) as ones converted in the main process.
+    """
+    elements_path = StreamingParsing.elements_path
+
+    @staticmethod
+    def get_cards(cards):
+        return [(card.question_output_text, card.answer_output_text,
+                 {key: card[key] for key in card.keys()})
+                for card in cards]
+
+    def assert_same_cards(self, parser, offset=0):
+        parser.pool_chunk_size = 1
+        self.assertListEqual(
+            self.get_cards(parser.iter_cards(offset, workers=2)),
+            self.get_cards(parser.iter_cards(offset)))
+
+    def test_tree_parser(self):
+        self.assert_same_cards(OriginalParser(self.elements_path))
+
+    def test_streaming_parser(self):
+        self.assert_same_cards(StreamingItemsParser(self.elements_path))
+
+    def test_offset(self):
+        parser = OriginalParser(self.elements_path)
+        self.assert_same_cards(parser, offset=1)
+        self.assertEqual(len(list(parser.iter_cards(1, workers=2))), 2)
@@ -133,3 +133,21 @@ class ConvertPhoneticsTestCase(TestCase):
         received_output = convert_techland_phonetics(input_phonetics)
 
         self.assertEqual(received_output, expected_output)
+
+    def test_unrecognized_between_lexemes(self):
+        lexeme = "t3璃a2(r"
+        converter = PhoneticsConverter(lexeme)
+        tokens = [str(token) for token in converter.tokens]
+        expected_tokens = ["MULTI_CHAR t3", "UNRECOGNIZED 璃",
+                           "UNRECOGNIZED a", "SINGLE_CHAR 2",
+                           "UNRECOGNIZED (", "SINGLE_CHAR r"]
+
+        self.assertEqual(tokens, expected_tokens)
+
+    def test_memoized_conversion(self):
+        convert_techland_phonetics.cache_clear()
+        first_output = convert_techland_phonetics("A(e)")
+        second_output = convert_techland_phonetics("A(e)")
+
+        self.assertIs(first_output, second_output)
+        self.assertEqual(convert_techland_phonetics.cache_info().hits, 1)
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.5 on 2026-10-19 17:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cards', '0004_card_note'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reviewed_on', models.DateTimeField(default=django.utils.timezone.now)),
+                ('grade', models.IntegerField()),
+                ('interval_before', models.IntegerField()),
+                ('interval_after', models.IntegerField()),
+                ('easiness_before', models.FloatField()),
+                ('easiness_after', models.FloatField()),
+                ('card', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to='cards.card')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reviewlog',
+            index=models.Index(fields=['user', 'reviewed_on'], name='cards_revie_user_id_ba500d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewlog',
+            index=models.Index(fields=['card', 'reviewed_on'], name='cards_revie_card_id_e31c33_idx'),
+        ),
+    ]
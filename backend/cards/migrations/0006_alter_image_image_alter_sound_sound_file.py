@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-19 18:00
+
+import cards.utils.media_storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0005_reviewlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(storage=cards.utils.media_storage.get_media_storage, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='sound',
+            name='sound_file',
+            field=models.FileField(storage=cards.utils.media_storage.get_media_storage, upload_to='sounds/'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-19 18:03
+
+import cards.utils.media_storage
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0006_alter_image_image_alter_sound_sound_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField()),
+                ('format', models.CharField(max_length=4)),
+                ('file', models.ImageField(storage=cards.utils.media_storage.get_media_storage, upload_to='images/derivatives/')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='cards.image')),
+            ],
+            options={
+                'ordering': ('width',),
+                'unique_together': {('image', 'width', 'format')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0007_image_width_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='reviewlog',
+            constraint=models.UniqueConstraint(fields=('reviewed_on', 'id'), name='review_log_reviewed_on_id'),
+        ),
+    ]
@@ -1,20 +1,33 @@
 import datetime
 import hashlib
 import json
+import os
 import uuid
+from collections import defaultdict
 from datetime import date
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import CheckConstraint, Q, F
-from django.template import Context, Template
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from django.db.models import CheckConstraint, Q, F, Count, Avg, \
+    DateField, DurationField, ExpressionWrapper, OuterRef, Prefetch, \
+    Subquery
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+from django.template import Context
 from django.template.loader import render_to_string
 from treebeard.al_tree import AL_Node
 from django.db.utils import IntegrityError
 from django.urls import reverse
+from django.utils import timezone
 from .apps import CardsConfig
 from .utils.exceptions import CardReviewDataExists, ReviewBeforeDue, \
     CardsDistributionRangeExceeded
 from .utils.helpers import today, validate_grade, make_saver
+from .utils.image_derivatives import downscale_image
+from .utils.media_storage import get_media_storage
+from .utils.statistics_cache import get_cached_statistics, \
+    invalidate_review_statistics
+from .utils.template_cache import compiled_templates
 from .utils.supermemo2 import SM2
 
 encoding = CardsConfig.default_encoding
@@ -120,13 +133,17 @@ class CardUserData(models.Model):
         selected_categories = user.get_user_categories_trees()
         dates = [date.today() + datetime.timedelta(days=days)
                  for days in range(1, days_range + 1)]
+        reviews_per_day = dict(
+            cls.objects.filter(
+                user=user,
+                review_date__in=dates,
+                card__categories__in=selected_categories)
+            .values_list("review_date")
+            .annotate(count=Count("id", distinct=True))
+            .order_by())
 
         return {
-            str(review_date): cls.objects.filter(
-                user=user,
-                review_date=review_date,
-                card__categories__in=selected_categories
-            ).distinct().count()
+            str(review_date): reviews_per_day.get(review_date, 0)
             for review_date in dates
         }
 
@@ -137,15 +154,19 @@ class CardUserData(models.Model):
         selected_categories = user.get_user_categories_trees()
         dates = [date.today() - datetime.timedelta(days=days)
                  for days in range(days_range)]
+        introductions_per_day = dict(
+            cls.objects.filter(
+                user=user,
+                introduced_on__date__in=dates,
+                card__categories__in=selected_categories)
+            .annotate(introduction_date=TruncDate("introduced_on"))
+            .values_list("introduction_date")
+            .annotate(count=Count("id", distinct=True))
+            .order_by())
 
         return {
-            str(introduction_date): cls.objects.filter(
-                user=user,
-                introduced_on__day=introduction_date.day,
-                introduced_on__month=introduction_date.month,
-                introduced_on__year=introduction_date.year,
-                card__categories__in=selected_categories
-            ).distinct().count()
+            str(introduction_date): introductions_per_day.get(
+                introduction_date, 0)
             for introduction_date in dates
         }
 
@@ -158,27 +179,29 @@ class CardUserData(models.Model):
 
     @classmethod
     def get_efactor_distribution(cls, user):
-        user_memorized_cards = cls.objects.filter(user=user)
-        e_factors = {
-            card.easiness_factor: str(round(card.easiness_factor, 2))
-            for card in user_memorized_cards
-        }
+        e_factors = cls.objects.filter(user=user) \
+            .values_list("easiness_factor") \
+            .annotate(count=Count("id")) \
+            .order_by("easiness_factor")
 
         e_factors_distribution = [{
-            "e-factor": e_factors[e_factor],
-            "count": user_memorized_cards.filter(
-                easiness_factor=e_factor).count()
-        } for e_factor in sorted(e_factors.keys())]
+            "e-factor": str(round(e_factor, 2)),
+            "count": count
+        } for e_factor, count in e_factors]
 
         return e_factors_distribution
 
     @classmethod
     def get_grades_distribution(cls, user):
-        user_memorized_cards = cls.objects.filter(user=user)
         grades = range(0, 6)  # grades are 0 to (including) 5
+        cards_per_grade = dict(
+            cls.objects.filter(user=user)
+            .values_list("grade")
+            .annotate(count=Count("id"))
+            .order_by())
 
         return {
-            str(grade): user_memorized_cards.filter(grade=grade).count()
+            str(grade): cards_per_grade.get(grade, 0)
             for grade in grades
         }
 
@@ -189,9 +212,14 @@ class CardUserData(models.Model):
         """
         dates = [review_date + datetime.timedelta(days=days)
                  for days in range(days_range)]
+        scheduled_reviews = dict(
+            CardUserData.objects.filter(
+                user_id=self.user_id, review_date__in=dates)
+            .values_list("review_date")
+            .annotate(count=Count("id"))
+            .order_by())
         dates_reviews = {
-            date_review: CardUserData.objects.filter(
-                user=self.user, review_date=date_review).count()
+            date_review: scheduled_reviews.get(date_review, 0)
             for date_review in dates
         }
 
@@ -204,6 +232,11 @@ class CardUserData(models.Model):
         validate_grade(grade)
         if self.review_date > datetime.datetime.today().date():
             raise ReviewBeforeDue
+        review_log = ReviewLog(card_id=self.card_id,
+                               user_id=self.user_id,
+                               grade=grade,
+                               interval_before=self.computed_interval,
+                               easiness_before=self.easiness_factor)
         new_review = self.new_review(grade)
         days_range = self._range_of_days(grade)
         optimal_review_date = self.schedule_date_for_review(
@@ -211,7 +244,8 @@ class CardUserData(models.Model):
             days_range=days_range)
 
         if grade < 4:
-            self.add_to_cram()
+            # saved together with the remaining review data below
+            self.crammed = True
 
         if grade < 3:
             # updating object's value using F() expression (see below)
@@ -224,19 +258,24 @@ class CardUserData(models.Model):
         self.computed_interval = new_review.interval
         self.reviews = new_review.repetitions
         self.last_reviewed = datetime.datetime.now().date()
-        self.save()
+        review_log.interval_after = self.computed_interval
+        review_log.easiness_after = self.easiness_factor
+        with transaction.atomic():
+            self.save()
+            review_log.save()
 
         # from the documentation:
         # To access the new value (created with the F expression)
         # the object must be reloaded
         # https://docs.djangoproject.com/en/4.1/ref/models/expressions/
         # section about F() expressions
-        self.refresh_from_db()
+        # reloading only these fields keeps cached card/user relations
+        self.refresh_from_db(fields=["lapses", "total_reviews"])
 
     def get_absolute_url(self):
         return reverse("memorized_card",
-                       kwargs={"pk": self.card.id,
-                               "user_id": self.user.id})
+                       kwargs={"pk": self.card_id,
+                               "user_id": self.user_id})
 
     class Meta:
         unique_together = ("card", "user",)
@@ -264,6 +303,174 @@ class CardUserData(models.Model):
         return "\n".join(f"{key}: {self[key]}" for key in self.keys())
 
 
+class ReviewLog(models.Model):
+    """Append-only history of card reviews - a row is added with every
+    grading of a memorized card and never modified afterwards.
+    """
+    MAX_STATISTICS_RANGE = 366
+    # period: (argument for Trunc, number of days in a bucket)
+    statistics_periods = {
+        "daily": ("day", 1),
+        "weekly": ("week", 7),
+    }
+    # both foreign keys are covered by the composite indexes below
+    card = models.ForeignKey("Card", on_delete=models.CASCADE,
+                             related_name="review_logs", db_index=False)
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE,
+                             related_name="review_logs", db_index=False)
+    # not auto_now_add - imported or generated histories carry their
+    # own timestamps
+    reviewed_on = models.DateTimeField(default=timezone.now)
+    grade = models.IntegerField()
+    interval_before = models.IntegerField()
+    interval_after = models.IntegerField()
+    easiness_before = models.FloatField()
+    easiness_after = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "reviewed_on"]),
+            models.Index(fields=["card", "reviewed_on"]),
+        ]
+        constraints = [
+            # a table partitioned by reviewed_on needs its unique keys to
+            # include it - Django has no composite primary keys, so this
+            # is the key that the partitions keep (it also serves time
+            # ranges over all users and keyset pagination)
+            models.UniqueConstraint(fields=["reviewed_on", "id"],
+                                    name="review_log_reviewed_on_id"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Review log entries can not be modified.")
+        super().save(*args, **kwargs)
+        transaction.on_commit(
+            lambda: invalidate_review_statistics(self.user_id))
+
+    @classmethod
+    def bulk_log(cls, entries, batch_size=1000) -> list:
+        """Inserts multiple entries (e.g. imported review histories)
+        in batches.
+        """
+        entries = cls.objects.bulk_create(entries, batch_size=batch_size)
+        user_ids = {entry.user_id for entry in entries}
+        transaction.on_commit(lambda: cls.invalidate_statistics(user_ids))
+        return entries
+
+    @staticmethod
+    def invalidate_statistics(user_ids):
+        for user_id in user_ids:
+            invalidate_review_statistics(user_id)
+
+    @classmethod
+    def get_review_statistics(cls, user, period="daily",
+                              days_range=30) -> dict:
+        """Returns numbers of reviews, lapses (reviews graded below 3),
+        retention and average time-to-lapse (in days since the previous
+        review or the memorization of a card) for consecutive days or weeks
+        in the range, along with totals for the whole range.
+
+        Results are cached until the user's next review.
+        """
+        if period not in cls.statistics_periods:
+            raise ValueError(f"Unknown statistics period: '{period}'.")
+        if days_range > cls.MAX_STATISTICS_RANGE:
+            raise CardsDistributionRangeExceeded(
+                f"Allowed days range is set to {cls.MAX_STATISTICS_RANGE} "
+                "days.")
+        current_date = timezone.localdate()
+        return get_cached_statistics(
+            user.id, f"{period}:{days_range}:{current_date}",
+            lambda: cls._compute_review_statistics(
+                user, period, days_range, current_date))
+
+    @classmethod
+    def _compute_review_statistics(cls, user, period, days_range,
+                                   current_date) -> dict:
+        kind, bucket_days = cls.statistics_periods[period]
+        start_date = current_date - datetime.timedelta(
+            days=max(days_range, 1) - 1)
+        # weeks start on Monday, as with Trunc("week")
+        start_date -= datetime.timedelta(days=start_date.weekday()) \
+            if kind == "week" else datetime.timedelta()
+        start = timezone.make_aware(
+            datetime.datetime.combine(start_date, datetime.time()))
+
+        # Django does not allow aggregating over window functions, hence
+        # the previous review is found with a subquery on the
+        # (card, reviewed_on) index instead of LAG()
+        previous_review = cls.objects.filter(
+            card=OuterRef("card"), user=OuterRef("user"),
+            reviewed_on__lt=OuterRef("reviewed_on")) \
+            .order_by("-reviewed_on").values("reviewed_on")[:1]
+        introduction = CardUserData.objects.filter(
+            card=OuterRef("card"), user=OuterRef("user")) \
+            .values("introduced_on")[:1]
+        lapse = Q(grade__lt=3)
+        buckets = cls.objects.filter(user=user, reviewed_on__gte=start) \
+            .annotate(bucket=Trunc("reviewed_on", kind,
+                                   output_field=DateField())) \
+            .values("bucket") \
+            .annotate(
+                reviews=Count("id"),
+                lapses=Count("id", filter=lapse),
+                time_to_lapse=Avg(
+                    ExpressionWrapper(
+                        F("reviewed_on") - Coalesce(
+                            Subquery(previous_review),
+                            Subquery(introduction)),
+                        output_field=DurationField()),
+                    filter=lapse)) \
+            .order_by()
+        buckets = {bucket.pop("bucket"): bucket for bucket in buckets}
+
+        statistics = []
+        bucket_date = start_date
+        while bucket_date <= current_date:
+            statistics.append({
+                "date": str(bucket_date),
+                **cls._get_bucket_statistics(buckets.get(bucket_date, {}))
+            })
+            bucket_date += datetime.timedelta(days=bucket_days)
+        return {
+            "period": period,
+            "statistics": statistics,
+            "summary": cls._get_summary(buckets.values())
+        }
+
+    @classmethod
+    def _get_summary(cls, buckets) -> dict:
+        reviews = sum(bucket["reviews"] for bucket in buckets)
+        lapses = sum(bucket["lapses"] for bucket in buckets)
+        lapse_time = sum((bucket["time_to_lapse"] * bucket["lapses"]
+                          for bucket in buckets if bucket["time_to_lapse"]),
+                         datetime.timedelta())
+        return cls._get_bucket_statistics({
+            "reviews": reviews,
+            "lapses": lapses,
+            "time_to_lapse": lapse_time / lapses if lapses else None
+        })
+
+    @staticmethod
+    def _get_bucket_statistics(bucket) -> dict:
+        reviews = bucket.get("reviews", 0)
+        lapses = bucket.get("lapses", 0)
+        time_to_lapse = bucket.get("time_to_lapse")
+        return {
+            "reviews": reviews,
+            "lapses": lapses,
+            "retention": round((reviews - lapses) / reviews * 100, 2)
+            if reviews else None,
+            "time_to_lapse": round(time_to_lapse.total_seconds() / 86400, 2)
+            if time_to_lapse is not None else None
+        }
+
+    def __str__(self):
+        return (f"ReviewLog(card: {self.card_id}, user: {self.user_id}, "
+                f"grade: {self.grade}, reviewed on: {self.reviewed_on})")
+
+
 class Card(models.Model):
     images_number_limit_in_query = 15
     id = models.UUIDField(
@@ -344,15 +551,19 @@ class Card(models.Model):
     def forget(self, user):
         CardUserData.objects.get(card=self, user=user).delete()
 
-    def simulate_reviews(self, user=None):
+    def simulate_reviews(self, user=None, review_data=None):
         """
         Simulates reviews for all 0-5 grades. The next review date
         (review_date) is approximate - does not take into account
         daily burden (number of reviews already scheduled for a particular
         day).
+        review_data: already loaded user's review data for the card (saves
+        a query).
         """
         valid_grades = range(6)  # 0-5
-        review_data = CardUserData.objects.filter(user=user, card=self).first()
+        if review_data is None:
+            review_data = CardUserData.objects.filter(
+                user=user, card=self).first()
 
         if not user or review_data is None:
             review_fn = SM2.first_review
@@ -378,7 +589,7 @@ class Card(models.Model):
         }
         if self.template:
             context = Context(context_data)
-            template = Template(self.template.body, context)
+            template = compiled_templates.get(self.template.body)
             card_rendering = template.render(context)
         else:
             fallback_template_name = "fallback.html"
@@ -412,6 +623,11 @@ class Card(models.Model):
             raise KeyError(f"Invalid card fields: {invalid_fields}")
 
     def __getitem__(self, key):
+        # templates try dictionary lookup first (e.g. for {{ card.front }}),
+        # so unknown keys must fail before values (and their queries)
+        # are computed
+        if key not in self.keys():
+            raise KeyError(key)
         return dict(zip(self.keys(), self.values()))[key]
 
     @staticmethod
@@ -487,12 +703,30 @@ class Card(models.Model):
             raise ValueError("The 'side' parameter must be either 'front' "
                              "or 'back'.")
 
-        card_images = CardImage.objects.filter(card=self, side=side) \
-                          .all().order_by('created')[
-                      :Card.images_number_limit_in_query]
+        if hasattr(self, "prefetched_card_images"):
+            card_images = [card_image for card_image
+                           in self.prefetched_card_images
+                           if card_image.side == side][
+                          :Card.images_number_limit_in_query]
+        else:
+            card_images = CardImage.objects.filter(card=self, side=side) \
+                              .all().order_by('created')[
+                          :Card.images_number_limit_in_query]
         images = [card_image.image for card_image in card_images]
         return images
 
+    @staticmethod
+    def prefetch_images(lookup: str = "cardimage_set") -> Prefetch:
+        """
+        Prefetches images of cards (and derivatives of the images) used
+        by get_images() - for querysets of cards that are rendered.
+        """
+        return Prefetch(
+            lookup,
+            queryset=CardImage.objects.select_related("image")
+            .prefetch_related("image__derivatives").order_by("created"),
+            to_attr="prefetched_card_images")
+
     @property
     def front_audio_id_hex(self):
         return self.get_audio_id_hex(self.front_audio)
@@ -541,6 +775,30 @@ class Category(AL_Node):
     class Meta:
         unique_together = ("name", "parent")
 
+    @classmethod
+    def get_sub_categories(cls):
+        """Returns a mapping of parent ids to lists of their (ordered)
+        sub-categories, built from a single query. Root categories are
+        listed under the None key.
+        """
+        sub_categories = defaultdict(list)
+        for category in cls.objects.all():
+            sub_categories[category.parent_id].append(category)
+        return sub_categories
+
+    def get_tree_from(self, sub_categories) -> list:
+        """Returns the category and its descendants in the same (DFS) order
+        as Category.get_tree(category), walking the mapping returned by
+        get_sub_categories() instead of querying for children of every node.
+        """
+        tree = []
+        categories = [self]
+        while categories:
+            category = categories.pop()
+            tree.append(category)
+            categories.extend(reversed(sub_categories.get(category.id, [])))
+        return tree
+
     def __str__(self):
         return f"<{self.name}>"
 
@@ -557,6 +815,7 @@ class Image(models.Model):
         editable=False,
     )
     image = models.ImageField(upload_to="images/",
+                              storage=get_media_storage,
                               null=False)
     sha1_digest = models.CharField(
         max_length=40,
@@ -565,15 +824,73 @@ class Image(models.Model):
         default=get_random_sha1)
     description = models.CharField(max_length=1000)
     cards = models.ManyToManyField("Card", through="CardImage")
+    # set when derivatives (downscaled copies) of the image are made -
+    # None if they haven't been made yet
+    width = models.PositiveIntegerField(null=True, blank=True,
+                                        editable=False)
 
     def save(self, *args, **kwargs):
         _save = make_saver(Image, "image", "sha1_digest")
         _save(self, *args, **kwargs)
+        if settings.IMAGE_DERIVATIVES_ON_SAVE and self.width is None:
+            self.make_derivatives()
+
+    def make_derivatives(self) -> list:
+        """
+        (Re)creates downscaled copies of the image at widths and in formats
+        given by the IMAGE_DERIVATIVE_WIDTHS and IMAGE_DERIVATIVE_FORMATS
+        settings.
+        """
+        with self.image.open("rb") as image_file:
+            width, copies = downscale_image(
+                image_file, settings.IMAGE_DERIVATIVE_WIDTHS,
+                settings.IMAGE_DERIVATIVE_FORMATS)
+        name = os.path.splitext(os.path.basename(self.image.name))[0]
+        derivatives = []
+        for copy_width, image_format, contents in copies:
+            derivative = ImageDerivative(image=self, width=copy_width,
+                                         format=image_format)
+            derivative.file.save(f"{name}_{copy_width}.{image_format}",
+                                 ContentFile(contents), save=False)
+            derivatives.append(derivative)
+        with transaction.atomic():
+            # concurrent makers of the same image's derivatives take turns
+            Image.objects.select_for_update().get(pk=self.pk)
+            self.derivatives.all().delete()
+            ImageDerivative.objects.bulk_create(derivatives)
+            Image.objects.filter(pk=self.pk).update(width=width)
+        self.width = width
+        return derivatives
+
+    def get_derivatives(self) -> list:
+        """
+        Derivatives of the image made so far - none until they are made
+        (on save, or by the make_image_derivatives command or job).
+        """
+        if self.width is None:
+            return []
+        return list(self.derivatives.all())
 
     def __str__(self):
         return str(self.image)
 
 
+class ImageDerivative(models.Model):
+    """
+    Downscaled copy of an image (for the srcset of the <img> tag).
+    """
+    image = models.ForeignKey(Image, on_delete=models.CASCADE,
+                              related_name="derivatives")
+    width = models.PositiveIntegerField()
+    format = models.CharField(max_length=4)
+    file = models.ImageField(upload_to="images/derivatives/",
+                             storage=get_media_storage)
+
+    class Meta:
+        unique_together = ("image", "width", "format",)
+        ordering = ("width",)
+
+
 class CardImage(models.Model):
     card = models.ForeignKey(Card, on_delete=models.CASCADE)
     image = models.ForeignKey(Image, on_delete=models.CASCADE)
@@ -597,7 +914,8 @@ class Sound(models.Model):
         default=uuid.uuid4,
         editable=False,
     )
-    sound_file = models.FileField(upload_to="sounds/", null=False)
+    sound_file = models.FileField(upload_to="sounds/",
+                                  storage=get_media_storage, null=False)
     description = models.CharField(max_length=1000)
     sha1_digest = models.CharField(
         max_length=40,
@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+from django import template
+from django.conf import settings
+
+from cards.utils.image_derivatives import content_types
+
+register = template.Library()
+
+
+@register.filter
+def image_sources(image, url_prefix=""):
+    """
+    Sources (content type and srcset) of a <picture> element for an image
+    - one for each format of its derivatives, in the order of the
+    IMAGE_DERIVATIVE_FORMATS setting. Each srcset also lists the original
+    image at its own width.
+    """
+    if not image:
+        return []
+    candidates = defaultdict(list)
+    for derivative in image.get_derivatives():
+        candidates[derivative.format].append(
+            f"{url_prefix}{derivative.file.url} {derivative.width}w")
+    if not candidates:
+        return []
+    original = f"{url_prefix}{image.image.url} {image.width}w"
+    return [{"type": content_types[image_format],
+             "srcset": ", ".join([*candidates[image_format], original])}
+            for image_format in settings.IMAGE_DERIVATIVE_FORMATS
+            if image_format in candidates]
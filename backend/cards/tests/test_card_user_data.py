@@ -9,7 +9,7 @@ from django.test import TestCase
 import time_machine
 from django.urls import reverse
 
-from cards.models import CardUserData
+from cards.models import CardUserData, ReviewLog
 from cards.tests.fake_data import fake, fake_data_objects
 from cards.utils.exceptions import CardReviewDataExists, ReviewBeforeDue
 
@@ -762,4 +762,76 @@ class AbsoluteUrls(TestCase):
                                 kwargs={"pk": self.card.id,
                                         "user_id": self.user.id})
 
-        self.assertEqual(self.card_user_data.get_absolute_url(), canonical_url)
\ No newline at end of file
+        self.assertEqual(self.card_user_data.get_absolute_url(), canonical_url)
+
+
+class ReviewLogging(TestCase):
+    def setUp(self):
+        self.memorization_date = datetime.date(1985, 5, 10)
+        self.card = fake_data_objects.make_fake_card()
+        self.user = fake_data_objects.make_fake_user()
+        with time_machine.travel(self.memorization_date):
+            self.review_data = self.card.memorize(self.user)
+
+    def review(self, grade):
+        with time_machine.travel(self.review_data.review_date):
+            self.review_data.review(grade)
+
+    def test_review_logged(self):
+        interval_before = self.review_data.computed_interval
+        easiness_before = self.review_data.easiness_factor
+        review_date = self.review_data.review_date
+        self.review(2)
+        review_log = ReviewLog.objects.get(card=self.card, user=self.user)
+
+        self.assertEqual(review_log.grade, 2)
+        self.assertEqual(review_log.reviewed_on.date(), review_date)
+        self.assertEqual(review_log.interval_before, interval_before)
+        self.assertEqual(review_log.easiness_before, easiness_before)
+        self.assertEqual(review_log.interval_after,
+                         self.review_data.computed_interval)
+        self.assertEqual(review_log.easiness_after,
+                         self.review_data.easiness_factor)
+
+    def test_subsequent_reviews_appended(self):
+        for grade in (5, 3, 1):
+            self.review(grade)
+        review_logs = ReviewLog.objects.filter(
+            user=self.user).order_by("reviewed_on")
+
+        self.assertEqual([log.grade for log in review_logs], [5, 3, 1])
+        self.assertEqual(review_logs[1].interval_before,
+                         review_logs[0].interval_after)
+
+    def test_memorization_not_logged(self):
+        self.assertFalse(ReviewLog.objects.exists())
+
+    def test_review_before_due_not_logged(self):
+        with time_machine.travel(self.memorization_date):
+            with self.assertRaises(ReviewBeforeDue):
+                self.review_data.review(4)
+
+        self.assertFalse(ReviewLog.objects.exists())
+
+    def test_modifying_entry(self):
+        self.review(4)
+        review_log = ReviewLog.objects.get()
+        review_log.grade = 5
+
+        self.assertRaises(ValueError, review_log.save)
+
+    def test_bulk_log(self):
+        entries = [ReviewLog(card=self.card, user=self.user, grade=grade,
+                             interval_before=0, interval_after=1,
+                             easiness_before=2.5, easiness_after=2.5)
+                   for grade in range(6)]
+        with self.assertNumQueries(2):
+            ReviewLog.bulk_log(entries, batch_size=3)
+
+        self.assertEqual(ReviewLog.objects.count(), 6)
+
+    def test_forgetting_card_keeps_log(self):
+        self.review(4)
+        self.card.forget(self.user)
+
+        self.assertEqual(ReviewLog.objects.filter(user=self.user).count(), 1)
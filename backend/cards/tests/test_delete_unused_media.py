@@ -0,0 +1,82 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from cards.tests.fake_data import fake_data_objects
+
+
+class DeletingUnusedMedia(TestCase):
+    command = "delete_unused_media"
+    unused_files = ["images/a.gif", "images/ab/cd/unused.gif",
+                    "sounds/unused.mp3"]
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.images = [fake_data_objects.get_instance_from_image(
+            fake_data_objects.get_random_gif()) for _ in range(3)]
+        for file_path in self.unused_files:
+            full_path = os.path.join(self.media_root.name, file_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "wb") as unused_file:
+                unused_file.write(b"unused")
+        self.output = StringIO()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def exists(self, file_path):
+        return os.path.exists(os.path.join(self.media_root.name, file_path))
+
+    def assert_images_kept(self):
+        self.assertTrue(all(os.path.exists(image.image.path)
+                            for image in self.images))
+
+    def test_deleting(self):
+        call_command(self.command, "--chunk-size", "2", stdout=self.output)
+
+        self.assertFalse(any(self.exists(file_path)
+                             for file_path in self.unused_files))
+        self.assert_images_kept()
+        self.assertFalse(self.exists("images/ab"))
+        self.assertIn("3 files deleted.", self.output.getvalue())
+
+    def test_dry_run(self):
+        call_command(self.command, "--dry-run", stdout=self.output)
+
+        self.assertTrue(all(self.exists(file_path)
+                            for file_path in self.unused_files))
+        self.assertListEqual(self.output.getvalue().splitlines(),
+                             [*self.unused_files,
+                              "3 files would be deleted."])
+
+    def test_older_than(self):
+        old_file = os.path.join(self.media_root.name, self.unused_files[0])
+        os.utime(old_file, (0, 0))
+        call_command(self.command, "--older-than", "1", stdout=self.output)
+
+        self.assertFalse(self.exists(self.unused_files[0]))
+        self.assertTrue(all(self.exists(file_path)
+                            for file_path in self.unused_files[1:]))
+
+    def test_resuming(self):
+        """
+        Files up to the path stored in the checkpoint have been checked.
+        """
+        checkpoint = os.path.join(self.media_root.name,
+                                  ".delete_unused_media.checkpoint")
+        with open(checkpoint, "w") as checkpoint_file:
+            checkpoint_file.write(self.unused_files[1])
+        call_command(self.command, stdout=self.output)
+
+        self.assertTrue(all(self.exists(file_path)
+                            for file_path in self.unused_files[:2]))
+        self.assertFalse(self.exists(self.unused_files[2]))
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assert_images_kept()
@@ -0,0 +1,159 @@
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image as PillowImage
+
+from cards.models import Card, CardImage, Image, ImageDerivative
+from cards.templatetags.card_images import image_sources
+from cards.tests.fake_data import fake_data_objects
+from cards.utils.image_derivatives import downscale_image
+
+
+def make_png(width=800, height=400) -> bytes:
+    output = BytesIO()
+    PillowImage.new("RGBA", (width, height), (200, 10, 10, 128)).save(
+        output, format="PNG")
+    return output.getvalue()
+
+
+class DerivativeImages:
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+            IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280],
+            IMAGE_DERIVATIVE_FORMATS=["webp", "jpeg"])
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    @staticmethod
+    def create_image(width=800) -> Image:
+        image = Image(image=SimpleUploadedFile(
+            name=f"image_{width}.png", content=make_png(width),
+            content_type="image/png"))
+        image.save()
+        return image
+
+
+class DownscalingImages(TestCase):
+    def test_copies(self):
+        width, copies = downscale_image(BytesIO(make_png()),
+                                        [1280, 320, 640], ["webp", "jpeg"])
+
+        self.assertEqual(width, 800)
+        self.assertListEqual([(copy_width, image_format)
+                              for copy_width, image_format, _ in copies],
+                             [(320, "webp"), (320, "jpeg"),
+                              (640, "webp"), (640, "jpeg")])
+        with PillowImage.open(BytesIO(copies[0][2])) as copy:
+            self.assertEqual(copy.format, "WEBP")
+            self.assertTupleEqual(copy.size, (320, 160))
+
+    def test_small_image(self):
+        width, copies = downscale_image(
+            BytesIO(fake_data_objects.gifs[0]), [320], ["webp"])
+
+        self.assertEqual(width, 1)
+        self.assertListEqual(copies, [])
+
+    def test_not_an_image(self):
+        self.assertTupleEqual(
+            downscale_image(BytesIO(b"not an image"), [320], ["webp"]),
+            (0, []))
+
+
+class MakingDerivatives(DerivativeImages, TestCase):
+    def test_making_derivatives(self):
+        image = self.create_image()
+        derivatives = image.make_derivatives()
+
+        self.assertEqual(len(derivatives), 4)
+        self.assertEqual(image.derivatives.count(), 4)
+        image.refresh_from_db()
+        self.assertEqual(image.width, 800)
+
+    def test_not_made_on_use(self):
+        """
+        Rendering doesn't make derivatives - the image is rendered without
+        them until they are made.
+        """
+        image = self.create_image()
+
+        with self.assertNumQueries(0):
+            self.assertListEqual(image.get_derivatives(), [])
+        self.assertListEqual(image_sources(image), [])
+        self.assertFalse(image.derivatives.exists())
+
+    def test_remaking_derivatives(self):
+        image = self.create_image()
+        image.make_derivatives()
+        image.make_derivatives()
+
+        self.assertEqual(len(image.get_derivatives()), 4)
+
+    def test_made_on_save(self):
+        with override_settings(IMAGE_DERIVATIVES_ON_SAVE=True):
+            image = self.create_image()
+
+        self.assertEqual(image.derivatives.count(), 4)
+
+    def test_picture_sources(self):
+        image = self.create_image()
+        image.make_derivatives()
+        rendering = Template(
+            '{% include "_card_question_image.html" %}').render(
+            Context({"card": {"front_images": [image]}}))
+
+        self.assertIn('type="image/webp"', rendering)
+        self.assertIn('type="image/jpeg"', rendering)
+        self.assertIn(" 320w, ", rendering)
+        self.assertIn(f"{image.image.url} 800w", rendering)
+
+
+class PrefetchingImages(DerivativeImages, TestCase):
+    def test_rendering_prefetched_images(self):
+        """
+        Images of cards from a queryset prefetching them (with their
+        derivatives) are rendered without further queries.
+        """
+        card = fake_data_objects.make_fake_card()
+        for side, width in (("front", 400), ("front", 500), ("back", 600)):
+            image = self.create_image(width)
+            image.make_derivatives()
+            CardImage.objects.create(card=card, image=image, side=side)
+        card = Card.objects.prefetch_related(Card.prefetch_images()) \
+            .get(pk=card.pk)
+
+        with self.assertNumQueries(0):
+            sources = [image_sources(image)
+                       for image in card.front_images + card.back_images]
+        self.assertListEqual([image.width for image in card.front_images],
+                             [400, 500])
+        self.assertListEqual([image.width for image in card.back_images],
+                             [600])
+        self.assertTrue(all(sources))
+
+
+class BackfillingDerivatives(DerivativeImages, TransactionTestCase):
+    """
+    Worker processes have to see committed images - hence the
+    TransactionTestCase.
+    """
+    def test_command(self):
+        for width in (400, 500, 600):
+            self.create_image(width)
+        call_command("make_image_derivatives", "--workers", "2",
+                     "--chunk-size", "1", stdout=StringIO())
+
+        self.assertEqual(ImageDerivative.objects.count(), 6)
+        self.assertListEqual(
+            list(Image.objects.order_by("width").values_list(
+                "width", flat=True)),
+            [400, 500, 600])
@@ -1,4 +1,6 @@
 from hashlib import sha1
+from io import BytesIO
+from unittest.mock import patch
 
 import django.db.utils
 from django.core.files import File
@@ -7,6 +9,7 @@ from django.db import transaction
 from django.test import TestCase
 from cards.models import CardImage, Image
 from cards.tests.fake_data import fake_data_objects, fake
+from cards.utils.helpers import HashingFile
 
 
 class CardImageCase(TestCase):
@@ -103,4 +106,38 @@ class ImageModel(TestCase):
 
     def test_image_hash_validity(self):
         self.assertEqual(self.small_gif_sha1_digest,
-                         self.image_in_db.sha1_digest)
\ No newline at end of file
+                         self.image_in_db.sha1_digest)
+
+
+class CountingReads(BytesIO):
+    bytes_read = 0
+
+    def read(self, *args):
+        data = super().read(*args)
+        self.bytes_read += len(data)
+        return data
+
+
+class HashingStoredImage(TestCase):
+    """
+    A new image file is hashed while it's written into the storage.
+    """
+    def setUp(self):
+        self.content = fake_data_objects.get_random_gif()
+        self.image_file = CountingReads(self.content)
+
+    def test_single_read(self):
+        image = Image(image=File(self.image_file,
+                                 name=fake.file_name(extension="gif")))
+        with patch("cards.utils.helpers.get_file_hash") as get_file_hash:
+            image.save()
+
+        get_file_hash.assert_not_called()
+        self.assertEqual(self.image_file.bytes_read, len(self.content))
+        self.assertEqual(image.sha1_digest, sha1(self.content).hexdigest())
+
+    def test_partially_read_file(self):
+        hashing_file = HashingFile(self.image_file, name="image.gif")
+        hashing_file.read(5)
+
+        self.assertIsNone(hashing_file.hexdigest)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from hashlib import sha1
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from cards.models import Image
+from cards.tests.fake_data import fake_data_objects
+from cards.utils.media_storage import ContentAddressedStorage
+
+
+class ContentAddressedStoring(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.media_root.name)
+        self.content = fake_data_objects.get_random_gif()
+        self.digest = sha1(self.content).hexdigest()
+
+    def tearDown(self):
+        self.media_root.cleanup()
+
+    def test_sharded_name(self):
+        name = self.storage.save("images/Image.GIF",
+                                 ContentFile(self.content))
+
+        self.assertEqual(name, f"images/{self.digest[:2]}/"
+                               f"{self.digest[2:4]}/{self.digest}.gif")
+        self.assertTrue(self.storage.is_content_name(name))
+        with self.storage.open(name) as stored_file:
+            self.assertEqual(stored_file.read(), self.content)
+
+    def test_identical_contents(self):
+        """
+        Identical contents are stored once, under the same name.
+        """
+        first_name = self.storage.save("images/first.gif",
+                                       ContentFile(self.content))
+        second_name = self.storage.save("images/second.gif",
+                                        ContentFile(self.content))
+
+        self.assertEqual(first_name, second_name)
+        shard_path = os.path.dirname(self.storage.path(first_name))
+        self.assertListEqual(os.listdir(shard_path),
+                             [os.path.basename(first_name)])
+
+    def test_not_content_name(self):
+        self.assertFalse(self.storage.is_content_name("images/image.gif"))
+        self.assertFalse(self.storage.is_content_name(
+            f"images/00/00/{self.digest}.gif"))
+
+
+class MovingMediaToContentAddressedPaths(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.images = [fake_data_objects.get_instance_from_image(
+            fake_data_objects.get_random_gif()) for _ in range(3)]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_moving_files(self):
+        old_paths = [image.image.path for image in self.images]
+        call_command("content_address_media", "--chunk-size", "2",
+                     stdout=StringIO())
+
+        for image, old_path in zip(self.images, old_paths):
+            image.refresh_from_db()
+            self.assertTrue(ContentAddressedStorage.is_content_name(
+                image.image.name))
+            self.assertTrue(image.image.name.endswith(
+                f"{image.sha1_digest}.gif"))
+            self.assertTrue(os.path.exists(image.image.path))
+            self.assertFalse(os.path.exists(old_path))
+
+    def test_dry_run(self):
+        names = {image.image.name for image in self.images}
+        output = StringIO()
+        call_command("content_address_media", "--dry-run", stdout=output)
+
+        self.assertIn("Image: 3 files to move.", output.getvalue())
+        self.assertSetEqual(
+            set(Image.objects.values_list("image", flat=True)), names)
@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cards.models import Image, Sound
+from cards.utils.media_storage import ContentAddressedStorage
+
+
+class ServingMedia(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name, MEDIA_CACHE_MAX_AGE=60,
+            MEDIA_SENDFILE_HEADER=None)
+        self.settings_override.enable()
+        self.content = bytes(range(256)) * 4
+        self.sound = Sound(sound_file=ContentFile(self.content,
+                                                  name="sound.mp3"))
+        self.sound.save()
+        self.url = reverse("media", args=[self.sound.sound_file.name])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["ETag"], f'"{self.sound.sha1_digest}"')
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+
+    def test_not_modified(self):
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=f'"{self.sound.sha1_digest}"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], f'"{self.sound.sha1_digest}"')
+
+    def test_content_addressed(self):
+        storage = ContentAddressedStorage(location=self.media_root.name)
+        name = storage.save("images/image.gif", ContentFile(b"GIF89a"))
+        url = reverse("media", args=[name])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"],
+                         "public, max-age=31536000, immutable")
+        self.assertEqual(response["ETag"],
+                         f'"{os.path.splitext(os.path.basename(name))[0]}"')
+
+    def test_unrecorded_file(self):
+        os.makedirs(os.path.join(self.media_root.name, "other"))
+        with open(os.path.join(self.media_root.name, "other", "a.txt"),
+                  "w") as other_file:
+            other_file.write("text")
+        response = self.client.get(reverse("media", args=["other/a.txt"]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+    def test_image(self):
+        image = Image(image=ContentFile(b"GIF89a", name="image.gif"))
+        image.save()
+        response = self.client.get(reverse("media", args=[image.image.name]))
+
+        self.assertEqual(response["ETag"], f'"{image.sha1_digest}"')
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content),
+                         self.content[100:200])
+        self.assertEqual(response["Content-Range"], "bytes 100-199/1024")
+        self.assertEqual(response["Content-Length"], "100")
+
+    def test_open_and_suffix_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=1000-")
+        self.assertEqual(b"".join(response.streaming_content),
+                         self.content[1000:])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(response["Content-Range"], "bytes 1014-1023/1024")
+        self.assertEqual(b"".join(response.streaming_content),
+                         self.content[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2000-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_outdated_if_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9",
+                                   HTTP_IF_RANGE='"outdated"')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_x_accel_redirect(self):
+        with override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect",
+                               MEDIA_ACCEL_REDIRECT_PREFIX="/protected/"):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Accel-Redirect"],
+                         f"/protected/{self.sound.sound_file.name}")
+        self.assertEqual(response["ETag"], f'"{self.sound.sha1_digest}"')
+
+    def test_missing_file(self):
+        response = self.client.get(reverse("media", args=["sounds/none.mp3"]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_not_allowed(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
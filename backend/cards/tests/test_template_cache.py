@@ -0,0 +1,43 @@
+from django.template import Context
+from django.test import SimpleTestCase
+
+from cards.utils.template_cache import CompiledTemplates
+
+
+class CachingCompiledTemplates(SimpleTestCase):
+    def setUp(self):
+        self.templates = CompiledTemplates(max_size=2)
+
+    def test_same_source(self):
+        template = self.templates.get("<p>{{ side.text }}</p>")
+
+        self.assertIs(self.templates.get("<p>{{ side.text }}</p>"), template)
+        self.assertEqual(len(self.templates), 1)
+
+    def test_changed_source(self):
+        """
+        An edited template is compiled anew.
+        """
+        template = self.templates.get("<p>{{ side.text }}</p>")
+        edited_template = self.templates.get("<h1>{{ side.text }}</h1>")
+
+        self.assertIsNot(edited_template, template)
+        self.assertEqual(
+            edited_template.render(Context({"side": {"text": "text"}})),
+            "<h1>text</h1>")
+
+    def test_evicting_least_recently_used(self):
+        first_template = self.templates.get("first")
+        self.templates.get("second")
+        self.templates.get("first")
+        self.templates.get("third")
+
+        self.assertEqual(len(self.templates), 2)
+        self.assertIs(self.templates.get("first"), first_template)
+        self.assertEqual(len(self.templates), 2)
+
+    def test_clearing(self):
+        self.templates.get("first")
+        self.templates.clear()
+
+        self.assertEqual(len(self.templates), 0)
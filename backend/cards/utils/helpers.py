@@ -1,6 +1,8 @@
 import hashlib
 from datetime import datetime
 from functools import reduce
+from itertools import islice
+from typing import Iterable
 
 from django.core.files import File
 
@@ -39,6 +41,15 @@ def compose(*functions):
     return reduce(compose2, functions, lambda x: x)
 
 
+def batched(items: Iterable, batch_size: int):
+    """
+    Yields lists of (up to) batch_size consecutive items.
+    """
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+
 def get_file_hash(file: File) -> str:
     get_hash = hashlib.sha1()
     if file.multiple_chunks():
@@ -49,18 +60,62 @@ def get_file_hash(file: File) -> str:
     return get_hash.hexdigest()
 
 
+class HashingFile(File):
+    """
+    File computing a sha1 digest of its contents while they are read
+    (i.e. by a storage saving the file), so that they are read only once.
+    The hexdigest is None, unless the whole file has been read from its
+    beginning.
+    """
+    def __init__(self, file, name=None):
+        super().__init__(file, name)
+        self._reset_hash()
+
+    def _reset_hash(self):
+        self._hash = hashlib.sha1()
+        self._bytes_hashed = 0
+
+    def seek(self, offset, whence=0):
+        if offset == 0 and whence == 0:
+            self._reset_hash()
+        else:
+            self._bytes_hashed = None
+        return self.file.seek(offset, whence)
+
+    def read(self, *args, **kwargs):
+        data = self.file.read(*args, **kwargs)
+        if self._bytes_hashed is not None:
+            self._hash.update(data)
+            self._bytes_hashed += len(data)
+        return data
+
+    @property
+    def hexdigest(self) -> str | None:
+        if self._bytes_hashed == self.size:
+            return self._hash.hexdigest()
+
+
 def make_saver(superclass, db_file_field: str,
                db_digest_field: str):
     """
     Returns method for getting sha1 file digest for
     Sound or Image instances.
+
+    A new (not yet stored) file is hashed while it's written into the
+    storage; a file already in the storage is read again.
     """
     def save(self, *args, **kwargs):
         file_field = getattr(self, db_file_field)
         # in order for this to work, a file_field has to be non-nullable!
         if file_field:
-            with file_field.open('rb') as f:
-                file_hash = get_file_hash(f)
-                setattr(self, db_digest_field, file_hash)
-                super(superclass, self).save(*args, **kwargs)
+            file_hash = None
+            if not file_field._committed:
+                content = HashingFile(file_field.file, file_field.name)
+                file_field.save(file_field.name, content, save=False)
+                file_hash = content.hexdigest
+            if file_hash is None:
+                with file_field.open('rb') as f:
+                    file_hash = get_file_hash(f)
+            setattr(self, db_digest_field, file_hash)
+            super(superclass, self).save(*args, **kwargs)
     return save
\ No newline at end of file
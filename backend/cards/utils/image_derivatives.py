@@ -0,0 +1,50 @@
+from io import BytesIO
+from typing import IO, Iterable, List, Tuple
+
+from PIL import Image as PillowImage, UnidentifiedImageError
+
+content_types = {"webp": "image/webp", "jpeg": "image/jpeg"}
+# formats which don't support transparency
+opaque_formats = ("jpeg",)
+
+
+def downscale_image(image_file: IO, widths: Iterable[int],
+                    formats: Iterable[str]) \
+        -> Tuple[int, List[Tuple[int, str, bytes]]]:
+    """
+    Makes copies of an image downscaled to given widths (only ones smaller
+    than its own width) in given formats. Returns width of the image and
+    (width, format, contents) of each copy.
+
+    Animated images aren't downscaled; the width of an unreadable image
+    is 0.
+    """
+    try:
+        original = PillowImage.open(image_file)
+    except UnidentifiedImageError:
+        return 0, []
+    with original:
+        width, height = original.size
+        if getattr(original, "is_animated", False):
+            return width, []
+        copies = []
+        for copy_width in sorted(set(widths)):
+            if copy_width >= width:
+                continue
+            copy = original.resize(
+                (copy_width, max(1, round(height * copy_width / width))),
+                PillowImage.Resampling.LANCZOS)
+            for image_format in formats:
+                copies.append((copy_width, image_format,
+                               _encode(copy, image_format)))
+        return width, copies
+
+
+def _encode(image: PillowImage.Image, image_format: str) -> bytes:
+    if image_format in opaque_formats:
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    output = BytesIO()
+    image.save(output, format=image_format.upper(), quality=80)
+    return output.getvalue()
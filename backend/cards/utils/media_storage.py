@@ -0,0 +1,107 @@
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, get_storage_class
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under names made of sha1 digests of their contents,
+    sharded by leading pairs of hex digits (so that directories stay
+    small), i.e. images/teller.png is stored as:
+    images/ab/cd/abcd...(40 hex digits).png
+
+    Identical contents are stored once - saving a file which is already
+    stored only returns its name.
+    """
+    shard_levels = 2
+    content_name_pattern = re.compile(
+        r"(?:.*/)?(?P<shards>(?:[0-9a-f]{2}/){%d})"
+        r"(?P<digest>[0-9a-f]{40})(?:\.\w+)?" % shard_levels)
+
+    @classmethod
+    def get_content_name(cls, name: str, digest: str) -> str:
+        """
+        Content-addressed name for a file (originally) named name.
+        """
+        directory, file_name = posixpath.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+        shards = [digest[level * 2:level * 2 + 2]
+                  for level in range(cls.shard_levels)]
+        return posixpath.join(directory, *shards, digest + extension)
+
+    @classmethod
+    def is_content_name(cls, name: str) -> bool:
+        match = cls.content_name_pattern.fullmatch(name)
+        return bool(match) and match.group("shards").replace("/", "") \
+            == match.group("digest")[:cls.shard_levels * 2]
+
+    def get_available_name(self, name, max_length=None):
+        # the final name depends on the contents (see _save())
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        file_hash = hashlib.sha1()
+        # contents are hashed while they are written - they are read once
+        descriptor = os.open(temporary_path,
+                             os.O_WRONLY | os.O_CREAT | os.O_EXCL
+                             | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            with os.fdopen(descriptor, "wb") as temporary_file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    file_hash.update(chunk)
+                    temporary_file.write(chunk)
+            content_name = self.get_content_name(name, file_hash.hexdigest())
+            self._store(temporary_path, content_name)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return content_name
+
+    def _store(self, temporary_path, content_name):
+        full_path = self.path(content_name)
+        if os.path.exists(full_path):
+            return
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(temporary_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def link(self, source_name: str, content_name: str):
+        """
+        Makes a stored file available under its content-addressed name
+        as well (without copying its contents, where hard links are
+        supported).
+        """
+        full_path = self.path(content_name)
+        if os.path.exists(full_path):
+            return
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            os.link(self.path(source_name), full_path)
+        except OSError:
+            temporary_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(self.path(source_name), temporary_path)
+            os.replace(temporary_path, full_path)
+
+
+def get_media_storage():
+    """
+    Storage of Image and Sound files: content-addressed one with the
+    CONTENT_ADDRESSED_MEDIA setting turned on.
+    """
+    if getattr(settings, "CONTENT_ADDRESSED_MEDIA", False):
+        return ContentAddressedStorage()
+    # a new instance (rather than default_storage), so that the field
+    # keeps the storage in its migrations either way
+    return get_storage_class()()
@@ -0,0 +1,34 @@
+import uuid
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(user_id) -> str:
+    return f"review-statistics-version:{user_id}"
+
+
+def get_statistics_version(user_id) -> str:
+    """Returns current version of the user's cached statistics. A random
+    (rather than incremented) value can't be confused with a version
+    that has been evicted from the cache.
+    """
+    return cache.get_or_set(_version_key(user_id),
+                            lambda: uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_review_statistics(user_id):
+    """Makes all statistics cached for the user stale.
+    """
+    cache.set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def get_cached_statistics(user_id, key: str, compute: Callable):
+    """Returns statistics cached for the user under the key, computing
+    (and caching) them if necessary.
+    """
+    cache_key = (f"review-statistics:{user_id}:"
+                 f"{get_statistics_version(user_id)}:{key}")
+    return cache.get_or_set(cache_key, compute,
+                            timeout=settings.REVIEW_STATISTICS_CACHE_TIMEOUT)
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from threading import Lock
+
+from django.template import Template
+
+from .helpers import hash_sha256
+
+
+class CompiledTemplates:
+    """Process-wide LRU cache of compiled templates, keyed by a hash of
+    the template source - an edited template gets a new entry, so cached
+    templates never go stale.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, template_string: str) -> Template:
+        # Template() itself accepts any object (i.e. None) as its source
+        template_string = str(template_string)
+        key = hash_sha256(template_string)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+        template = Template(template_string)
+        with self._lock:
+            self._templates[key] = template
+            if len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def __len__(self):
+        return len(self._templates)
+
+
+compiled_templates = CompiledTemplates()
@@ -3,7 +3,12 @@ from os import PathLike
 from lxml import etree
 
 
-xml_parser = etree.XMLParser(recover=True)
+# entities aren't resolved (and nothing is fetched over the network), so
+# a document can't pull in contents of other files - which matters for
+# files uploaded by users
+parser_options = {"recover": True, "resolve_entities": False,
+                  "no_network": True}
+xml_parser = etree.XMLParser(**parser_options)
 
 def from_string(input_text: str):
     return etree.fromstring(
@@ -11,3 +16,9 @@ def from_string(input_text: str):
 
 def parse(path: str|PathLike):
     return etree.parse(path, parser=xml_parser)
+
+def iterparse(path: str|PathLike, **kwargs):
+    """
+    Incremental parsing - with the same options as parse().
+    """
+    return etree.iterparse(path, **parser_options, **kwargs)
@@ -1,3 +1,157 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import posixpath
+import re
 
-# Create your views here.
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, \
+    StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from cards.models import Image, Sound
+from cards.utils.media_storage import ContentAddressedStorage
+
+range_pattern = re.compile(r"bytes=(?P<start>\d*)-(?P<end>\d*)")
+# content-addressed files never change, so they're cached "forever"
+immutable_cache_control = "public, max-age=31536000, immutable"
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves files from the MEDIA_ROOT. Images and sounds get their sha1
+    digests as strong ETags (content-addressed ones are cached as
+    immutable), so that browsers don't download them again; single byte
+    ranges are supported (for seeking in audio).
+
+    With the MEDIA_SENDFILE_HEADER setting, sending the file is left
+    to the web server.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    full_path = safe_join(settings.MEDIA_ROOT, path)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(f"\"{path}\" does not exist")
+    if not os.path.isfile(full_path):
+        raise Http404(f"\"{path}\" is not a file")
+
+    etag = get_media_etag(path, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": get_cache_control(path),
+        "Accept-Ranges": "bytes",
+    }
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _get_file_response(request, full_path, path, stat.st_size,
+                                      etag)
+    for header, value in headers.items():
+        response.headers.setdefault(header, value)
+    return response
+
+
+def get_media_etag(path: str, stat: os.stat_result) -> str:
+    """
+    Strong ETag (sha1 digest of the contents) of a media file - weak
+    one made of its modification time and size for files not recorded
+    in the database.
+    """
+    if ContentAddressedStorage.is_content_name(path):
+        digest = os.path.splitext(posixpath.basename(path))[0]
+    else:
+        digest = Image.objects.filter(image=path).values_list(
+            "sha1_digest", flat=True).first() \
+            or Sound.objects.filter(sound_file=path).values_list(
+                "sha1_digest", flat=True).first()
+    if digest:
+        return f'"{digest}"'
+    return f'W/"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def get_cache_control(path: str) -> str:
+    if ContentAddressedStorage.is_content_name(path):
+        return immutable_cache_control
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+def get_byte_range(request, size: int, etag: str):
+    """
+    (start, end) - inclusive - of a single byte range requested with
+    the Range header, None if the whole file should be sent (no range,
+    several ranges or an outdated If-Range).
+
+    Raises ValueError if the range can't be satisfied.
+    """
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and (if_range != etag or etag.startswith("W/")):
+        return None
+    match = range_pattern.fullmatch(header.strip())
+    if match is None or match.group("start") == match.group("end") == "":
+        # several ranges (or unknown units) - the whole file is sent
+        return None
+    if match.group("start") == "":
+        # the last n bytes
+        suffix_length = int(match.group("end"))
+        if suffix_length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range.")
+        return max(0, size - suffix_length), size - 1
+    start = int(match.group("start"))
+    end = int(match.group("end")) if match.group("end") else size - 1
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range.")
+    return start, min(end, size - 1)
+
+
+def _get_file_response(request, full_path, path, size, etag):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    sendfile_header = settings.MEDIA_SENDFILE_HEADER
+    if sendfile_header:
+        # the web server sends the file (and handles ranges)
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header == "X-Accel-Redirect":
+            response[sendfile_header] = \
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    try:
+        byte_range = get_byte_range(request, size, etag)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"),
+                                content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, end - start + 1),
+            status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
+
+
+def _read_range(full_path, start, length, chunk_size=64 * 1024):
+    with open(full_path, "rb") as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
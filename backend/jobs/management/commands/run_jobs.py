@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.runner import Worker
+
+
+class Command(BaseCommand):
+    help = ("Runs queued background jobs (imports, media backfills, "
+            "re-rendering of notes...). Any number of workers may run at "
+            "the same time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1,
+                            help="Number of jobs run at the same time "
+                                 "(each in its own process).")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds between checks for new jobs.")
+        parser.add_argument("--burst", action="store_true",
+                            help="Exit once there are no queued jobs.")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options["concurrency"],
+                        poll_interval=options["poll_interval"],
+                        progress=self._report_job)
+        # running jobs are finished before the worker exits
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        jobs_run = worker.run(burst=options["burst"])
+        self.stdout.write(self.style.SUCCESS(f"Ran {jobs_run} job(s)."))
+
+    def _report_job(self, job):
+        self.stdout.write(f"Running {job.kind} job {job.id} "
+                          f"(attempt {job.attempts}).")
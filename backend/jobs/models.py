@@ -0,0 +1,133 @@
+import datetime
+import uuid
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A long-running task (an import, a media backfill, re-rendering of
+    notes...) run in the background by the run_jobs command.
+
+    Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so
+    any number of them may share the table. A running job's heartbeat is
+    refreshed periodically - a job whose heartbeat stops (its worker
+    died) is queued again, up to JOB_MAX_ATTEMPTS times.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    statuses = (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)
+    finished_statuses = (SUCCEEDED, FAILED, CANCELLED)
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False)
+    # name of a registered kind of jobs (see jobs.runner.register)
+    kind = models.CharField(max_length=100)
+    arguments = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             null=True,
+                             blank=True,
+                             related_name="jobs")
+    status = models.CharField(max_length=10,
+                              choices=[(status, status)
+                                       for status in statuses],
+                              default=QUEUED)
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    # units of work done (i.e. items imported) out of total, if known
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True, default="")
+    cancel_requested = models.BooleanField(default=False)
+    # outcome of a finished job (an error message if it failed)
+    result = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_on"]),
+            models.Index(fields=["user", "created_on"]),
+        ]
+
+    @classmethod
+    def enqueue(cls, kind: str, arguments: dict | None = None,
+                user=None) -> "Job":
+        return cls.objects.create(kind=kind, arguments=arguments or {},
+                                  user=user)
+
+    @classmethod
+    def claim(cls, worker: str = "") -> "Job | None":
+        """
+        Marks the oldest queued job as running (by the worker) and returns
+        it - None if there is no queued job not claimed by another worker.
+        """
+        with transaction.atomic():
+            job = cls.objects.select_for_update(skip_locked=True) \
+                .filter(status=cls.QUEUED).order_by("created_on").first()
+            if job is None:
+                return None
+            now = timezone.now()
+            job.status = cls.RUNNING
+            job.started_on = job.started_on or now
+            job.heartbeat = now
+            job.attempts += 1
+            job.worker = worker
+            job.save(update_fields=["status", "started_on", "heartbeat",
+                                    "attempts", "worker"])
+        return job
+
+    @classmethod
+    def requeue_stale(cls) -> int:
+        """
+        Queues running jobs again if their workers stopped refreshing their
+        heartbeat (fails ones which have been attempted too many times).
+        Returns the number of queued jobs.
+        """
+        now = timezone.now()
+        stale = cls.objects.filter(
+            status=cls.RUNNING,
+            heartbeat__lt=now - datetime.timedelta(
+                seconds=settings.JOB_HEARTBEAT_TIMEOUT))
+        stale.filter(cancel_requested=True).update(
+            status=cls.CANCELLED, finished_on=now)
+        stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+            status=cls.FAILED, finished_on=now,
+            result="The worker running the job stopped responding.")
+        return stale.update(status=cls.QUEUED)
+
+    def cancel(self):
+        """
+        A queued job is cancelled at once; a running one - when it next
+        reports its progress.
+        """
+        now = timezone.now()
+        if not Job.objects.filter(pk=self.pk, status=self.QUEUED).update(
+                status=self.CANCELLED, cancel_requested=True,
+                finished_on=now):
+            Job.objects.filter(pk=self.pk, status=self.RUNNING).update(
+                cancel_requested=True)
+        self.refresh_from_db()
+
+    def finish(self, status: str, result: str = ""):
+        self.status = status
+        self.result = result
+        self.finished_on = timezone.now()
+        self.save(update_fields=["status", "result", "finished_on"])
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in self.finished_statuses
+
+    def __str__(self):
+        return f"Job({self.kind}, {self.status}: {self.progress}/" \
+               f"{self.total if self.total is not None else '?'})"
@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobCancelled(Exception):
+    """
+    Raised (by RunningJob.report_progress()) in a job which has been
+    cancelled.
+    """
+
+
+@dataclass
+class JobKind:
+    name: str
+    # called with a RunningJob and arguments of the job
+    run: Callable
+    # whether users other than staff can start jobs of the kind
+    # through the API
+    staff_only: bool = True
+    # validates (and normalizes) arguments - raises ValueError
+    validate: Callable[[dict], dict] = dict
+
+
+job_kinds: dict[str, JobKind] = {}
+
+
+def register(name: str, staff_only: bool = True,
+             validate: Callable[[dict], dict] = dict):
+    """
+    Registers a function running jobs of a kind, i.e.:
+
+    @register("make_image_derivatives")
+    def make_image_derivatives(job: RunningJob, chunk_size=50): ...
+    """
+    def decorator(run):
+        job_kinds[name] = JobKind(name, run, staff_only, validate)
+        return run
+    return decorator
+
+
+class RunningJob:
+    """
+    A job as seen by the function running it: reporting progress refreshes
+    the heartbeat and ends a cancelled job (with JobCancelled).
+    """
+    def __init__(self, job: Job):
+        self.job = job
+
+    @property
+    def user(self):
+        return self.job.user
+
+    @property
+    def progress(self) -> int:
+        """
+        Progress stored by an earlier attempt - where a resumable job
+        should start.
+        """
+        return self.job.progress
+
+    def report_progress(self, progress: int, total: int | None = None):
+        updated = Job.objects.filter(
+            pk=self.job.pk, cancel_requested=False).update(
+            progress=progress,
+            total=F("total") if total is None else total,
+            heartbeat=timezone.now())
+        if not updated:
+            raise JobCancelled
+        self.job.progress = progress
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refreshes the heartbeat of a running job every JOB_HEARTBEAT_INTERVAL
+    seconds (also while the job doesn't report progress).
+    """
+    def __init__(self, job: Job):
+        super().__init__(daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                Job.objects.filter(pk=self.job.pk, status=Job.RUNNING) \
+                    .update(heartbeat=timezone.now())
+        finally:
+            # the thread's own connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job_id) -> str:
+    """
+    Runs a claimed job and stores its outcome; returns its status.
+    """
+    job = Job.objects.select_related("user").get(pk=job_id)
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        job_kind = job_kinds[job.kind]
+        result = job_kind.run(RunningJob(job), **job.arguments)
+    except JobCancelled:
+        job.finish(Job.CANCELLED)
+    except Exception:
+        job.finish(Job.FAILED, traceback.format_exc())
+    else:
+        job.finish(Job.SUCCEEDED, str(result or ""))
+    finally:
+        heartbeat.stop()
+    return job.status
+
+
+class Worker:
+    """
+    Claims queued jobs and runs them - with concurrency > 1, up to
+    concurrency jobs at a time, each in a process of a pool.
+    """
+    def __init__(self, concurrency: int = 1, poll_interval: float = 2.0,
+                 progress: Callable[[Job], None] | None = None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.progress = progress or (lambda job: None)
+        self._stopped = threading.Event()
+
+    def run(self, burst: bool = False) -> int:
+        """
+        Runs jobs until stop() is called - or, with burst set, until there
+        are no queued jobs. Returns the number of jobs run.
+        """
+        if self.concurrency > 1:
+            return self._run_in_pool(burst)
+        jobs_run = 0
+        while not self._stopped.is_set():
+            Job.requeue_stale()
+            job = Job.claim(self.name)
+            if job is None:
+                if burst:
+                    break
+                self._stopped.wait(self.poll_interval)
+                continue
+            self.progress(job)
+            run_job(job.id)
+            jobs_run += 1
+        return jobs_run
+
+    def _run_in_pool(self, burst: bool) -> int:
+        jobs_run = 0
+        running = set()
+        executor = self._make_executor()
+        try:
+            while not self._stopped.is_set():
+                Job.requeue_stale()
+                while len(running) < self.concurrency:
+                    job = Job.claim(self.name)
+                    if job is None:
+                        break
+                    self.progress(job)
+                    # forked workers open their own database connections -
+                    # the parent's ones must not be shared with them
+                    connections.close_all()
+                    running.add(executor.submit(run_job, job.id))
+                if not running:
+                    if burst:
+                        break
+                    self._stopped.wait(self.poll_interval)
+                    continue
+                done, running = wait(running, timeout=self.poll_interval,
+                                     return_when=FIRST_COMPLETED)
+                jobs_run += len(done)
+                if any(isinstance(future.exception(), BrokenProcessPool)
+                       for future in done):
+                    # jobs of a killed process are queued again once their
+                    # heartbeat gets stale
+                    executor.shutdown(cancel_futures=True)
+                    running = set()
+                    executor = self._make_executor()
+        finally:
+            executor.shutdown()
+        return jobs_run
+
+    def _make_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context("fork"))
+
+    def stop(self):
+        self._stopped.set()
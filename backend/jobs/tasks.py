@@ -0,0 +1,155 @@
+"""
+Kinds of jobs run by the run_jobs command.
+"""
+import os
+import shutil
+
+from django.conf import settings
+
+from card_types.models import NotesRerenderJob
+from card_types.utils.notes_rerender import NotesRerenderer
+from cards.management.commands.make_image_derivatives import \
+    make_derivatives
+from cards.management.fr_importer.fr_archive import FullRecallArchive
+from cards.management.fr_importer.items_importer.modules.import_plan import \
+    duplicate_policies
+from cards.management.fr_importer.items_importer.modules.items_importer import \
+    MemorizedItemsImporter, PendingItemsImporter
+from cards.models import CardTemplate, Image
+from cards.utils.helpers import batched
+from .models import Job
+from .runner import RunningJob, register
+
+
+def queue_image_derivatives():
+    """
+    Queues a make_image_derivatives job if there are images without
+    derivatives (cards are rendered without the derivatives until it
+    runs) - unless such a job is already queued.
+    """
+    if Image.objects.filter(width__isnull=True).exists() \
+            and not Job.objects.filter(kind="make_image_derivatives",
+                                       status=Job.QUEUED).exists():
+        Job.enqueue("make_image_derivatives")
+
+
+def validate_import(arguments: dict) -> dict:
+    elements_path = arguments.get("elements_path")
+    if not elements_path or not os.path.isfile(elements_path):
+        raise ValueError("elements_path: no such file.")
+    duplicate_policy = arguments.get("duplicate_policy", "skip")
+    if duplicate_policy not in duplicate_policies:
+        raise ValueError(f"duplicate_policy: one of {duplicate_policies} "
+                         "expected.")
+    return {"elements_path": elements_path,
+            "duplicate_policy": duplicate_policy,
+            "memorized": bool(arguments.get("memorized", False))}
+
+
+def validate_archive_import(arguments: dict) -> dict:
+    """
+    Only archives uploaded (into FULLRECALL_UPLOADS_ROOT) are imported -
+    they are removed afterwards.
+    """
+    archive_path = os.path.realpath(arguments.get("archive_path") or "")
+    if not os.path.isfile(archive_path) or os.path.dirname(archive_path) \
+            != os.path.realpath(settings.FULLRECALL_UPLOADS_ROOT) \
+            or not archive_path.endswith(".zip"):
+        raise ValueError("archive_path: no such uploaded archive.")
+    duplicate_policy = arguments.get("duplicate_policy", "skip")
+    if duplicate_policy not in duplicate_policies:
+        raise ValueError(f"duplicate_policy: one of {duplicate_policies} "
+                         "expected.")
+    return {"archive_path": archive_path,
+            "duplicate_policy": duplicate_policy,
+            "memorized": bool(arguments.get("memorized", False))}
+
+
+@register("import_fr_cards", validate=validate_import)
+def import_fr_cards(job: RunningJob, elements_path: str,
+                    duplicate_policy: str = "skip", memorized: bool = False,
+                    batch_size: int | None = None,
+                    media_root: str | None = None) -> str:
+    """
+    Imports FullRecall items (for the user who started the job, if they
+    are memorized). A job attempted again resumes after the items
+    imported so far.
+    """
+    if memorized:
+        importer = MemorizedItemsImporter(elements_path, job.user,
+                                          streaming=True,
+                                          media_root=media_root)
+    else:
+        importer = PendingItemsImporter(elements_path, streaming=True,
+                                        media_root=media_root)
+    summary = importer.import_cards_into_db(
+        batch_size=batch_size, offset=job.progress,
+        progress=job.report_progress, duplicate_policy=duplicate_policy)
+    queue_image_derivatives()
+    result = (f"{summary['new']} new cards, {summary['duplicates']} "
+              f"duplicates ({duplicate_policy}).")
+    if summary["errors"]:
+        result += f" Not imported ({len(summary['errors'])}):\n" \
+                  + "\n".join(summary["errors"])
+    return result
+
+
+@register("import_fr_archive", validate=validate_archive_import)
+def import_fr_archive(job: RunningJob, archive_path: str,
+                      duplicate_policy: str = "skip",
+                      memorized: bool = False) -> str:
+    """
+    Imports items from an uploaded FullRecall archive, extracted next to
+    it; media files have to be inside the extracted archive.
+
+    The archive and extracted files are removed once the job ends (it
+    succeeds, fails or is cancelled). Only a job whose worker died is
+    queued again - and then finds the archive where it was.
+    """
+    directory = os.path.splitext(archive_path)[0]
+    try:
+        elements_path = FullRecallArchive(archive_path).extract(directory)
+        return import_fr_cards(job, elements_path, duplicate_policy,
+                               memorized, media_root=directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+
+
+@register("make_image_derivatives")
+def make_image_derivatives(job: RunningJob, remake_all: bool = False,
+                           chunk_size: int = 50) -> str:
+    """
+    Makes derivatives of images which don't have them yet (or of all
+    images).
+    """
+    images = Image.objects.order_by("id")
+    if not remake_all:
+        images = images.filter(width__isnull=True)
+    image_ids = list(images.values_list("id", flat=True))
+    processed = 0
+    for chunk in batched(image_ids, chunk_size):
+        processed += make_derivatives(chunk)
+        job.report_progress(processed, len(image_ids))
+    return f"Derivatives of {processed} images made."
+
+
+@register("rerender_notes")
+def rerender_notes(job: RunningJob, template_title: str | None = None,
+                   chunk_size: int = 500) -> str:
+    """
+    Runs unfinished re-rendering jobs - scheduling one for the template
+    with the given title first.
+    """
+    if template_title:
+        template = CardTemplate.objects.filter(title=template_title).first()
+        if template is None:
+            raise ValueError(f"No template titled '{template_title}'.")
+        NotesRerenderJob.schedule(template)
+    notes_rerenderer = NotesRerenderer(
+        chunk_size=chunk_size,
+        progress=lambda rerender_job: job.report_progress(
+            rerender_job.notes_rendered, rerender_job.notes_total))
+    return f"Finished {notes_rerenderer.run_unfinished()} " \
+           "re-rendering job(s)."
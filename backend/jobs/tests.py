@@ -0,0 +1,184 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from cards.models import Card, Image
+from .models import Job
+from .runner import RunningJob, Worker, register, run_job
+
+
+@register("count_to")
+def count_to(job: RunningJob, number: int, cancel_at: int | None = None):
+    for count in range(job.progress + 1, number + 1):
+        if count == cancel_at:
+            Job.objects.filter(pk=job.job.pk).update(cancel_requested=True)
+        job.report_progress(count, number)
+    return f"Counted to {number}."
+
+
+@register("fail")
+def fail(job: RunningJob):
+    raise RuntimeError("failing job")
+
+
+class QueueingJobs(TestCase):
+    def test_claiming_oldest(self):
+        first_job = Job.enqueue("count_to", {"number": 1})
+        Job.enqueue("count_to", {"number": 2})
+        claimed = Job.claim("worker")
+
+        self.assertEqual(claimed, first_job)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claimed.worker, "worker")
+        self.assertIsNotNone(claimed.heartbeat)
+
+    def test_nothing_to_claim(self):
+        Job.enqueue("count_to", {"number": 1}).cancel()
+
+        self.assertIsNone(Job.claim())
+
+    @override_settings(JOB_HEARTBEAT_TIMEOUT=60, JOB_MAX_ATTEMPTS=2)
+    def test_requeuing_stale_jobs(self):
+        stale_heartbeat = timezone.now() - datetime.timedelta(seconds=61)
+        stale_job = Job.enqueue("count_to", {"number": 1})
+        exhausted_job = Job.enqueue("count_to", {"number": 1})
+        live_job = Job.enqueue("count_to", {"number": 1})
+        Job.objects.update(status=Job.RUNNING, attempts=1,
+                           heartbeat=stale_heartbeat)
+        Job.objects.filter(pk=exhausted_job.pk).update(attempts=2)
+        Job.objects.filter(pk=live_job.pk).update(heartbeat=timezone.now())
+
+        self.assertEqual(Job.requeue_stale(), 1)
+        for job in (stale_job, exhausted_job, live_job):
+            job.refresh_from_db()
+        self.assertEqual(stale_job.status, Job.QUEUED)
+        self.assertEqual(exhausted_job.status, Job.FAILED)
+        self.assertEqual(live_job.status, Job.RUNNING)
+
+    def test_cancelling_running_job(self):
+        job = Job.enqueue("count_to", {"number": 1})
+        Job.claim()
+        job.cancel()
+
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertTrue(job.cancel_requested)
+
+
+class RunningJobs(TestCase):
+    def test_success(self):
+        job = Job.enqueue("count_to", {"number": 3})
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.progress, 3)
+        self.assertEqual(job.total, 3)
+        self.assertEqual(job.result, "Counted to 3.")
+        self.assertIsNotNone(job.finished_on)
+
+    def test_resuming(self):
+        """
+        A job attempted again starts from its stored progress.
+        """
+        job = Job.enqueue("count_to", {"number": 3})
+        Job.objects.filter(pk=job.pk).update(progress=2)
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.progress, 3)
+
+    def test_failure(self):
+        job = Job.enqueue("fail")
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("RuntimeError: failing job", job.result)
+
+    def test_cancellation(self):
+        job = Job.enqueue("count_to", {"number": 5, "cancel_at": 3})
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.CANCELLED)
+        self.assertEqual(job.progress, 2)
+
+    def test_unknown_kind(self):
+        job = Job.enqueue("unknown")
+        Job.claim()
+
+        self.assertEqual(run_job(job.id), Job.FAILED)
+
+    def test_worker_command(self):
+        jobs = [Job.enqueue("count_to", {"number": number})
+                for number in range(3)]
+        output = StringIO()
+        call_command("run_jobs", "--burst", stdout=output)
+
+        self.assertIn("Ran 3 job(s).", output.getvalue())
+        self.assertSetEqual(
+            {job.status for job in Job.objects.filter(
+                pk__in=[job.pk for job in jobs])},
+            {Job.SUCCEEDED})
+
+
+class RunningBuiltInJobs(TestCase):
+    elements_path = ("cards/management/fr_importer/items_importer/"
+                     "tests/test_data/fdb/elements.xml")
+
+    def test_import(self):
+        user = get_user_model().objects.create(username="user")
+        job = Job.enqueue("import_fr_cards",
+                          {"elements_path": self.elements_path,
+                           "memorized": True}, user=user)
+        Job.claim()
+        run_job(job.id)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, Job.SUCCEEDED, job.result)
+        self.assertEqual(job.progress, 3)
+        self.assertEqual(Card.objects.filter(
+            reviewing_users=user).count(), 3)
+
+    def test_queueing_image_derivatives(self):
+        """
+        Derivatives of imported images are made by a job queued after
+        the import - a single one, however many imports there are.
+        """
+        jobs = [Job.enqueue("import_fr_cards",
+                            {"elements_path": self.elements_path})
+                for _ in range(2)]
+        for _ in jobs:
+            Job.claim()
+        for job in jobs:
+            run_job(job.id)
+
+        self.assertTrue(Image.objects.filter(width__isnull=True).exists())
+        self.assertEqual(Job.objects.filter(
+            kind="make_image_derivatives", status=Job.QUEUED).count(), 1)
+
+
+class RunningJobsConcurrently(TransactionTestCase):
+    """
+    Jobs run by processes of a pool (which have to see committed data -
+    hence the TransactionTestCase).
+    """
+    def test_pool(self):
+        for number in range(4):
+            Job.enqueue("count_to", {"number": number})
+        Job.enqueue("fail")
+        jobs_run = Worker(concurrency=2, poll_interval=0.1).run(burst=True)
+
+        self.assertEqual(jobs_run, 5)
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(),
+                         4)
+        self.assertEqual(Job.objects.filter(status=Job.FAILED).count(), 1)
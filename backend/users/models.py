@@ -38,10 +38,11 @@ class User(AbstractUser):
         """Returns user categories together with categories included
         in trees.
         """
+        sub_categories = Category.get_sub_categories()
         user_categories = []
         for selected_category in self.selected_categories.all():
-            user_categories.extend(Category.get_tree(
-                selected_category))
+            user_categories.extend(
+                selected_category.get_tree_from(sub_categories))
         return user_categories
 
 
@@ -60,6 +60,7 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'react_app.apps.ReactAppConfig',
     'card_types.apps.CardTypesConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 AUTH_USER_MODEL = 'users.User'
@@ -69,6 +70,8 @@ AUTH_USER_MODEL = 'users.User'
 # DBBACKUP_STORAGE_OPTIONS = {'location': '/wsra/backup'}
 
 MIDDLEWARE = [
+    # reports queries in response headers when DEBUG is on
+    'api.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -123,6 +126,22 @@ DATABASES = {
     }
 }
 
+# Per-process memory cache by default - in production, set a shared backend
+# (e.g. django.core.cache.backends.db.DatabaseCache, as in
+# docker-compose-prod.yml, or RedisCache), so that cached statistics are
+# invalidated across all worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# lifetime (in seconds) of cached review statistics
+REVIEW_STATISTICS_CACHE_TIMEOUT = int(
+    os.environ.get('REVIEW_STATISTICS_CACHE_TIMEOUT', 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -159,6 +178,45 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# store Image and Sound files under paths made of sha1 digests of their
+# contents (see cards.utils.media_storage)
+CONTENT_ADDRESSED_MEDIA = bool(int(
+    os.environ.get('CONTENT_ADDRESSED_MEDIA', 0)))
+# widths (in pixels) and formats of downscaled copies of card images;
+# they're made by the make_image_derivatives command or job (queued after
+# imports), or when images are saved with IMAGE_DERIVATIVES_ON_SAVE turned
+# on - images are rendered without them until then
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVES_ON_SAVE = bool(int(
+    os.environ.get('IMAGE_DERIVATIVES_ON_SAVE', 0)))
+# how long (in seconds) browsers may reuse media files which aren't
+# content-addressed before revalidating them
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 3600))
+# 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache, lighttpd) - leaves
+# sending media files to the web server; nginx gets the path prefixed
+# with MEDIA_ACCEL_REDIRECT_PREFIX (an internal location)
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX',
+                                             '/protected-media/')
+
+# background jobs (see the run_jobs command): seconds between refreshes
+# of a running job's heartbeat, seconds after which a job with a stale
+# heartbeat is queued again and the number of attempts at running a job
+JOB_HEARTBEAT_INTERVAL = 10
+JOB_HEARTBEAT_TIMEOUT = 60
+JOB_MAX_ATTEMPTS = 3
+
+# uploaded FullRecall archives are stored (and extracted) here before they
+# are imported - outside the publicly served MEDIA_ROOT; with
+# FILE_UPLOAD_TEMP_DIR on the same file system, uploads aren't copied
+FULLRECALL_UPLOADS_ROOT = os.environ.get(
+    'FULLRECALL_UPLOADS_ROOT', os.path.join(BASE_DIR, 'fullrecall_uploads'))
+# maximum size (in bytes) of an uploaded archive, of files extracted from
+# it and the maximum number of files in it
+FULLRECALL_UPLOAD_MAX_SIZE = 1024 ** 3
+FULLRECALL_ARCHIVE_MAX_SIZE = 4 * 1024 ** 3
+FULLRECALL_ARCHIVE_MAX_MEMBERS = 100000
 
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
@@ -191,6 +249,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        # uploads of FullRecall archives, per user
+        'uploads': os.environ.get('UPLOAD_THROTTLE_RATE', '10/hour'),
+    },
 }
 
 DJOSER = {
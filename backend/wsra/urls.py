@@ -17,7 +17,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.conf import settings
 from django.urls import path, include, re_path
-from django.views.static import serve
+from cards.views import serve_media
 
 urlpatterns = [
     path("", include("react_app.urls")),
@@ -27,12 +27,10 @@ urlpatterns = [
     path('api/auth/', include('djoser.urls.authtoken')),
     path('api-auth/', include('rest_framework.urls')),
 
-    # hack for public testing purposes only
-    # for real life deployment - cloud storage
-    # or proxy server (installed as another service in Render,
-    # for example) should be used
-    re_path(r'^media/(?P<path>.*)$', serve,
-            {'document_root': settings.MEDIA_ROOT}),
+    # for real life deployment - cloud storage or proxy server
+    # (installed as another service in Render, for example) should be
+    # used - possibly through MEDIA_SENDFILE_HEADER
+    re_path(r'^media/(?P<path>.*)$', serve_media, name="media"),
 ]
 
 # works only in debug mode